@@ -1,7 +1,7 @@
 from silk.profiling.profiler import silk_profile
 from ninja import Router
 
-from produk.api import AuthBearer
+from .security import AuthBearer
 from .schemas import (
     RemoveUserRequest,
     SessionData,
@@ -37,13 +37,13 @@ def validate_token(request, token_data: TokenValidationRequest):
 @router.get("/get-users", response={200: list[dict], 401: dict}, auth=AuthBearer())
 @silk_profile(name='Get Users Profilling')
 def get_users(request):
-    return UserService.get_users_for_toko(request.auth)
+    return UserService.get_users_for_toko(request.auth.user_id)
 
 
 @router.post("/send-invitation", response={200: dict, 400: dict}, auth=AuthBearer())
 def send_invitation(request, payload: InvitationRequest):
     result, error = InvitationService.send_invitation(
-        request.auth, 
+        request.auth.user_id, 
         payload.email, 
         payload.name, 
         payload.role
@@ -60,7 +60,7 @@ def validate_invitation(request, payload: TokenValidationRequest):
 
 @router.post("/remove-user-from-toko", response={200: dict, 400: dict, 403: dict}, auth=AuthBearer())
 def remove_user_from_toko(request, payload: RemoveUserRequest):
-    result, error = UserService.remove_user_from_toko(request.auth, payload.user_id)
+    result, error = UserService.remove_user_from_toko(request.auth.user_id, payload.user_id)
     if not result:
         status_code = 403 if "Only Pemilik" in error else 400
         return status_code, {"error": error}
@@ -70,7 +70,7 @@ def remove_user_from_toko(request, payload: RemoveUserRequest):
 @router.get("/pending-invitations", response={200: list[dict], 404: dict}, auth=AuthBearer())
 @silk_profile(name='Get Pending Invitatoin Users Profilling')
 def get_pending_invitations(request):
-    result, error = InvitationService.get_pending_invitations(request.auth)
+    result, error = InvitationService.get_pending_invitations(request.auth.user_id)
     if error:
         return 404, {"message": error}
     return 200, result
@@ -78,7 +78,7 @@ def get_pending_invitations(request):
 
 @router.delete("/delete-invitation/{invitation_id}", response={200: dict, 404: dict, 403: dict}, auth=AuthBearer())
 def delete_invitation(request, invitation_id: int):
-    result, error = InvitationService.delete_invitation(request.auth, invitation_id)
+    result, error = InvitationService.delete_invitation(request.auth.user_id, invitation_id)
     if not result:
         status_code = 403 if "permission" in error else 404
         return status_code, {"message": error}
@@ -94,15 +94,28 @@ def logout(request, logout_data: LogoutRequest):
 
 @router.get("/bpr/shops", response={200: list[dict], 403: dict}, auth=AuthBearer())
 def get_all_shops_for_bpr(request):
-    shops, error = BPRService.get_all_shops(request.auth)
+    shops, error = BPRService.get_all_shops(request.auth.user_id)
     if error:
         return 403, {"error": error}
     return 200, shops
 
 
+@router.get("/bpr/portfolio", response={200: dict, 400: dict, 403: dict, 404: dict}, auth=AuthBearer())
+def get_portfolio_for_bpr(request, page: int = 1, per_page: int = 20, sort: str = "-revenue_30d"):
+    """Owner, users, 30-day revenue, outstanding debt and last activity of every shop."""
+    portfolio, error = BPRService.get_portfolio(request.auth.user_id, page, per_page, sort)
+    if error == "Invalid sort parameter":
+        return 400, {"error": error}
+    elif error == "Page not found":
+        return 404, {"error": error}
+    elif error:
+        return 403, {"error": error}
+    return 200, portfolio
+
+
 @router.get("/bpr/shop/{shop_id}", response={200: dict, 403: dict, 404: dict}, auth=AuthBearer())
 def get_shop_info_for_bpr(request, shop_id: int):
-    shop_info, error = BPRService.get_shop_info(request.auth, shop_id)
+    shop_info, error = BPRService.get_shop_info(request.auth.user_id, shop_id)
     if error == "Only BPR users can access this endpoint":
         return 403, {"error": error}
     elif error == "Shop not found":
@@ -113,7 +126,7 @@ def get_shop_info_for_bpr(request, shop_id: int):
 @silk_profile(name='Get User Info')
 def get_user_info(request):
     """Get detailed information about the currently authenticated user"""
-    result, error = UserService.get_user_info(request.auth)
+    result, error = UserService.get_user_info(request.auth.user_id)
     if error:
         return 404, {"error": error}
     return 200, result
\ No newline at end of file
@@ -1,8 +1,13 @@
+from decimal import Decimal
+
 from django.shortcuts import get_object_or_404
+from django.db.models import Count, DecimalField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.db.utils import IntegrityError
 from django.conf import settings
 import jwt
 from .models import User, Toko, Invitation
+from transaksi.models import Transaksi
 from ninja_jwt.tokens import RefreshToken, AccessToken
 from ninja_jwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 
@@ -43,6 +48,67 @@ class TokoRepository:
     @staticmethod
     def create_toko():
         return Toko.objects.create()
+
+    @staticmethod
+    def get_shops_with_owner(exclude_toko_id=None):
+        """Every toko that has an owner, annotated with ``owner`` (username) and ``user_count``."""
+        shops = Toko.objects.annotate(
+            owner=Subquery(
+                User.objects.filter(toko=OuterRef("pk"), role="Pemilik").order_by("id").values("username")[:1]
+            ),
+            user_count=Coalesce(
+                Subquery(
+                    User.objects.filter(toko=OuterRef("pk"))
+                    .order_by()
+                    .values("toko")
+                    .annotate(n=Count("id"))
+                    .values("n")
+                ),
+                Value(0),
+            ),
+        ).filter(owner__isnull=False)
+
+        if exclude_toko_id:
+            shops = shops.exclude(id=exclude_toko_id)
+        return shops
+
+    @staticmethod
+    def get_portfolio(since, exclude_toko_id=None):
+        """
+        ``get_shops_with_owner`` plus revenue since ``since``, outstanding
+        hutang/piutang and last activity. Every figure is a correlated
+        subquery, so joins never multiply rows and the whole portfolio is one
+        query however many shops there are.
+        """
+        money = DecimalField(max_digits=14, decimal_places=2)
+
+        def transaksi_sum(**filters):
+            return Coalesce(
+                Subquery(
+                    Transaksi.objects.filter(toko=OuterRef("pk"), is_deleted=False, **filters)
+                    .order_by()
+                    .values("toko")
+                    .annotate(total=Sum("total_amount"))
+                    .values("total"),
+                    output_field=money,
+                ),
+                Value(Decimal("0")),
+                output_field=money,
+            )
+
+        return TokoRepository.get_shops_with_owner(exclude_toko_id).annotate(
+            revenue_30d=transaksi_sum(transaction_type="pemasukan", created_at__gte=since),
+            # Same buckets as the owner's debt summary
+            hutang=transaksi_sum(transaction_type="pengeluaran", status="Belum Lunas"),
+            piutang=transaksi_sum(transaction_type="pemasukan", status="Belum Lunas"),
+            last_activity=Subquery(
+                Transaksi.objects.filter(toko=OuterRef("pk"), is_deleted=False)
+                .order_by()
+                .values("toko")
+                .annotate(latest=Max("created_at"))
+                .values("latest")
+            ),
+        )
     
     @staticmethod
     def get_all_toko():
@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from ninja.security import HttpBearer
+
+from .models import User
+
+PRINCIPAL_CACHE_KEY = "auth:principal:{user_id}"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by the API handlers (``request.auth``)."""
+
+    user_id: int
+    toko_id: Optional[int]
+    role: str
+    is_bpr: bool
+
+
+def _cache_key(user_id):
+    return PRINCIPAL_CACHE_KEY.format(user_id=user_id)
+
+
+def _principal_rows(user_id):
+    # Only the columns a Principal needs
+    return User.objects.filter(id=user_id, is_active=True).values("id", "toko_id", "role", "email")
+
+
+def _principal_from_row(row):
+    """Cacheable ``Principal`` fields of a ``_principal_rows`` row."""
+    return {
+        "user_id": row["id"],
+        "toko_id": row["toko_id"],
+        "role": row["role"],
+        "is_bpr": row["email"] == settings.BPR_EMAIL,
+    }
+
+
+def get_principal(user_id):
+    """
+    Resolve a user id to a Principal, served from cache when possible.
+
+    Not cached while ``AUTH_PRINCIPAL_CACHE_TIMEOUT`` is 0, the default with a
+    per-process cache (see settings).
+    """
+    timeout = settings.AUTH_PRINCIPAL_CACHE_TIMEOUT
+    data = cache.get(_cache_key(user_id)) if timeout else None
+    if data is None:
+        row = _principal_rows(user_id).first()
+        if row is None:
+            return None
+        data = _principal_from_row(row)
+        if timeout:
+            cache.set(_cache_key(user_id), data, timeout)
+    return Principal(**data)
+
+
+async def aget_principal(user_id):
+    """``get_principal`` for async handlers, without blocking the event loop."""
+    timeout = settings.AUTH_PRINCIPAL_CACHE_TIMEOUT
+    data = await cache.aget(_cache_key(user_id)) if timeout else None
+    if data is None:
+        row = await _principal_rows(user_id).afirst()
+        if row is None:
+            return None
+        data = _principal_from_row(row)
+        if timeout:
+            await cache.aset(_cache_key(user_id), data, timeout)
+    return Principal(**data)
+
+
+def invalidate_principal(*user_ids):
+    """Evict cached principals after a user's role or toko changes."""
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def _token_user_id(token):
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        return None
+    return payload.get("user_id")
+
+
+class AuthBearer(HttpBearer):
+    def authenticate(self, request, token):
+        user_id = _token_user_id(token)
+        if user_id:
+            return get_principal(user_id)
+        return None
+
+
+class AsyncAuthBearer(HttpBearer):
+    """``AuthBearer`` for routers with ``async def`` handlers."""
+
+    async def authenticate(self, request, token):
+        user_id = _token_user_id(token)
+        if user_id:
+            return await aget_principal(user_id)
+        return None
+
@@ -1,13 +1,22 @@
+import json
+import logging
+import time
+
+from django.db.models import F
+from django.http import Http404
 from django.utils.timezone import now
 from datetime import timedelta
+from ninja.responses import NinjaJSONEncoder
 from ninja_jwt.exceptions import TokenError
 from ninja_jwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 import jwt
 
-from backend import settings
+from django.conf import settings
 from .repositories import UserRepository, TokoRepository, InvitationRepository, TokenRepository
 from django.core.cache import cache
 
+logger = logging.getLogger(__name__)
+
 class AuthService:
     @staticmethod
     def process_user_session(user_data):
@@ -290,6 +299,19 @@ class InvitationService:
         InvitationRepository.delete_invitation(invitation)
         return {"message": "Invitation deleted successfully"}, None
 
+PORTFOLIO_SORTS = ("owner", "user_count", "revenue_30d", "hutang", "piutang", "last_activity", "created_at", "id")
+PORTFOLIO_VERSION_KEY = "bpr:portfolio:version"
+
+
+def _portfolio_version():
+    return cache.get_or_set(PORTFOLIO_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_portfolio():
+    """Start a new cache generation; pages cached under the old one are never read again."""
+    cache.set(PORTFOLIO_VERSION_KEY, time.time_ns(), None)
+
+
 class BPRService:
     @staticmethod
     def get_all_shops(user_id):
@@ -299,21 +321,16 @@ class BPRService:
             if user.email != settings.BPR_EMAIL:
                 return None, "Only BPR users can access this endpoint"
 
-            shops = TokoRepository.get_all_toko()
-
-            if user.toko:
-                shops = shops.exclude(id=user.toko.id)
-
-            shops_data = []
-            for shop in shops:
-                owner = UserRepository.get_owner_of_toko(shop)
-                if owner:  # Only include shops that have an owner
-                    shops_data.append({
-                        "id": shop.id,
-                        "owner": owner.username,
-                        "created_at": shop.created_at,
-                        "user_count": UserRepository.count_users_in_toko(shop),
-                    })
+            shops = TokoRepository.get_shops_with_owner(exclude_toko_id=user.toko_id).order_by("id")
+            shops_data = [
+                {
+                    "id": shop.id,
+                    "owner": shop.owner,
+                    "created_at": shop.created_at,
+                    "user_count": shop.user_count,
+                }
+                for shop in shops
+            ]
 
             return shops_data, None
         except Exception as e:
@@ -344,4 +361,68 @@ class BPRService:
             }, None
         except Exception as e:
             print(f"Error: {str(e)}")
-            return None, "Access denied"
\ No newline at end of file
+            return None, "Access denied"
+
+    @staticmethod
+    def get_portfolio(user_id, page=1, per_page=20, sort="-revenue_30d"):
+        try:
+            user = UserRepository.get_user_by_id(user_id)
+        except Http404:
+            logger.warning("BPR portfolio requested by unknown user %s", user_id)
+            return None, "Access denied"
+
+        if user.email != settings.BPR_EMAIL:
+            return None, "Only BPR users can access this endpoint"
+
+        if sort.lstrip("-") not in PORTFOLIO_SORTS:
+            return None, "Invalid sort parameter"
+        page = max(page, 1)
+        per_page = min(max(per_page, 1), 100)
+
+        timeout = settings.BPR_PORTFOLIO_CACHE_TIMEOUT
+        key = f"bpr:portfolio:{_portfolio_version()}:{user.toko_id}:{sort}:{page}:{per_page}"
+        result = cache.get(key) if timeout else None
+        if result is not None:
+            return result, None
+
+        field = sort.lstrip("-")
+        descending = sort.startswith("-")
+        shops = TokoRepository.get_portfolio(
+            since=now() - timedelta(days=30), exclude_toko_id=user.toko_id
+        ).order_by(
+            F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True),
+            "-id" if descending else "id",
+        )
+
+        total = shops.count()
+        total_pages = (total + per_page - 1) // per_page
+        if page > total_pages and total > 0:
+            return None, "Page not found"
+
+        offset = (page - 1) * per_page
+        result = {
+            "items": [
+                {
+                    "id": shop.id,
+                    "owner": shop.owner,
+                    "created_at": shop.created_at,
+                    "user_count": shop.user_count,
+                    "revenue_30d": float(shop.revenue_30d),
+                    "hutang": float(shop.hutang),
+                    "piutang": float(shop.piutang),
+                    "last_activity": shop.last_activity,
+                }
+                for shop in shops[offset : offset + per_page]
+            ],
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": total_pages,
+        }
+        # Render datetimes/decimals up front so hits and misses return the
+        # same shape and any cache serializer (json, msgpack) can store it
+        result = json.loads(json.dumps(result, cls=NinjaJSONEncoder))
+        if timeout:
+            cache.set(key, result, timeout)
+        return result, None
+
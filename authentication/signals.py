@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .security import invalidate_principal
+from .services import invalidate_portfolio
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_principal(sender, instance, **kwargs):
+    # Role and toko changes (remove_user_from_toko, validate_invitation, admin edits)
+    # all go through User.save(), so the cached principal never outlives them.
+    invalidate_principal(instance.id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_bpr_portfolio(sender, instance, **kwargs):
+    # Owner names and user counts are part of the BPR portfolio
+    transaction.on_commit(invalidate_portfolio)
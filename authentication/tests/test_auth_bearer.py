@@ -1,19 +1,46 @@
 import jwt
 
 from django.conf import settings
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from authentication.api import AuthBearer
+from authentication.models import Toko, User
+from authentication.security import Principal, invalidate_principal
 
+@override_settings(AUTH_PRINCIPAL_CACHE_TIMEOUT=60)
 class TestAuthBearer(TestCase):
     def setUp(self):
+        cache.clear()
         self.auth = AuthBearer()
+        self.toko = Toko.objects.create()
+        self.user = User.objects.create_user(
+            username="owner", email="owner@example.com", password="password", role="Pemilik", toko=self.toko
+        )
+
+    def _token(self, payload):
+        return jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
 
     def test_valid_token_with_user_id(self):
-        payload = {"user_id": 123}
-        token = jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
+        token = self._token({"user_id": self.user.id})
+
+        principal = self.auth.authenticate(request=None, token=token)
+        self.assertEqual(
+            principal,
+            Principal(user_id=self.user.id, toko_id=self.toko.id, role="Pemilik", is_bpr=False),
+        )
+
+    def test_valid_token_for_unknown_user(self):
+        token = self._token({"user_id": 123456})
+
+        result = self.auth.authenticate(request=None, token=token)
+        self.assertIsNone(result)
 
-        user_id = self.auth.authenticate(request=None, token=token)
-        self.assertEqual(user_id, 123)
+    def test_bpr_user_is_flagged(self):
+        bpr = User.objects.create_user(username="bpr", email=settings.BPR_EMAIL, password="password", role="BPR")
+
+        principal = self.auth.authenticate(request=None, token=self._token({"user_id": bpr.id}))
+        self.assertTrue(principal.is_bpr)
+        self.assertIsNone(principal.toko_id)
 
     def test_invalid_token(self):
         invalid_token = "invalid.token.value"
@@ -22,8 +49,35 @@ class TestAuthBearer(TestCase):
         self.assertIsNone(result)
 
     def test_token_without_user_id(self):
-        payload = {"something_else": "value"}
-        token = jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
+        token = self._token({"something_else": "value"})
 
         result = self.auth.authenticate(request=None, token=token)
-        self.assertIsNone(result)
\ No newline at end of file
+        self.assertIsNone(result)
+
+    def test_principal_is_cached(self):
+        token = self._token({"user_id": self.user.id})
+        self.auth.authenticate(request=None, token=token)
+
+        with self.assertNumQueries(0):
+            principal = self.auth.authenticate(request=None, token=token)
+        self.assertEqual(principal.user_id, self.user.id)
+
+    def test_invalidate_principal_reloads_role(self):
+        token = self._token({"user_id": self.user.id})
+        self.auth.authenticate(request=None, token=token)
+
+        User.objects.filter(id=self.user.id).update(role="Karyawan")
+        self.assertEqual(self.auth.authenticate(request=None, token=token).role, "Pemilik")
+
+        invalidate_principal(self.user.id)
+        self.assertEqual(self.auth.authenticate(request=None, token=token).role, "Karyawan")
+
+    @override_settings(AUTH_PRINCIPAL_CACHE_TIMEOUT=0)
+    def test_principal_is_not_cached_without_a_timeout(self):
+        token = self._token({"user_id": self.user.id})
+        self.auth.authenticate(request=None, token=token)
+
+        User.objects.filter(id=self.user.id).update(role="Karyawan")
+        with self.assertNumQueries(1):
+            principal = self.auth.authenticate(request=None, token=token)
+        self.assertEqual(principal.role, "Karyawan")
@@ -0,0 +1,174 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.tokens import RefreshToken
+from ninja.testing import TestClient
+
+from authentication.api import router
+from authentication.models import Toko, User
+from authentication.repositories import TokoRepository
+from authentication.security import get_principal
+from authentication.services import PORTFOLIO_VERSION_KEY, BPRService
+from core.cache_config import REDIS_SERIALIZERS
+from transaksi.models import Transaksi
+
+
+@override_settings(AUTH_PRINCIPAL_CACHE_TIMEOUT=60, BPR_PORTFOLIO_CACHE_TIMEOUT=300)
+class BPRPortfolioTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = TestClient(router)
+        self.bpr = User.objects.create_user(
+            username="bpr", email=settings.BPR_EMAIL, password="password", role="BPR"
+        )
+        self.shops = []
+        for i in range(5):
+            toko = Toko.objects.create()
+            owner = User.objects.create_user(
+                username=f"owner{i}", email=f"owner{i}@example.com", password="password", role="Pemilik", toko=toko
+            )
+            for j in range(i):
+                User.objects.create_user(
+                    username=f"karyawan{i}{j}", email=f"karyawan{i}{j}@example.com", role="Karyawan", toko=toko
+                )
+            self.shops.append((toko, owner))
+        # A toko without an owner is left out
+        Toko.objects.create()
+
+        toko, owner = self.shops[2]
+        self._transaksi(toko, owner, "pemasukan", "Lunas", 1000)
+        self._transaksi(toko, owner, "pemasukan", "Belum Lunas", 300)
+        self._transaksi(toko, owner, "pengeluaran", "Belum Lunas", 200)
+        self._transaksi(toko, owner, "pemasukan", "Lunas", 5000, days_ago=45)
+        self._transaksi(toko, owner, "pemasukan", "Lunas", 9999, is_deleted=True)
+
+        access_token = str(RefreshToken.for_user(self.bpr).access_token)
+        self.headers = {"Authorization": f"Bearer {access_token}"}
+        get_principal(self.bpr.id)
+
+    def _transaksi(self, toko, owner, transaction_type, status, amount, days_ago=0, is_deleted=False):
+        transaksi = Transaksi.objects.create(
+            toko=toko,
+            created_by=owner,
+            transaction_type=transaction_type,
+            category="Pendapatan Lain-Lain",
+            total_amount=Decimal(amount),
+            amount=Decimal(amount),
+            status=status,
+            is_deleted=is_deleted,
+        )
+        if days_ago:
+            Transaksi.objects.filter(id=transaksi.id).update(
+                created_at=timezone.now() - timedelta(days=days_ago)
+            )
+        return transaksi
+
+    def test_portfolio_figures(self):
+        response = self.client.get("/bpr/portfolio", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertEqual(data["total"], 5)
+        top = data["items"][0]
+        self.assertEqual(top["id"], self.shops[2][0].id)
+        self.assertEqual(top["owner"], "owner2")
+        self.assertEqual(top["user_count"], 3)
+        self.assertEqual(top["revenue_30d"], 1300)
+        self.assertEqual(top["hutang"], 200)
+        self.assertEqual(top["piutang"], 300)
+        self.assertIsNotNone(top["last_activity"])
+        self.assertIsNone(data["items"][-1]["last_activity"])
+
+    def test_query_count_does_not_grow_with_shops(self):
+        # BPR lookup, count, page
+        with self.assertNumQueries(3):
+            self.client.get("/bpr/portfolio", headers=self.headers)
+
+        for i in range(10):
+            toko = Toko.objects.create()
+            User.objects.create_user(
+                username=f"extra{i}", email=f"extra{i}@example.com", role="Pemilik", toko=toko
+            )
+        cache.clear()
+        get_principal(self.bpr.id)
+        with self.assertNumQueries(3):
+            response = self.client.get("/bpr/portfolio?per_page=50", headers=self.headers)
+        self.assertEqual(response.json()["total"], 15)
+
+    def test_paging_and_sorting(self):
+        response = self.client.get("/bpr/portfolio?sort=user_count&per_page=2&page=2", headers=self.headers)
+        data = response.json()
+        self.assertEqual([item["user_count"] for item in data["items"]], [3, 4])
+        self.assertEqual(data["total_pages"], 3)
+
+        self.assertEqual(self.client.get("/bpr/portfolio?sort=nama", headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.get("/bpr/portfolio?page=9", headers=self.headers).status_code, 404)
+
+    def test_cached_until_a_transaction_is_written(self):
+        self.client.get("/bpr/portfolio", headers=self.headers)
+        # Only the BPR check; the portfolio itself comes from the cache
+        with self.assertNumQueries(1):
+            self.client.get("/bpr/portfolio", headers=self.headers)
+
+        toko, owner = self.shops[4]
+        with self.captureOnCommitCallbacks(execute=True):
+            self._transaksi(toko, owner, "pemasukan", "Lunas", 50000)
+
+        top = self.client.get("/bpr/portfolio", headers=self.headers).json()["items"][0]
+        self.assertEqual(top["id"], toko.id)
+        self.assertEqual(top["revenue_30d"], 50000)
+
+    def test_cached_page_survives_redis_serializers(self):
+        for name in ("json", "msgpack"):
+            with self.subTest(serializer=name):
+                cache.clear()
+                get_principal(self.bpr.id)
+                serializer = import_string(REDIS_SERIALIZERS[name])(options={})
+                set_, get_ = cache.set, cache.get
+
+                def is_page(key):
+                    return key.startswith("bpr:portfolio:") and key != PORTFOLIO_VERSION_KEY
+
+                # Portfolio pages go through the Redis serializer, everything else as usual
+                def serialized_set(key, value, *args, **kwargs):
+                    if is_page(key):
+                        value = serializer.dumps(value)
+                    return set_(key, value, *args, **kwargs)
+
+                def serialized_get(key, default=None, **kwargs):
+                    value = get_(key, default, **kwargs)
+                    if is_page(key) and value is not default:
+                        value = serializer.loads(value)
+                    return value
+
+                with patch.object(cache, "set", side_effect=serialized_set), patch.object(
+                    cache, "get", side_effect=serialized_get
+                ):
+                    miss = self.client.get("/bpr/portfolio", headers=self.headers)
+                    hit = self.client.get("/bpr/portfolio", headers=self.headers)
+
+                self.assertEqual(miss.status_code, 200)
+                self.assertEqual(hit.status_code, 200)
+                self.assertEqual(hit.json(), miss.json())
+                self.assertIsInstance(hit.json()["items"][0]["created_at"], str)
+
+    def test_non_bpr_is_rejected(self):
+        owner = self.shops[0][1]
+        access_token = str(RefreshToken.for_user(owner).access_token)
+        response = self.client.get("/bpr/portfolio", headers={"Authorization": f"Bearer {access_token}"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_unexpected_errors_are_not_reported_as_access_denied(self):
+        with patch.object(TokoRepository, "get_portfolio", side_effect=DatabaseError("boom")):
+            with self.assertRaises(DatabaseError):
+                BPRService.get_portfolio(self.bpr.id)
+
+        with self.assertLogs("authentication.services", "WARNING"):
+            self.assertEqual(BPRService.get_portfolio(999999), (None, "Access denied"))
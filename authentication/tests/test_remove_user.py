@@ -1,5 +1,5 @@
 import jwt
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.conf import settings
 from ninja.testing import TestClient
 
@@ -92,4 +92,20 @@ class RemoveUserFromTokoTests(TestCase):
             json={"user_id": non_existent_user_id},
             headers={"Authorization": f"Bearer {self.owner_token}"}
         )
-        self.assertEqual(response.status_code, 404)
\ No newline at end of file
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(AUTH_PRINCIPAL_CACHE_TIMEOUT=60)
+    def test_remove_user_evicts_cached_principal(self):
+        from authentication.security import get_principal
+
+        self.assertEqual(get_principal(self.karyawan.id).toko_id, self.toko.id)
+
+        self.client.post(
+            "/remove-user-from-toko",
+            json={"user_id": self.karyawan.id},
+            headers={"Authorization": f"Bearer {self.owner_token}"}
+        )
+
+        principal = get_principal(self.karyawan.id)
+        self.assertNotEqual(principal.toko_id, self.toko.id)
+        self.assertEqual(principal.role, "Pemilik")
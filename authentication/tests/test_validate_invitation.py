@@ -1,6 +1,6 @@
 import jwt
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils.timezone import now
 from ninja.testing import TestClient
 from datetime import timedelta
@@ -204,3 +204,43 @@ class ValidateInvitationTests(TestCase):
         self.assertEqual(updated_user.role, "Pengelola")
         self.assertEqual(updated_user.toko, self.toko)
 
+
+    @override_settings(AUTH_PRINCIPAL_CACHE_TIMEOUT=60)
+    def test_validate_invitation_evicts_cached_principal(self):
+        from authentication.security import get_principal
+
+        existing = User.objects.create_user(
+            username="existing_user",
+            email="existing@example.com",
+            password="password",
+            role="Karyawan",
+        )
+        self.assertIsNone(get_principal(existing.id).toko_id)
+
+        expiration = now() + timedelta(days=1)
+        token = jwt.encode(
+            {
+                "email": "existing@example.com",
+                "name": "Existing User",
+                "role": "Pengelola",
+                "toko_id": self.toko.id,
+                "exp": expiration,
+            },
+            settings.SECRET_KEY,
+            algorithm="HS256",
+        )
+        Invitation.objects.create(
+            email="existing@example.com",
+            name="Existing User",
+            role="Pengelola",
+            toko=self.toko,
+            created_by=self.owner,
+            token=token,
+            expires_at=expiration,
+        )
+
+        self.client.post("/validate-invitation", json={"token": token})
+
+        principal = get_principal(existing.id)
+        self.assertEqual(principal.role, "Pengelola")
+        self.assertEqual(principal.toko_id, self.toko.id)
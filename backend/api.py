@@ -1,16 +1,47 @@
+import hmac
 import os
+from django.conf import settings
+from django.http import HttpResponse
 from ninja import NinjaAPI
 from produk.api import router as produk_router
 from authentication.api import router as auth_router
 from transaksi.api import router as transaksi_router
 from laporan.api import router as laporan_router
+from produk.async_api import router as produk_async_router
+from transaksi.async_api import router as transaksi_async_router
+from core.api import router as dashboard_router
+from core.cache import cache_health
+from core.metrics import REGISTRY, TimedJSONRenderer
 
-api = NinjaAPI()
+api = NinjaAPI(renderer=TimedJSONRenderer())
 api.add_router("/auth/", auth_router)
 api.add_router("/produk", produk_router)
 api.add_router("/transaksi", transaksi_router)
 api.add_router("/laporan", laporan_router)
+api.add_router("/dashboard", dashboard_router)
+# Async variants of the dashboard/report reads, for ASGI deployments
+api.add_router("/async/produk", produk_async_router)
+api.add_router("/async/transaksi", transaksi_async_router)
 
 @api.get("/version")
 def get_version(request):
     return {"version": os.environ.get("APP_VERSION", "unknown")}
+
+def _has_metrics_token(request):
+    token = settings.METRICS_TOKEN
+    return not token or hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+
+@api.get("/health/cache", response={200: dict, 503: dict})
+def get_cache_health(request):
+    # Backend, key prefix and hit/miss stats only for the metrics scraper
+    report = cache_health()
+    status = 200 if report["ok"] else 503
+    if settings.METRICS_TOKEN and _has_metrics_token(request):
+        return status, report
+    return status, {"status": "ok" if report["ok"] else "degraded"}
+
+@api.get("/metrics", auth=None, include_in_schema=False)
+def get_metrics(request):
+    if not _has_metrics_token(request):
+        return HttpResponse(status=401)
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
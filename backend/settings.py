@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import environ
+import json
 import os
 import environ
 
@@ -42,9 +43,24 @@ SIMPLE_JWT = {
 
 BPR_EMAIL = os.environ.get('BPR_EMAIL', 'bprlancar@gmail.com')
 
+# Transaksi primary keys: time-ordered 10-char IDs. Each process picks a
+# random node id (0-15) and inserts retry the rare cross-process collision.
+# TRANSAKSI_ID_NODE pins the node of every process that reads it, so only
+# set it per process (never once for all workers of a host).
+TRANSAKSI_ID_GENERATOR = os.environ.get('TRANSAKSI_ID_GENERATOR', 'transaksi.ids.TimeOrderedIdGenerator')
+TRANSAKSI_ID_NODE = os.environ.get('TRANSAKSI_ID_NODE')
+
+# Most transactions one POST /transaksi/bulk (offline sync) may carry
+TRANSAKSI_BULK_MAX_ROWS = int(os.environ.get('TRANSAKSI_BULK_MAX_ROWS', 500))
+
 MEDIA_URL = 'api/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized product photos (produk.images): WEBP or JPEG, and encoder quality
+# (1-100). After changing the format run `manage.py backfill_produk_images --all`.
+PRODUK_IMAGE_FORMAT = os.environ.get('PRODUK_IMAGE_FORMAT', 'WEBP')
+PRODUK_IMAGE_QUALITY = int(os.environ.get('PRODUK_IMAGE_QUALITY', 80))
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 CORS_ALLOW_ALL_ORIGINS = True  # Allow all origins for simplicity, adjust as needed
@@ -95,6 +111,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'produk',
     'authentication',
     'transaksi',
@@ -107,7 +124,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'silk.middleware.SilkyMiddleware', 
+    'core.metrics.MetricsMiddleware',
+    'core.profiling.SampledSilkyMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -119,6 +137,23 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware'
 ]
 
+# Silk profiling is sampled (core.profiling). SILK_SAMPLE_RATE is the share
+# of requests (0-1) recorded in full; SILK_SAMPLE_ROUTES overrides it per path
+# prefix, as JSON ({"/api/transaksi": 0.1}). Staff users can force a capture
+# with "X-Silk-Profile: 1". Unsampled requests slower than SILK_SLOW_REQUEST_MS
+# (0: never) get a summary row. Rows older than SILK_RETENTION_DAYS or beyond
+# the newest SILK_MAX_RECORDED_REQUESTS are purged off the request path every
+# SILK_PURGE_INTERVAL seconds (0: only by `manage.py purge_silk`, e.g. from cron).
+SILKY_MIDDLEWARE_CLASS = 'core.profiling.SampledSilkyMiddleware'
+SILK_SAMPLE_RATE = float(os.environ.get('SILK_SAMPLE_RATE', 1.0 if ENV == 'local' else 0.01))
+SILK_SAMPLE_ROUTES = json.loads(os.environ.get('SILK_SAMPLE_ROUTES', '{}'))
+SILK_SLOW_REQUEST_MS = int(os.environ.get('SILK_SLOW_REQUEST_MS', 1000))
+SILK_RETENTION_DAYS = int(os.environ.get('SILK_RETENTION_DAYS', 7))
+SILK_MAX_RECORDED_REQUESTS = int(os.environ.get('SILK_MAX_RECORDED_REQUESTS', 10000))
+SILK_PURGE_INTERVAL = int(os.environ.get('SILK_PURGE_INTERVAL', 3600))
+# Silk's own cleanup runs on random requests; the purge above replaces it
+SILKY_MAX_RECORDED_REQUESTS_CHECK_PERCENT = 0
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -168,19 +203,76 @@ else:
         }
     }
     
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django_redis.cache.RedisCache",
-#         "LOCATION": "redis://127.0.0.1:6379/1",
-#         "OPTIONS": {
-#             "CLIENT_CLASS": "django_redis.client.DefaultClient",
-#             "SERIALIZER": "django_redis.serializers.json.JSONSerializer",
-#             "COMPRESSOR": "django_redis.compressors.zlib.ZlibCompressor",
-#         }
-#     }
-# }
-
-SESSION_ENGINE = "django.contrib.sessions.backends.cache"
+# Cache tier: locmem (per process, default), file or db (shared by the
+# workers of one host; db needs `manage.py createcachetable`) or redis
+# (shared across hosts; picked automatically when REDIS_URL is set)
+from core.cache_config import SHARED_BACKENDS, build_caches, session_engine
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or ('redis' if os.environ.get('REDIS_URL') else 'locmem')
+CACHES = build_caches(
+    backend=CACHE_BACKEND,
+    location=os.environ.get('CACHE_LOCATION') or (
+        os.environ.get('REDIS_URL') if CACHE_BACKEND == 'redis'
+        else os.path.join(BASE_DIR, '.cache') if CACHE_BACKEND == 'file'
+        else None
+    ),
+    # Keeps staging and production apart when they share one Redis
+    key_prefix=os.environ.get('CACHE_KEY_PREFIX', f'pos-{ENV}'),
+    timeout=int(os.environ.get('CACHE_TIMEOUT', 300)),
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+    # Redis only: json keeps entries readable from other tools
+    serializer=os.environ.get('CACHE_SERIALIZER', 'json'),
+    compressor=os.environ.get('CACHE_COMPRESSOR', 'zlib'),
+    socket_timeout=float(os.environ.get('CACHE_SOCKET_TIMEOUT', 2)),
+    ignore_exceptions=os.environ.get('CACHE_IGNORE_EXCEPTIONS', 'True').lower() == 'true',
+)
+
+# ETag/304 support of core.conditional. Its validators come from the toko
+# version in the default cache, which a locmem cache only bumps in the
+# worker that handled the write; the others would keep answering 304, so
+# it is off unless the cache is shared
+CONDITIONAL_GET_ENABLED = os.environ.get(
+    'CONDITIONAL_GET_ENABLED', str(CACHE_BACKEND in SHARED_BACKENDS)
+).lower() == 'true'
+
+# Seconds an authenticated user's id/toko/role stays cached between requests.
+# Removing a user only evicts it from the cache of the worker that handled
+# the removal, so with a per-process cache it defaults to 0 (not cached)
+AUTH_PRINCIPAL_CACHE_TIMEOUT = int(os.environ.get(
+    'AUTH_PRINCIPAL_CACHE_TIMEOUT', 60 if CACHE_BACKEND in SHARED_BACKENDS else 0
+))
+
+# Seconds a cached dashboard response (core.cache.cached_per_toko) may live;
+# product and transaction writes invalidate it sooner. Like the ETags above,
+# that invalidation only reaches every worker through a shared cache, so
+# it defaults to 0 (not cached) otherwise
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get(
+    'RESPONSE_CACHE_TIMEOUT', 300 if CACHE_BACKEND in SHARED_BACKENDS else 0
+))
+
+# Seconds a BPR portfolio page stays cached; transaksi and user writes
+# invalidate it sooner. 0 (not cached) by default unless the cache is shared
+BPR_PORTFOLIO_CACHE_TIMEOUT = int(os.environ.get(
+    'BPR_PORTFOLIO_CACHE_TIMEOUT', 300 if CACHE_BACKEND in SHARED_BACKENDS else 0
+))
+
+# Threads (and so database connections) one /api/dashboard?parallel=true
+# request may use
+DASHBOARD_MAX_WORKERS = int(os.environ.get('DASHBOARD_MAX_WORKERS', 4))
+
+# Per-route query/latency histograms (core.metrics), served at /api/metrics.
+# Set METRICS_TOKEN to require "Authorization: Bearer <token>" from the scraper;
+# /api/health/cache only shows its details to that token, others get ok/degraded.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Views over their core.metrics.query_budget raise instead of logging a
+# warning. Test runs switch it on (core.test_runner, conftest.py) so an N+1
+# regression fails them
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False').lower() == 'true'
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+SESSION_ENGINE = session_engine(CACHE_BACKEND)
 SESSION_CACHE_ALIAS = "default"
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -231,6 +323,12 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 
+# Let the frontend read the validators of core.conditional and send them back
+from corsheaders.defaults import default_headers
+
+CORS_EXPOSE_HEADERS = ["ETag", "Last-Modified"]
+CORS_ALLOW_HEADERS = [*default_headers, "if-none-match", "if-modified-since", "x-silk-profile"]
+
 # User Auth
 AUTH_USER_MODEL = "authentication.User"
 
@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _test_checks(django_test_environment):
+    # pytest-django does not go through TEST_RUNNER
+    from django.conf import settings
+
+    if settings.configured:
+        from core.test_runner import enable_test_checks
+
+        enable_test_checks()
@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Optional
+
+from ninja import Router
+
+from authentication.security import AuthBearer
+from core.conditional import conditional_per_toko
+from core.metrics import query_budget
+from core.dashboard import WIDGETS, DashboardContext, build_dashboard
+
+router = Router(auth=AuthBearer())
+
+
+@router.get("", response={200: dict, 400: dict, 404: dict})
+@query_budget(8)
+@conditional_per_toko()
+def get_dashboard(
+    request,
+    widgets: str = None,
+    month: int = None,
+    year: int = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    parallel: bool = False,
+):
+    """
+    All home-screen widgets in one round-trip.
+
+    ``widgets`` is a comma-separated subset of the widget names (default:
+    all of them); ``month``/``year`` apply to monthly_summary and top_selling
+    (default: the current month), ``start_date``/``end_date`` to aruskas.
+    """
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    names = [name.strip() for name in widgets.split(",") if name.strip()] if widgets else list(WIDGETS)
+    unknown = [name for name in names if name not in WIDGETS]
+    if unknown:
+        return 400, {"message": f"Unknown widgets: {', '.join(unknown)}. Available: {', '.join(WIDGETS)}"}
+
+    if month is None or year is None:
+        now = datetime.now()
+        month, year = now.month, now.year
+
+    context = DashboardContext(
+        toko_id=principal.toko_id,
+        month=month,
+        year=year,
+        start_date=start_date,
+        end_date=end_date,
+    )
+    return 200, build_dashboard(context, list(dict.fromkeys(names)), parallel=parallel)
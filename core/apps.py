@@ -1,6 +1,12 @@
 # core/apps.py
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'core'
\ No newline at end of file
+    name = 'core'
+
+    def ready(self):
+        from core.metrics import install_query_timer
+
+        connection_created.connect(install_query_timer)
@@ -0,0 +1,186 @@
+import hashlib
+import inspect
+import json
+import time
+import uuid
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from ninja.responses import NinjaJSONEncoder
+
+from core.cache_config import CACHE_BACKENDS
+
+# Endpoint names wrapped by ``cached_per_toko``, for the hit/miss report
+CACHED_ENDPOINTS = set()
+
+
+def _version_key(toko_id):
+    return f"toko:{toko_id}:version"
+
+
+def toko_version(toko_id):
+    """Current data version of a toko; every cached response key embeds it."""
+    return cache.get_or_set(_version_key(toko_id), time.time_ns(), None)
+
+
+def bump_toko_version(toko_id):
+    """
+    Invalidate every cached response of a toko in O(1).
+
+    Old entries are not deleted, their keys are simply never built again and
+    they expire on their own timeout.
+    """
+    cache.set(_version_key(toko_id), time.time_ns(), None)
+
+
+def _count(name, outcome):
+    key = f"resp:stats:{name}:{outcome}"
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr; losing one count is fine
+        pass
+
+
+def response_cache_stats():
+    """``{endpoint: {"hits": n, "misses": n}}`` for every cached endpoint."""
+    names = sorted(CACHED_ENDPOINTS)
+    values = cache.get_many([f"resp:stats:{name}:{outcome}" for name in names for outcome in ("hit", "miss")])
+    return {
+        name: {
+            "hits": values.get(f"resp:stats:{name}:hit", 0),
+            "misses": values.get(f"resp:stats:{name}:miss", 0),
+        }
+        for name in names
+    }
+
+
+def cache_health():
+    """
+    Round-trip a throwaway key through the default cache.
+
+    Returns the configured backend and key prefix, whether set/get/delete
+    worked, their latency in milliseconds and the response cache hit/miss
+    counters. Backend errors are reported, not raised.
+    """
+    config = settings.CACHES["default"]
+    report = {
+        "backend": config["BACKEND"].rsplit(".", 1)[-1],
+        "key_prefix": config.get("KEY_PREFIX", ""),
+        "shared": config["BACKEND"] != CACHE_BACKENDS["locmem"],
+        "ok": False,
+        "latency_ms": None,
+        "error": None,
+        "stats": {},
+    }
+
+    key = f"health:{uuid.uuid4().hex}"
+    value = uuid.uuid4().hex
+    started = time.perf_counter()
+    try:
+        cache.set(key, value, 10)
+        report["ok"] = cache.get(key) == value
+        cache.delete(key)
+        report["stats"] = response_cache_stats()
+    except Exception as e:
+        report["error"] = str(e)
+    report["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    if not report["ok"] and report["error"] is None:
+        report["error"] = "Value written to the cache could not be read back"
+    return report
+
+
+def _response_key(name, request, args, kwargs):
+    toko_id = getattr(request.auth, "toko_id", None)
+    if not toko_id:
+        return None
+    params = json.dumps(
+        [args, sorted(kwargs.items()), sorted(request.GET.lists())],
+        cls=NinjaJSONEncoder,
+        sort_keys=True,
+    )
+    digest = hashlib.md5(params.encode()).hexdigest()
+    return f"resp:{toko_id}:{toko_version(toko_id)}:{name}:{digest}"
+
+
+def _cacheable(result):
+    """``(status, rendered body)`` of a 200 result, ``None`` for anything else."""
+    status, body = result if isinstance(result, tuple) else (200, result)
+    if status != 200:
+        return None
+    return [status, json.loads(json.dumps(body, cls=NinjaJSONEncoder))]
+
+
+def cached_per_toko(timeout=None):
+    """
+    Cache a read endpoint's 200 responses per toko.
+
+    The key is built from the toko id, the endpoint, its parameters (path,
+    query and raw ``request.GET``) and the toko's data version, so product
+    and transaction writes invalidate everything for that toko at once via
+    ``bump_toko_version``. Requests without a toko are not cached. Bodies are
+    stored as rendered JSON, so any cache backend/serializer works. Works on
+    both sync and ``async def`` handlers. A ``timeout`` (by default
+    ``RESPONSE_CACHE_TIMEOUT``) of 0 turns the cache off.
+    """
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__name__}"
+        CACHED_ENDPOINTS.add(name)
+
+        def entry_timeout():
+            return settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not entry_timeout():
+                    return await func(request, *args, **kwargs)
+                # The key needs the (possibly DB-backed) version counter
+                key = await sync_to_async(_response_key)(name, request, args, kwargs)
+                if key is None:
+                    return await func(request, *args, **kwargs)
+
+                cached = await cache.aget(key)
+                if cached is not None:
+                    await sync_to_async(_count)(name, "hit")
+                    status, body = cached
+                    return status, body
+
+                await sync_to_async(_count)(name, "miss")
+                result = await func(request, *args, **kwargs)
+                entry = _cacheable(result)
+                if entry is not None:
+                    await cache.aset(key, entry, entry_timeout())
+                return result
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(request, *args, **kwargs):
+            if not entry_timeout():
+                return func(request, *args, **kwargs)
+            key = _response_key(name, request, args, kwargs)
+            if key is None:
+                return func(request, *args, **kwargs)
+
+            cached = cache.get(key)
+            if cached is not None:
+                _count(name, "hit")
+                status, body = cached
+                return status, body
+
+            _count(name, "miss")
+            result = func(request, *args, **kwargs)
+            entry = _cacheable(result)
+            if entry is not None:
+                cache.set(key, entry, entry_timeout())
+            return result
+
+        return wrapper
+
+    return decorator
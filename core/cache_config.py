@@ -0,0 +1,95 @@
+from django.core.exceptions import ImproperlyConfigured
+
+# Plain helpers for settings.py; nothing here may import app code.
+
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "db": "django.core.cache.backends.db.DatabaseCache",
+    "redis": "django_redis.cache.RedisCache",
+}
+
+# Backends whose entries are visible to every worker process
+SHARED_BACKENDS = {"file", "db", "redis"}
+
+REDIS_SERIALIZERS = {
+    "json": "django_redis.serializers.json.JSONSerializer",
+    "pickle": "django_redis.serializers.pickle.PickleSerializer",
+    "msgpack": "django_redis.serializers.msgpack.MSGPackSerializer",
+}
+
+REDIS_COMPRESSORS = {
+    "none": "django_redis.compressors.identity.IdentityCompressor",
+    "zlib": "django_redis.compressors.zlib.ZlibCompressor",
+    "lzma": "django_redis.compressors.lzma.LzmaCompressor",
+    "lz4": "django_redis.compressors.lz4.Lz4Compressor",
+    "zstd": "django_redis.compressors.zstd.ZStdCompressor",
+}
+
+
+def _choice(name, value, choices):
+    if value not in choices:
+        raise ImproperlyConfigured(f"{name}={value!r}, expected one of: {', '.join(sorted(choices))}")
+    return choices[value]
+
+
+def build_caches(
+    backend="locmem",
+    location=None,
+    key_prefix="",
+    timeout=300,
+    max_entries=10000,
+    serializer="json",
+    compressor="zlib",
+    socket_timeout=2,
+    ignore_exceptions=False,
+):
+    """
+    ``CACHES`` for one of the ``CACHE_BACKENDS`` tiers.
+
+    ``locmem`` is per process; ``file`` (a directory) and ``db`` (a table
+    made by ``createcachetable``) are shared by the workers of one host;
+    ``redis`` (a URL) is shared across hosts and is the only tier that uses
+    ``serializer``/``compressor`` and the socket options. ``ignore_exceptions``
+    makes an unreachable Redis behave like cache misses instead of 500s.
+    """
+    config = {
+        "BACKEND": _choice("CACHE_BACKEND", backend, CACHE_BACKENDS),
+        "KEY_PREFIX": key_prefix,
+        "TIMEOUT": timeout,
+    }
+
+    if backend == "redis":
+        if not location:
+            raise ImproperlyConfigured("The redis cache needs REDIS_URL or CACHE_LOCATION")
+        config["LOCATION"] = location
+        config["OPTIONS"] = {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "SERIALIZER": _choice("CACHE_SERIALIZER", serializer, REDIS_SERIALIZERS),
+            "COMPRESSOR": _choice("CACHE_COMPRESSOR", compressor, REDIS_COMPRESSORS),
+            "SOCKET_CONNECT_TIMEOUT": socket_timeout,
+            "SOCKET_TIMEOUT": socket_timeout,
+            "IGNORE_EXCEPTIONS": ignore_exceptions,
+        }
+    else:
+        if backend == "file":
+            if not location:
+                raise ImproperlyConfigured("The file cache needs CACHE_LOCATION (a directory)")
+            config["LOCATION"] = str(location)
+        elif backend == "db":
+            config["LOCATION"] = location or "pos_cache"
+        elif location:
+            config["LOCATION"] = location
+        config["OPTIONS"] = {"MAX_ENTRIES": max_entries}
+
+    return {"default": config}
+
+
+def session_engine(backend):
+    """
+    Cache-only sessions when every worker sees the same cache, otherwise
+    write through to the database so a login survives hitting another worker.
+    """
+    if backend in SHARED_BACKENDS:
+        return "django.contrib.sessions.backends.cache"
+    return "django.contrib.sessions.backends.cached_db"
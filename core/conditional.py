@@ -0,0 +1,173 @@
+import hashlib
+import inspect
+import json
+import time
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBase, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from ninja.responses import NinjaJSONEncoder
+
+from core.cache import toko_version
+
+# Conditional GET for read endpoints. Validators come from the toko's data
+# version (``core.cache.toko_version``, bumped after every product and
+# transaction write), never from the rendered body, so a matching
+# ``If-None-Match`` / ``If-Modified-Since`` costs one cache read and skips
+# the handler, its queries and serialization altogether. That version is
+# only coherent across workers when the cache is shared, so everything here
+# is skipped unless ``CONDITIONAL_GET_ENABLED`` (see settings).
+
+
+def _principal_toko(request, kwargs):
+    return getattr(request.auth, "toko_id", None)
+
+
+def bpr_shop(request, kwargs):
+    """Toko of the ``/bpr/shop/{shop_id}/...`` routes; only BPR users get validators."""
+    if getattr(request.auth, "is_bpr", False):
+        return kwargs.get("shop_id")
+    return None
+
+
+def validators(name, request, toko_id, args, kwargs):
+    """``(etag, last_modified)`` of an endpoint's response for this request, without running it."""
+    version = toko_version(toko_id)
+    # Reports relative to today (debt aging, "this month") change at midnight too
+    today = timezone.localdate()
+    params = json.dumps(
+        [
+            name,
+            toko_id,
+            version,
+            today,
+            getattr(request.auth, "user_id", None),
+            args,
+            sorted(kwargs.items()),
+            sorted(request.GET.lists()),
+        ],
+        cls=NinjaJSONEncoder,
+        sort_keys=True,
+    )
+    etag = f'W/"{hashlib.md5(params.encode()).hexdigest()}"'
+
+    # The version is a time.time_ns() stamp. HTTP dates have whole seconds, so
+    # one is only sent once its second is over: any later write then lands in
+    # a later second and ``If-Modified-Since`` can never hide it.
+    midnight = timezone.make_aware(datetime.combine(today, datetime.min.time())).timestamp()
+    modified = int(max(version / 1e9, midnight))
+    last_modified = modified if modified < int(time.time()) else None
+    return etag, last_modified
+
+
+def etag_matches(request, etag):
+    """Whether the request's ``If-None-Match`` matches ``etag``; ``None`` without the header."""
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    if not if_none_match:
+        return None
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match
+    opaque = etag.removeprefix("W/")
+    return if_none_match == ["*"] or any(tag.removeprefix("W/") == opaque for tag in if_none_match)
+
+
+def _not_modified(request, etag, last_modified):
+    matches = etag_matches(request, etag)
+    if matches is not None:
+        return matches
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return if_modified_since is not None and last_modified is not None and last_modified <= if_modified_since
+
+
+def _set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Per user, and always revalidated: a 304 is cheaper than a stale dashboard
+    response["Cache-Control"] = "private, no-cache"
+
+
+def _status(result):
+    if isinstance(result, HttpResponseBase):
+        return result.status_code
+    return result[0] if isinstance(result, tuple) else 200
+
+
+def conditional_per_toko(toko=None):
+    """
+    Add ``ETag``/``Last-Modified`` to a read endpoint's 200 responses and
+    answer ``304 Not Modified`` when the client already has them.
+
+    ``toko(request, kwargs)`` picks the toko whose data the response shows
+    (default: the caller's own); requests without one are served as usual.
+    Works on both sync and ``async def`` handlers; stack it above
+    ``cached_per_toko``, a revalidated request needs neither. Direct calls
+    (one handler delegating to another) pass straight through, as does
+    everything while ``CONDITIONAL_GET_ENABLED`` is off.
+    """
+    toko_for = toko or _principal_toko
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__name__}"
+
+        # Ninja hands its response object to a parameter annotated HttpResponse,
+        # which is how the headers reach a handler that returns plain data
+        signature = inspect.signature(func)
+        parameters = list(signature.parameters.values())
+        parameters.insert(
+            len([p for p in parameters if p.kind != p.VAR_KEYWORD]),
+            inspect.Parameter("conditional_response", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=HttpResponse),
+        )
+
+        def respond(request, etag, last_modified):
+            if etag is not None and _not_modified(request, etag, last_modified):
+                response = HttpResponseNotModified()
+                _set_validators(response, etag, last_modified)
+                return response
+            return None
+
+        def finish(result, response, etag, last_modified):
+            if etag is not None and _status(result) == 200:
+                _set_validators(result if isinstance(result, HttpResponseBase) else response, etag, last_modified)
+            return result
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(request, *args, conditional_response=None, **kwargs):
+                if conditional_response is None or not settings.CONDITIONAL_GET_ENABLED:
+                    return await func(request, *args, **kwargs)
+                toko_id = toko_for(request, kwargs)
+                etag = last_modified = None
+                if toko_id:
+                    etag, last_modified = await sync_to_async(validators)(name, request, toko_id, args, kwargs)
+                not_modified = respond(request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+                result = await func(request, *args, **kwargs)
+                return finish(result, conditional_response, etag, last_modified)
+
+            async_wrapper.__signature__ = signature.replace(parameters=parameters)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(request, *args, conditional_response=None, **kwargs):
+            if conditional_response is None or not settings.CONDITIONAL_GET_ENABLED:
+                return func(request, *args, **kwargs)
+            toko_id = toko_for(request, kwargs)
+            etag = last_modified = None
+            if toko_id:
+                etag, last_modified = validators(name, request, toko_id, args, kwargs)
+            not_modified = respond(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+            result = func(request, *args, **kwargs)
+            return finish(result, conditional_response, etag, last_modified)
+
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,122 @@
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+
+from laporan import queries as laporan_queries
+from produk import queries as produk_queries
+from produk.models import Produk
+from transaksi import queries as transaksi_queries
+from transaksi.aggregates import bucket_sums
+
+logger = logging.getLogger(__name__)
+
+# Widget name -> function(DashboardContext) returning the widget's payload;
+# a ValueError becomes a 400 for that widget only
+WIDGETS = {}
+
+
+@dataclass(frozen=True)
+class DashboardContext:
+    """Everything a widget may need, resolved once per dashboard request."""
+
+    toko_id: int
+    month: int
+    year: int
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+
+def widget(name):
+    def register(func):
+        WIDGETS[name] = func
+        return func
+
+    return register
+
+
+@widget("monthly_summary")
+def _monthly_summary(context):
+    rows, buckets = transaksi_queries.monthly_summary_query(context.toko_id, context.month, context.year)
+    return transaksi_queries.monthly_summary_payload(bucket_sums(rows, buckets, default=0))
+
+
+@widget("debt_summary")
+def _debt_summary(context):
+    sums = bucket_sums(transaksi_queries.unpaid_transactions(context.toko_id), transaksi_queries.DEBT_BUCKETS)
+    return transaksi_queries.debt_summary_payload(sums)
+
+
+@widget("most_popular")
+def _most_popular(context):
+    rows = list(produk_queries.most_popular_query(context.toko_id))
+    products = Produk.objects.in_bulk([row["product__id"] for row in rows])
+    return produk_queries.most_popular_payload(rows, products)
+
+
+@widget("low_stock")
+def _low_stock(context):
+    return produk_queries.low_stock_payload(produk_queries.low_stock_query(context.toko_id))
+
+
+@widget("top_selling")
+def _top_selling(context):
+    if context.month < 1 or context.month > 12:
+        raise ValueError("Month must be between 1 and 12")
+    return produk_queries.top_selling_payload(
+        produk_queries.top_selling_query(context.toko_id, context.year, context.month)
+    )
+
+
+@widget("aruskas")
+def _aruskas(context):
+    return laporan_queries.aruskas_report(context.toko_id, context.start_date, context.end_date)
+
+
+def _run(name, context, in_thread=False):
+    started = time.perf_counter()
+    try:
+        result = {"status": 200, "data": WIDGETS[name](context)}
+    except ValueError as e:
+        result = {"status": 400, "message": str(e)}
+    except Exception:
+        logger.exception("Dashboard widget %s failed", name)
+        result = {"status": 500, "message": "Widget failed"}
+    finally:
+        if in_thread:
+            # Worker threads open their own connection; don't leak it
+            connection.close()
+    result["ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def build_dashboard(context, names, parallel=False):
+    """
+    ``{"widgets": {name: {"status", "data" | "message", "ms"}}, "ms": total}``.
+
+    With ``parallel`` the widgets run on up to ``DASHBOARD_MAX_WORKERS``
+    threads, each with its own database connection; otherwise they run one
+    after another on the request's connection. A failing widget does not
+    fail the others.
+    """
+    started = time.perf_counter()
+    if parallel and len(names) > 1:
+        workers = min(len(names), settings.DASHBOARD_MAX_WORKERS)
+        # Each widget gets a copy of the request's context, so its queries
+        # still count towards the request's metrics (core.metrics)
+        jobs = [(contextvars.copy_context(), name) for name in names]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda job: job[0].run(_run, job[1], context, in_thread=True), jobs))
+    else:
+        results = [_run(name, context) for name in names]
+
+    return {
+        "widgets": dict(zip(names, results)),
+        "ms": round((time.perf_counter() - started) * 1000, 2),
+    }
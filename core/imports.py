@@ -0,0 +1,138 @@
+import csv
+import io
+import posixpath
+import re
+import zipfile
+import zlib
+from xml.etree.ElementTree import ParseError, iterparse
+
+IMPORT_FORMATS = ("csv", "xlsx")
+
+# What a damaged archive raises while it is being read; reported as ValueError
+_ARCHIVE_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, KeyError, ParseError)
+
+_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_DOC_RELS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+def import_format(filename, requested=None):
+    """``requested`` or the extension of ``filename``; raises ``ValueError`` for anything else."""
+    name = (requested or posixpath.splitext(filename or "")[1].lstrip(".")).lower()
+    if name not in IMPORT_FORMATS:
+        raise ValueError("File must be csv or xlsx")
+    return name
+
+
+def csv_rows(file):
+    """
+    Yield each row of a binary CSV file as a list of strings, lazily.
+
+    UTF-8 with or without BOM; the delimiter (``,``, ``;`` or tab, as
+    spreadsheet apps in different locales write them) is sniffed. A file
+    that turns out not to be UTF-8 or valid CSV part way through raises
+    ``ValueError`` when that part is reached.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    reader = None
+    try:
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(text, dialect)
+        yield from reader
+    except UnicodeDecodeError as e:
+        raise ValueError("File is not UTF-8 text") from e
+    except csv.Error as e:
+        raise ValueError(f"Invalid CSV at line {reader.line_num}: {e}") from e
+
+
+def _column(reference):
+    """0-based column of a cell reference such as ``AB12``."""
+    match = re.match(r"[A-Z]+", reference)
+    if match is None:
+        raise ValueError(f"Invalid cell reference {reference!r}")
+    letters = match.group()
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number - 1
+
+
+def _first_sheet(archive):
+    for _, element in iterparse(archive.open("xl/workbook.xml")):
+        if element.tag == f"{_MAIN}sheet":
+            relation = element.get(f"{_DOC_RELS}id")
+            break
+    else:
+        raise ValueError("Workbook has no sheets")
+    for _, element in iterparse(archive.open("xl/_rels/workbook.xml.rels")):
+        if element.tag == f"{_RELS}Relationship" and element.get("Id") == relation:
+            target = element.get("Target")
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath(f"xl/{target}")
+    raise ValueError("Workbook sheet not found")
+
+
+def _shared_strings(archive):
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    for _, element in iterparse(archive.open("xl/sharedStrings.xml")):
+        if element.tag == f"{_MAIN}si":
+            strings.append("".join(text.text or "" for text in element.iter(f"{_MAIN}t")))
+            element.clear()
+    return strings
+
+
+def xlsx_rows(file):
+    """
+    Yield each row of the first sheet of an XLSX file as a list of strings.
+
+    The sheet is parsed as a stream (only shared strings are held in
+    memory); empty cells come back as ``""``. A damaged archive or sheet
+    raises ``ValueError`` when the damage is reached.
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+        sheet = _first_sheet(archive)
+        strings = _shared_strings(archive)
+    except _ARCHIVE_ERRORS as e:
+        raise ValueError("Not a valid xlsx file") from e
+
+    try:
+        yield from _sheet_rows(archive, sheet, strings)
+    except (*_ARCHIVE_ERRORS, IndexError, ValueError) as e:
+        # IndexError/ValueError: a shared string or cell reference that doesn't exist
+        raise ValueError("Not a valid xlsx file") from e
+
+
+def _sheet_rows(archive, sheet, strings):
+    with archive, archive.open(sheet) as stream:
+        for _, element in iterparse(stream):
+            if element.tag != f"{_MAIN}row":
+                continue
+            row = []
+            for cell in element.iter(f"{_MAIN}c"):
+                reference = cell.get("r")
+                if reference:
+                    row.extend([""] * (_column(reference) - len(row)))
+                cell_type = cell.get("t")
+                if cell_type == "inlineStr":
+                    value = "".join(text.text or "" for text in cell.iter(f"{_MAIN}t"))
+                else:
+                    value = cell.findtext(f"{_MAIN}v") or ""
+                    if cell_type == "s" and value:
+                        value = strings[int(value)]
+                row.append(value)
+            element.clear()
+            yield row
+
+
+def read_rows(file, import_format):
+    """Rows of an uploaded CSV or XLSX file, as lists of strings."""
+    if import_format == "xlsx":
+        return xlsx_rows(file)
+    return csv_rows(file)
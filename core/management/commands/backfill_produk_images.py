@@ -0,0 +1,40 @@
+# core/management/commands/backfill_produk_images.py
+
+from django.core.management.base import BaseCommand
+
+from produk import images
+from produk.models import Produk
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the resized photo variants (produk.images) of products uploaded "
+        "before them, so responses link the variants instead of the redirect to the original"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--toko", type=int, help="Only this toko id (default: all tokos)")
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Also check products that have variants and rebuild missing files "
+            "(e.g. after changing PRODUK_IMAGE_FORMAT)",
+        )
+
+    def handle(self, *args, **options):
+        products = Produk.objects.exclude(foto="").only("id", "toko_id", "foto", "foto_hash").order_by("id")
+        if options.get("toko"):
+            products = products.filter(toko_id=options["toko"])
+        if not options["all"]:
+            products = products.filter(foto_hash="")
+
+        done = failed = 0
+        for produk in products.iterator(chunk_size=500):
+            try:
+                images.generate_variants(produk)
+                done += 1
+            except (ValueError, OSError) as e:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f"produk {produk.id}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} products, {failed} failed"))
@@ -0,0 +1,192 @@
+# core/management/commands/benchmark_indexes.py
+
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from authentication.models import Toko, User
+from laporan.models import ArusKasReport, DetailArusKas
+from produk.models import KategoriProduk, Produk
+from transaksi.ids import new_transaksi_id
+from transaksi.models import Transaksi, TransaksiItem
+
+# Models whose Meta.indexes are dropped for the "before" run
+INDEXED_MODELS = [Transaksi, TransaksiItem, DetailArusKas]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds N transactions, then prints EXPLAIN plans and timings of the hot "
+        "toko/date/status queries with and without the composite indexes. "
+        "Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000_000, help="Transactions to seed (default: 10M)")
+        parser.add_argument("--toko", type=int, default=100, help="Number of tokos to spread rows over")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query (median is reported)")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            toko_id, report_id = self.seed(options["rows"], options["toko"], options["batch_size"])
+            self.analyze()
+
+            queries = self.queries(toko_id, report_id)
+            after = {name: self.measure(qs, options["repeat"]) for name, qs in queries}
+
+            self.drop_indexes()
+            self.analyze()
+            before = {name: self.measure(qs, options["repeat"]) for name, qs in queries}
+
+            # Benchmark data and dropped indexes never stick around
+            transaction.set_rollback(True)
+
+        for name, _ in queries:
+            self.stdout.write(self.style.SUCCESS(name))
+            for label, (plan, elapsed) in (("before", before[name]), ("after", after[name])):
+                self.stdout.write(f"  {label}: {elapsed * 1000:.2f} ms")
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+    def seed(self, rows, toko_count, batch_size):
+        user = User.objects.create_user(email="benchmark-indexes@example.com", username="benchmark")
+        tokos = Toko.objects.bulk_create(Toko() for _ in range(toko_count))
+        kategori = {toko.id: KategoriProduk.objects.create(nama="Benchmark", toko=toko) for toko in tokos}
+        products = {
+            toko.id: Produk.objects.bulk_create(
+                Produk(
+                    nama=f"Produk {i}",
+                    toko=toko,
+                    kategori=kategori[toko.id],
+                    harga_modal=1000,
+                    harga_jual=1500,
+                    stok=0,
+                    satuan="Pcs",
+                )
+                for i in range(20)
+            )
+            for toko in tokos
+        }
+        reports = {
+            toko.id: ArusKasReport.objects.create(toko=toko, bulan=timezone.now().month, tahun=timezone.now().year)
+            for toko in tokos
+        }
+
+        # created_at is auto_now_add; spread it over two years instead
+        created_at = Transaksi._meta.get_field("created_at")
+        created_at.auto_now_add = False
+        try:
+            now = timezone.now()
+            seeded = 0
+            while seeded < rows:
+                transactions, items, details = [], [], []
+                for _ in range(min(batch_size, rows - seeded)):
+                    toko = random.choice(tokos)
+                    penjualan = random.random() < 0.6
+                    transaksi = Transaksi(
+                        id=new_transaksi_id(Transaksi),
+                        toko=toko,
+                        created_by=user,
+                        transaction_type="pemasukan" if penjualan or random.random() < 0.5 else "pengeluaran",
+                        category="Penjualan Barang" if penjualan else "Biaya Operasional",
+                        total_amount=Decimal("1500"),
+                        total_modal=Decimal("1000"),
+                        amount=Decimal("1500"),
+                        status="Belum Lunas" if random.random() < 0.1 else "Lunas",
+                        is_deleted=random.random() < 0.05,
+                        created_at=now - timedelta(minutes=random.randrange(60 * 24 * 730)),
+                    )
+                    transactions.append(transaksi)
+                    if penjualan:
+                        items.append(
+                            TransaksiItem(
+                                transaksi=transaksi,
+                                product=random.choice(products[toko.id]),
+                                quantity=random.randint(1, 5),
+                                harga_jual_saat_transaksi=Decimal("1500"),
+                                harga_modal_saat_transaksi=Decimal("1000"),
+                            )
+                        )
+                    details.append(
+                        DetailArusKas(
+                            report=reports[toko.id],
+                            transaksi=transaksi,
+                            jenis="inflow" if transaksi.transaction_type == "pemasukan" else "outflow",
+                            nominal=transaksi.amount,
+                            kategori=transaksi.category,
+                            tanggal_transaksi=transaksi.created_at,
+                        )
+                    )
+                Transaksi.objects.bulk_create(transactions)
+                TransaksiItem.objects.bulk_create(items)
+                DetailArusKas.objects.bulk_create(details)
+                seeded += len(transactions)
+                self.stdout.write(f"seeded {seeded}/{rows}", ending="\r")
+        finally:
+            created_at.auto_now_add = True
+        self.stdout.write("")
+
+        return tokos[0].id, reports[tokos[0].id].id
+
+    def queries(self, toko_id, report_id):
+        end = timezone.now()
+        start = end - timedelta(days=30)
+        live = Transaksi.objects.filter(toko_id=toko_id, is_deleted=False)
+        return [
+            ("transaction list (page 1)", live.order_by("-created_at")[:10]),
+            (
+                "transactions in date range",
+                live.filter(created_at__gte=start, created_at__lt=end).order_by("-created_at"),
+            ),
+            (
+                "debt summary",
+                live.filter(status="Belum Lunas").values("transaction_type").annotate(total=Sum("total_amount")).order_by(),
+            ),
+            (
+                "cash-flow details in date range",
+                DetailArusKas.objects.filter(
+                    report_id=report_id, tanggal_transaksi__gte=start, tanggal_transaksi__lt=end
+                ),
+            ),
+            (
+                "top products in date range",
+                TransaksiItem.objects.filter(
+                    transaksi__toko_id=toko_id,
+                    transaksi__is_deleted=False,
+                    transaksi__category="Penjualan Barang",
+                    transaksi__created_at__gte=start,
+                    transaksi__created_at__lt=end,
+                )
+                .values("product_id")
+                .annotate(sold=Sum("quantity"))
+                .order_by("-sold")[:3],
+            ),
+        ]
+
+    def measure(self, queryset, repeat):
+        options = {"analyze": True} if connection.vendor == "postgresql" else {}
+        plan = queryset.explain(**options)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())  # fresh clone, no result cache
+            timings.append(time.perf_counter() - started)
+        return plan, statistics.median(timings)
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
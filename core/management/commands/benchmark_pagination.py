@@ -0,0 +1,132 @@
+# core/management/commands/benchmark_pagination.py
+
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.models import Toko, User
+from core.pagination import encode_cursor, keyset_page
+from produk.models import KategoriProduk, Produk
+from transaksi.ids import new_transaksi_id
+from transaksi.models import Transaksi
+
+TRANSAKSI_ORDERING = ["-created_at", "-id"]
+PRODUK_ORDERING = ["-stok", "-id"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds one toko with N transactions and N products, then compares "
+        "OFFSET/LIMIT + COUNT pages against keyset (cursor) pages at several "
+        "depths. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Rows per table (default: 1M)")
+        parser.add_argument("--per-page", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per page (median is reported)")
+
+    def handle(self, *args, **options):
+        rows, per_page, repeat = options["rows"], options["per_page"], options["repeat"]
+        with transaction.atomic():
+            toko = self.seed(rows, options["batch_size"])
+            tables = [
+                ("transaksi", Transaksi.objects.filter(toko=toko, is_deleted=False), TRANSAKSI_ORDERING),
+                ("produk", Produk.objects.filter(toko=toko), PRODUK_ORDERING),
+            ]
+            results = [
+                (name, depth, *self.measure(queryset, ordering, depth, per_page, repeat))
+                for name, queryset, ordering in tables
+                for depth in self.depths(queryset.count(), per_page)
+            ]
+
+            # Benchmark data never sticks around
+            transaction.set_rollback(True)
+
+        for name, depth, offset_ms, keyset_ms in results:
+            self.stdout.write(
+                f"{name:<10} page {depth // per_page + 1:>8}: "
+                f"offset {offset_ms:8.2f} ms   keyset {keyset_ms:8.2f} ms"
+            )
+
+    def depths(self, total, per_page):
+        last = max(total - per_page, 0)
+        return sorted({0, last // 2 // per_page * per_page, last // per_page * per_page})
+
+    def measure(self, queryset, ordering, depth, per_page, repeat):
+        ordered = queryset.order_by(*ordering)
+        # The cursor a client would hold after paging down to ``depth``
+        cursor = ""
+        if depth:
+            previous = ordered[depth - 1]
+            cursor = encode_cursor(getattr(previous, field.lstrip("-")) for field in ordering)
+
+        def offset_page():
+            queryset.count()
+            list(ordered[depth : depth + per_page])
+
+        def cursor_page():
+            keyset_page(queryset, ordering, cursor, per_page)
+
+        return self.median_ms(offset_page, repeat), self.median_ms(cursor_page, repeat)
+
+    def median_ms(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
+
+    def seed(self, rows, batch_size):
+        toko = Toko.objects.create()
+        user = User.objects.create_user(
+            email=f"benchmark-pagination-{toko.id}@example.com", username="benchmark", toko=toko
+        )
+        kategori = KategoriProduk.objects.create(nama="Benchmark", toko=toko)
+
+        # created_at is auto_now_add; spread it over a year instead
+        created_at = Transaksi._meta.get_field("created_at")
+        created_at.auto_now_add = False
+        try:
+            now = timezone.now()
+            for start in range(0, rows, batch_size):
+                size = min(batch_size, rows - start)
+                Transaksi.objects.bulk_create(
+                    Transaksi(
+                        id=new_transaksi_id(Transaksi),
+                        toko=toko,
+                        created_by=user,
+                        transaction_type="pemasukan",
+                        category="Pendapatan Lain-Lain",
+                        total_amount=Decimal("1000"),
+                        amount=Decimal("1000"),
+                        created_at=now - timedelta(seconds=random.randrange(365 * 24 * 3600)),
+                    )
+                    for _ in range(size)
+                )
+                Produk.objects.bulk_create(
+                    Produk(
+                        nama=f"Produk {start + i}",
+                        toko=toko,
+                        kategori=kategori,
+                        harga_modal=1000,
+                        harga_jual=1500,
+                        # Few distinct values, so the id tiebreaker does real work
+                        stok=random.randrange(100),
+                        satuan="Pcs",
+                    )
+                    for i in range(size)
+                )
+                self.stdout.write(f"seeded {start + size}/{rows}", ending="\r")
+        finally:
+            created_at.auto_now_add = True
+        self.stdout.write("")
+        return toko
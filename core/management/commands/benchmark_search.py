@@ -0,0 +1,88 @@
+# core/management/commands/benchmark_search.py
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.models import Toko
+from produk.models import KategoriProduk, Produk
+from produk.search import filter_products, get_backend, search_products
+
+BRANDS = ["Indomie", "Sedaap", "Aqua", "Teh Botol", "Kopi Kapal Api", "Beras Ramos", "Gula Pasir", "Minyak Bimoli"]
+VARIANTS = ["Goreng", "Kuah", "Soto", "Ayam Bawang", "Original", "Premium", "Manis", "Pedas", "Jumbo", "Mini"]
+SIZES = ["100g", "250g", "500g", "1kg", "5kg", "330ml", "600ml", "1.5L"]
+
+# What a cashier types: the incremental prefixes of one name, then a typo
+QUERIES = ["i", "in", "ind", "indo", "indom", "indomie", "indomie gor", "indomei", "kopi kpal", "zzzz"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds one toko with N products and times the old nama__icontains "
+        "filter against produk.search (index-backed filter and ranked "
+        "search) for incremental and mistyped queries. Everything is "
+        "rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000, help="Products in the toko (default: 100k)")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query (median is reported)")
+        parser.add_argument("--limit", type=int, default=20, help="Rows fetched per query")
+
+    def handle(self, *args, **options):
+        repeat, limit = options["repeat"], options["limit"]
+        with transaction.atomic():
+            toko = self.seed(options["rows"], options["batch_size"])
+            products = Produk.objects.filter(toko=toko)
+            results = []
+            for query in QUERIES:
+                results.append((
+                    query,
+                    self.median_ms(lambda: list(products.filter(nama__icontains=query)[:limit]), repeat),
+                    self.median_ms(lambda: list(filter_products(products, toko.id, query)[:limit]), repeat),
+                    self.median_ms(lambda: search_products(toko.id, query, limit=limit), repeat),
+                    len(search_products(toko.id, query, limit=limit)),
+                ))
+
+            # Benchmark data never sticks around
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"backend: {type(get_backend()).__name__}")
+        for query, icontains_ms, filter_ms, search_ms, found in results:
+            self.stdout.write(
+                f"{query!r:<15} icontains {icontains_ms:8.2f} ms   filter {filter_ms:8.2f} ms   "
+                f"ranked {search_ms:8.2f} ms ({found} hits)"
+            )
+
+    def median_ms(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
+
+    def seed(self, rows, batch_size):
+        toko = Toko.objects.create()
+        kategori = KategoriProduk.objects.create(nama="Benchmark", toko=toko)
+        for start in range(0, rows, batch_size):
+            size = min(batch_size, rows - start)
+            Produk.objects.bulk_create(
+                Produk(
+                    nama=f"{random.choice(BRANDS)} {random.choice(VARIANTS)} {random.choice(SIZES)} #{start + i}",
+                    toko=toko,
+                    kategori=kategori,
+                    harga_modal=1000,
+                    harga_jual=1500,
+                    stok=random.randrange(100),
+                    satuan="Pcs",
+                )
+                for i in range(size)
+            )
+            self.stdout.write(f"seeded {start + size}/{rows}", ending="\r")
+        self.stdout.write("")
+        return toko
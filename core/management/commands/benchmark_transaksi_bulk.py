@@ -0,0 +1,104 @@
+# core/management/commands/benchmark_transaksi_bulk.py
+
+import random
+import time
+import uuid
+
+import jwt
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ninja.testing import TestClient
+
+from authentication.models import Toko, User
+from laporan import ledger
+from produk.models import KategoriProduk, Produk
+from transaksi.api import router as transaksi_router
+from transaksi.models import Transaksi
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays N queued offline sales through sequential POST /transaksi calls "
+        "and through POST /transaksi/bulk (plus a full duplicate replay), and "
+        "reports the time of each. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Queued sales to replay (default: 500)")
+        parser.add_argument("--products", type=int, default=50)
+        parser.add_argument("--batch-size", type=int, default=500, help="Sales per bulk request")
+
+    def handle(self, *args, **options):
+        rows, batch_size = options["rows"], options["batch_size"]
+        with transaction.atomic():
+            client, headers, sales = self.seed(rows, options["products"])
+
+            # Each sequential request commits on its own in production, so
+            # each pays a ledger sync; the bulk path pays one per batch
+            started = time.perf_counter()
+            for sale in sales:
+                response = client.post("", json=sale, headers=headers)
+                ledger.sync([response.json()["id"]])
+            sequential = time.perf_counter() - started
+
+            bulk = self.replay(client, headers, sales, batch_size, "bulk")
+            replay = self.replay(client, headers, sales, batch_size, "replay")
+            recorded = Transaksi.objects.filter(idempotency_key__isnull=False).count()
+
+            # Benchmark data never sticks around
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{rows} sales, {batch_size} per bulk request")
+        self.stdout.write(f"sequential POST /transaksi   {sequential * 1000:10.1f} ms  {rows / sequential:8.0f} sales/s")
+        self.stdout.write(f"POST /transaksi/bulk         {bulk * 1000:10.1f} ms  {rows / bulk:8.0f} sales/s")
+        self.stdout.write(f"bulk replay (all duplicates) {replay * 1000:10.1f} ms  ({recorded} recorded once)")
+
+    def replay(self, client, headers, sales, batch_size, prefix):
+        started = time.perf_counter()
+        for start in range(0, len(sales), batch_size):
+            batch = [
+                {**sale, "idempotency_key": f"bench-{start + i}"}
+                for i, sale in enumerate(sales[start : start + batch_size])
+            ]
+            response = client.post("/bulk", json={"transactions": batch}, headers=headers)
+            created = [result["id"] for result in response.json()["results"] if result["status"] == "created"]
+            ledger.sync(created)
+        return time.perf_counter() - started
+
+    def seed(self, rows, product_count):
+        toko = Toko.objects.create()
+        user = User.objects.create_user(
+            email=f"benchmark-bulk-{uuid.uuid4().hex[:8]}@example.com", username="benchmark", toko=toko
+        )
+        kategori = KategoriProduk.objects.create(nama="Benchmark", toko=toko)
+        products = Produk.objects.bulk_create(
+            Produk(
+                nama=f"Produk {i}", toko=toko, kategori=kategori, harga_modal=1000, harga_jual=1500,
+                stok=rows * 10, satuan="Pcs",
+            )
+            for i in range(product_count)
+        )
+        sales = []
+        for _ in range(rows):
+            items = [
+                {
+                    "product_id": product.id,
+                    "quantity": random.randint(1, 3),
+                    "harga_jual_saat_transaksi": 1500,
+                    "harga_modal_saat_transaksi": 1000,
+                }
+                for product in random.sample(products, random.randint(1, 3))
+            ]
+            total = sum(item["quantity"] * 1500 for item in items)
+            sales.append({
+                "transaction_type": "pemasukan",
+                "category": "Penjualan Barang",
+                "total_amount": total,
+                "total_modal": sum(item["quantity"] * 1000 for item in items),
+                "amount": total,
+                "items": items,
+            })
+
+        token = jwt.encode({"user_id": user.id}, settings.SECRET_KEY, algorithm="HS256")
+        return TestClient(transaksi_router), {"Authorization": f"Bearer {token}"}, sales
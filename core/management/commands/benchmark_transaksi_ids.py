@@ -0,0 +1,97 @@
+# core/management/commands/benchmark_transaksi_ids.py
+
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from authentication.models import Toko, User
+from transaksi.models import Transaksi
+
+
+class Command(BaseCommand):
+    help = (
+        "Inserts N transactions with a Transaksi ID strategy and reports collisions and "
+        "uniqueness probes. Everything is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Rows to insert (default: 1M)")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--strategy",
+            action="append",
+            help=(
+                "Dotted path of an ID generator class; repeat to compare several "
+                "(default: transaksi.ids.TimeOrderedIdGenerator)"
+            ),
+        )
+        parser.add_argument(
+            "--no-insert",
+            action="store_true",
+            help="Only generate IDs, do not write rows",
+        )
+
+    def handle(self, *args, **options):
+        strategies = options["strategy"] or ["transaksi.ids.TimeOrderedIdGenerator"]
+        for path in strategies:
+            self.run_strategy(path, options["rows"], options["batch_size"], not options["no_insert"])
+
+    def run_strategy(self, path, rows, batch_size, insert):
+        generator = import_string(path)()
+        seen = set()
+        collisions = 0
+        inserted = 0
+        ordered = True
+        previous = ""
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            toko = Toko.objects.create()
+            user = User.objects.create_user(
+                email=f"benchmark-ids-{toko.id}@example.com", username="benchmark", toko=toko
+            )
+
+            batch = []
+            while inserted + len(batch) < rows:
+                transaksi_id = generator(Transaksi)
+                if transaksi_id in seen:
+                    collisions += 1
+                    continue
+                seen.add(transaksi_id)
+                ordered = ordered and transaksi_id > previous
+                previous = transaksi_id
+
+                batch.append(
+                    Transaksi(
+                        id=transaksi_id,
+                        toko=toko,
+                        created_by=user,
+                        transaction_type="pemasukan",
+                        category="Pendapatan Lain-Lain",
+                        total_amount=Decimal("1000"),
+                        amount=Decimal("1000"),
+                    )
+                )
+                if len(batch) >= batch_size:
+                    inserted += self.flush(batch, insert)
+                    batch = []
+            inserted += self.flush(batch, insert)
+
+            # Benchmark data never sticks around
+            transaction.set_rollback(True)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(path))
+        self.stdout.write(f"  rows:        {inserted}")
+        self.stdout.write(f"  elapsed:     {elapsed:.2f}s ({inserted / elapsed:,.0f} rows/s)")
+        self.stdout.write(f"  collisions:  {collisions}")
+        self.stdout.write(f"  probes:      {generator.probes}")
+        self.stdout.write(f"  time-ordered: {'yes' if ordered else 'no'}")
+
+    def flush(self, batch, insert):
+        if insert and batch:
+            Transaksi.objects.bulk_create(batch)
+        return len(batch)
@@ -0,0 +1,44 @@
+# core/management/commands/import_produk.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models import Toko
+from core.imports import IMPORT_FORMATS, import_format
+from produk.imports import IMPORT_COLUMNS, ImportInterrupted, import_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates and updates a toko's products from a CSV or XLSX file with the "
+        f"columns {', '.join(IMPORT_COLUMNS)} and optionally id (same as POST /produk/import)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or XLSX file")
+        parser.add_argument("--toko", type=int, required=True, help="Toko id the products belong to")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, help="Default: from the file extension")
+
+    def handle(self, *args, **options):
+        if not Toko.objects.filter(id=options["toko"]).exists():
+            raise CommandError(f"Toko {options['toko']} not found")
+
+        try:
+            name = import_format(options["path"], options["format"])
+            with open(options["path"], "rb") as file:
+                summary = import_products(options["toko"], file, name)
+        except ImportInterrupted as e:
+            self.write_errors(e.summary)
+            raise CommandError(str(e))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.write_errors(summary)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {summary['created']} products, updated {summary['updated']}, {summary['failed']} failed"
+            )
+        )
+
+    def write_errors(self, summary):
+        for error in summary["errors"]:
+            self.stdout.write(self.style.WARNING(f"row {error['row']}: {error['message']}"))
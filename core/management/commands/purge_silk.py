@@ -0,0 +1,28 @@
+# core/management/commands/purge_silk.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes Silk's recorded requests older than the retention period or beyond "
+        "the newest SILK_MAX_RECORDED_REQUESTS (the middleware also does this every "
+        "SILK_PURGE_INTERVAL seconds)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.SILK_RETENTION_DAYS,
+            help=f"Keep this many days (default: SILK_RETENTION_DAYS, {settings.SILK_RETENTION_DAYS})",
+        )
+        parser.add_argument(
+            "--max-requests", type=int, default=settings.SILK_MAX_RECORDED_REQUESTS,
+            help=f"Keep at most this many requests, 0 for no limit (default: {settings.SILK_MAX_RECORDED_REQUESTS})",
+        )
+
+    def handle(self, *args, **options):
+        deleted = profiling.purge(retention_days=options["days"], max_requests=options["max_requests"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} recorded requests"))
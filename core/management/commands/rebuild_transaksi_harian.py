@@ -0,0 +1,38 @@
+# core/management/commands/rebuild_transaksi_harian.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from laporan import rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the laporan daily transaction rollup (TransaksiHarian) or checks it for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--toko",
+            type=int,
+            help="Only rebuild/check this toko id (default: all tokos)",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only compare the rollup against raw transactions, do not rewrite it",
+        )
+
+    def handle(self, *args, **options):
+        toko_id = options.get("toko")
+
+        if options["check"]:
+            mismatches = rollup.check(toko_id)
+            for key, expected, actual in mismatches:
+                self.stdout.write(
+                    self.style.WARNING(f"{key}: expected {expected}, stored {actual}")
+                )
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} rollup rows are out of sync")
+            self.stdout.write(self.style.SUCCESS("Rollup is consistent"))
+            return
+
+        count = rollup.rebuild(toko_id)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup rows"))
@@ -0,0 +1,23 @@
+# core/management/commands/response_cache_stats.py
+
+from django.core.management.base import BaseCommand
+from django.urls import get_resolver
+
+from core.cache import response_cache_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows hit/miss counters of the per-toko response cache. Counters live in "
+        "the cache itself, so with the local-memory backend they only cover this process."
+    )
+
+    def handle(self, *args, **options):
+        # Importing the URLconf imports every api module, which registers the endpoints
+        get_resolver().url_patterns
+
+        for name, counts in response_cache_stats().items():
+            total = counts["hits"] + counts["misses"]
+            ratio = counts["hits"] / total if total else 0
+            self.stdout.write(f"{name:<60} hits {counts['hits']:>8}  misses {counts['misses']:>8}  ({ratio:.0%})")
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -14,6 +14,7 @@ from authentication.models import User, Toko, Invitation
 from produk.models import Produk, KategoriProduk, Satuan
 from transaksi.models import Transaksi, TransaksiItem
 from laporan.models import ArusKasReport, DetailArusKas
+from laporan import rollup
 
 
 class Command(BaseCommand):
@@ -82,6 +83,9 @@ class Command(BaseCommand):
         elif mode == "production":
             self.seed_production_data(user, toko, seed_id)
 
+        # Seeded transactions get their created_at rewritten, so rebuild the daily rollup
+        rollup.rebuild(toko.id)
+
         self.stdout.write(
             self.style.SUCCESS(f"Successfully seeded the database in {mode} mode")
         )
@@ -2216,6 +2220,8 @@ class Command(BaseCommand):
                     category_count = categories_before
                 
                 # Do not remove units as they are global (we only delete the specifically created ones)
+
+                rollup.rebuild(toko.id)
                 
                 # Report success
                 self.stdout.write(
@@ -0,0 +1,161 @@
+# core/management/commands/seed_loadtest.py
+
+import json
+import os
+import random
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.models import User
+from laporan import ledger, rollup
+from produk.models import Produk
+from transaksi import bulk
+from transaksi.models import Transaksi
+from transaksi.schemas import BulkTransaksiRow
+
+OWNER_EMAIL = "loadtest-owner-{index}@example.com"
+CASHIER_EMAIL = "loadtest-cashier-{index}@example.com"
+
+# Products listed per shop in the accounts file (what cashiers sell)
+MANIFEST_PRODUCTS = 200
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds shops for the load tests (loadtests/) through seed_database, adds "
+        "months of sales history and writes the accounts file the load-test users log in with"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shops", type=int, default=5, help="Shops to seed (default: 5)")
+        parser.add_argument("--mode", default="server", choices=["local", "server"], help="seed_database mode")
+        parser.add_argument("--sales", type=int, default=2000, help="Extra historical sales per shop (default: 2000)")
+        parser.add_argument("--days", type=int, default=180, help="Days of history the sales span (default: 180)")
+        parser.add_argument(
+            "--output", default=os.path.join(settings.BASE_DIR, "loadtests", "accounts.json"),
+            help="Accounts file (default: loadtests/accounts.json)",
+        )
+
+    def handle(self, *args, **options):
+        if options["shops"] < 1:
+            raise CommandError("--shops must be at least 1")
+
+        shops = []
+        for index in range(options["shops"]):
+            owner = self.seed_shop(index, options["mode"])
+            # Re-running tops the history up instead of doubling it
+            sales = Transaksi.objects.filter(
+                toko_id=owner.toko_id, category="Penjualan Barang", idempotency_key__startswith="loadtest-"
+            ).count()
+            if sales < options["sales"]:
+                self.add_history(owner, sales, options["sales"] - sales, options["days"])
+            shops.append(self.manifest_entry(index, owner))
+            self.stdout.write(f"shop {owner.toko_id}: {Transaksi.objects.filter(toko_id=owner.toko_id).count()} transactions")
+
+        User.objects.get_or_create(
+            email=settings.BPR_EMAIL, defaults={"username": "BPR Load Test", "role": "BPR", "is_active": True}
+        )
+        manifest = {"created_at": timezone.now().isoformat(), "bpr_email": settings.BPR_EMAIL, "shops": shops}
+        os.makedirs(os.path.dirname(options["output"]) or ".", exist_ok=True)
+        with open(options["output"], "w") as file:
+            json.dump(manifest, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Seeded {len(shops)} shops, accounts written to {options['output']}"))
+
+    def seed_shop(self, index, mode):
+        email = OWNER_EMAIL.format(index=index)
+        owner = User.objects.filter(email=email, toko__isnull=False).first()
+        if owner is None:
+            call_command("seed_database", mode=mode, email=email, stdout=StringIO())
+            owner = User.objects.get(email=email)
+        return owner
+
+    def add_history(self, owner, existing, count, days):
+        """``count`` more sales over the last ``days`` days, through the set-based bulk import."""
+        products = list(Produk.objects.filter(toko_id=owner.toko_id).values("id", "harga_jual", "harga_modal"))
+        if not products:
+            raise CommandError(f"Toko {owner.toko_id} has no products to sell")
+
+        # One restock first, so every sale finds stock
+        quantity = count * 6 // len(products) + 10
+        rows = [
+            self.row(
+                f"loadtest-{existing}-restock", "pengeluaran", "Pembelian Stok", "Lunas",
+                [(product, quantity, product["harga_modal"]) for product in products],
+            )
+        ]
+        for number in range(count):
+            basket = random.sample(products, min(len(products), random.randint(1, 4)))
+            lines = [(product, random.randint(1, 3), product["harga_jual"]) for product in basket]
+            status = "Belum Lunas" if random.random() < 0.15 else "Lunas"
+            rows.append(self.row(f"loadtest-{existing + number}", "pemasukan", "Penjualan Barang", status, lines))
+
+        ids = []
+        batch_size = settings.TRANSAKSI_BULK_MAX_ROWS
+        for start in range(0, len(rows), batch_size):
+            results = bulk.import_transactions(owner.toko_id, owner.id, rows[start : start + batch_size])
+            failed = [result for result in results if result["status"] == bulk.FAILED]
+            if failed:
+                raise CommandError(f"Toko {owner.toko_id}: {failed[0]['message']}")
+            ids += [result["id"] for result in results if result["status"] == bulk.CREATED]
+
+        # Spread the history out (restock first), then re-derive what depends on created_at
+        now = timezone.now()
+        transactions = list(Transaksi.objects.filter(id__in=ids).only("id"))
+        for transaksi in transactions:
+            transaksi.created_at = now - timedelta(seconds=random.randint(3600, days * 86400))
+        with transaction.atomic():
+            Transaksi.objects.bulk_update(transactions, ["created_at"], batch_size=500)
+            Transaksi.objects.filter(id=ids[0]).update(created_at=now - timedelta(days=days + 1))
+        rollup.rebuild(owner.toko_id)
+        ledger.sync(ids)
+
+    def row(self, key, transaction_type, category, status, lines):
+        total = sum(float(price) * quantity for _, quantity, price in lines)
+        return BulkTransaksiRow(
+            idempotency_key=key,
+            transaction_type=transaction_type,
+            category=category,
+            total_amount=total,
+            total_modal=sum(float(product["harga_modal"]) * quantity for product, quantity, _ in lines),
+            amount=total,
+            status=status,
+            items=[
+                {
+                    "product_id": product["id"],
+                    "quantity": quantity,
+                    "harga_jual_saat_transaksi": float(product["harga_jual"]),
+                    "harga_modal_saat_transaksi": float(product["harga_modal"]),
+                }
+                for product, quantity, _ in lines
+            ],
+        )
+
+    def manifest_entry(self, index, owner):
+        cashiers = list(User.objects.filter(toko_id=owner.toko_id, role="Karyawan").values_list("email", flat=True))
+        if not cashiers:
+            cashier, _ = User.objects.get_or_create(
+                email=CASHIER_EMAIL.format(index=index),
+                defaults={"username": f"Kasir {index}", "role": "Karyawan", "toko_id": owner.toko_id, "is_active": True},
+            )
+            cashiers = [cashier.email]
+        products = Produk.objects.filter(toko_id=owner.toko_id).order_by("id")[:MANIFEST_PRODUCTS]
+        return {
+            "toko_id": owner.toko_id,
+            "owner_email": owner.email,
+            "cashier_emails": cashiers,
+            "products": [
+                {
+                    "id": product.id,
+                    "nama": product.nama,
+                    "harga_jual": float(product.harga_jual),
+                    "harga_modal": float(product.harga_modal),
+                }
+                for product in products
+            ],
+        }
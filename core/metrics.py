@@ -0,0 +1,274 @@
+import inspect
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from ninja.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# Lightweight request instrumentation: query count, DB time, serialization
+# time and total latency per route, kept in per-process histograms and
+# exposed in the Prometheus text format (GET /api/metrics). Nothing is
+# written anywhere, so it can stay on in production, unlike Silk.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Meters of the requests/views being measured in this context; every query
+# run while one is active is added to all of them
+_meters = ContextVar("metrics_meters", default=())
+
+
+class Meter:
+    __slots__ = ("queries", "db_seconds", "serialization_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+
+
+@contextmanager
+def measure():
+    """Count the queries, DB time and serialization time of the enclosed code."""
+    meter = Meter()
+    token = _meters.set(_meters.get() + (meter,))
+    try:
+        yield meter
+    finally:
+        _meters.reset(token)
+
+
+def _timed_query(execute, sql, params, many, context):
+    meters = _meters.get()
+    if not meters:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for meter in meters:
+            meter.queries += 1
+            meter.db_seconds += elapsed
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """``connection_created`` receiver: time the queries of every connection."""
+    # The wrapper list outlives reconnects of the same DatabaseWrapper
+    if _timed_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_query)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """Ninja's JSON renderer, adding the encoding time to the active meters."""
+
+    def render(self, request, data, *, response_status):
+        start = time.perf_counter()
+        try:
+            return super().render(request, data, response_status=response_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            for meter in _meters.get():
+                meter.serialization_seconds += elapsed
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One count per bucket plus +Inf; cumulated when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts, histogram.sum = list(self.counts), self.sum
+        return histogram
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            yield f"{name}_bucket{{{labels},le=\"{bound}\"}} {cumulative}"
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {cumulative}"
+
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Total request latency", LATENCY_BUCKETS),
+    "http_request_db_seconds": ("Time spent in database queries", LATENCY_BUCKETS),
+    "http_request_serialization_seconds": ("Time spent encoding the response body", LATENCY_BUCKETS),
+    "http_request_queries": ("Database queries per request", QUERY_BUCKETS),
+}
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """Per-process metrics; each worker reports its own, as Prometheus expects."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._responses = Counter()
+            self._budget_exceeded = Counter()
+
+    def record(self, route, method, status, duration, meter):
+        values = {
+            "http_request_duration_seconds": duration,
+            "http_request_db_seconds": meter.db_seconds,
+            "http_request_serialization_seconds": meter.serialization_seconds,
+            "http_request_queries": meter.queries,
+        }
+        with self._lock:
+            histograms = self._histograms.get((route, method))
+            if histograms is None:
+                histograms = self._histograms[route, method] = {
+                    name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()
+                }
+            for name, value in values.items():
+                histograms[name].observe(value)
+            self._responses[route, method, status] += 1
+
+    def record_budget_exceeded(self, view):
+        with self._lock:
+            self._budget_exceeded[view] += 1
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = {key: {name: h.copy() for name, h in value.items()} for key, value in self._histograms.items()}
+            responses = dict(self._responses)
+            budget_exceeded = dict(self._budget_exceeded)
+
+        lines = []
+        for name, (help_text, _) in HISTOGRAMS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (route, method), by_name in sorted(histograms.items()):
+                lines += by_name[name].samples(name, f'route="{_label(route)}",method="{method}"')
+
+        lines += ["# HELP http_responses_total Responses by route and status", "# TYPE http_responses_total counter"]
+        for (route, method, status), count in sorted(responses.items()):
+            lines.append(f'http_responses_total{{route="{_label(route)}",method="{method}",status="{status}"}} {count}')
+
+        lines += [
+            "# HELP http_query_budget_exceeded_total Views that ran more queries than their query_budget",
+            "# TYPE http_query_budget_exceeded_total counter",
+        ]
+        for view, count in sorted(budget_exceeded.items()):
+            lines.append(f'http_query_budget_exceeded_total{{view="{_label(view)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _route(request):
+    # The URL pattern, not the path, keeps one series per endpoint
+    match = getattr(request, "resolver_match", None)
+    return match.route if match else "unmatched"
+
+
+class MetricsMiddleware:
+    """Record every request in ``REGISTRY``; disabled with ``METRICS_ENABLED=False``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with measure() as meter:
+            response = self.get_response(request)
+        REGISTRY.record(_route(request), request.method, response.status_code, time.perf_counter() - start, meter)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with measure() as meter:
+            response = await self.get_response(request)
+        REGISTRY.record(_route(request), request.method, response.status_code, time.perf_counter() - start, meter)
+        return response
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries):
+    """
+    Declare the most queries a view may run, whatever the size of the data.
+
+    Over budget, the view raises ``QueryBudgetExceeded`` when
+    ``QUERY_BUDGET_STRICT`` is on (always in test runs, so an
+    N+1 regression fails the suite) and otherwise logs a warning and counts
+    it in ``http_query_budget_exceeded_total``. Only the view's own queries
+    count, not authentication or serialization. Works on both sync and
+    ``async def`` views; stack it right under the route decorator.
+    """
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__name__}"
+
+        def check(meter):
+            if meter.queries <= max_queries:
+                return
+            REGISTRY.record_budget_exceeded(name)
+            message = f"{name} ran {meter.queries} queries, its budget is {max_queries}"
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(request, *args, **kwargs):
+                with measure() as meter:
+                    result = await func(request, *args, **kwargs)
+                check(meter)
+                return result
+
+            async_wrapper.query_budget = max_queries
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(request, *args, **kwargs):
+            with measure() as meter:
+                result = func(request, *args, **kwargs)
+            check(meter)
+            return result
+
+        wrapper.query_budget = max_queries
+        return wrapper
+
+    return decorator
@@ -0,0 +1,82 @@
+import base64
+import binascii
+import json
+from decimal import Decimal
+
+from django.db.models import Q
+
+INVALID_CURSOR = "Cursor tidak valid"
+
+
+def _plain(value):
+    # isoformat keeps microseconds (DjangoJSONEncoder drops them), which the
+    # equality half of the keyset filter needs
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_plain(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, model, ordering):
+    """Turn an opaque cursor back into typed values; raises ``ValueError`` if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(INVALID_CURSOR)
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError(INVALID_CURSOR)
+
+    try:
+        return [
+            model._meta.get_field(field.lstrip("-")).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except Exception:
+        raise ValueError(INVALID_CURSOR)
+
+
+def _after(ordering, values):
+    """Rows strictly after ``values`` in ``ordering``: (a > x) OR (a = x AND b > y) ..."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+
+    # Redundant bound on the leading key lets the database seek the index
+    # instead of scanning and testing the OR branches row by row
+    first = ordering[0]
+    bound = "lte" if first.startswith("-") else "gte"
+    return Q(**{f"{first.lstrip('-')}__{bound}": values[0]}) & condition
+
+
+def keyset_page(queryset, ordering, cursor, per_page):
+    """
+    One page of ``queryset`` in ``ordering`` starting after ``cursor``.
+
+    ``ordering`` must end in a unique field (normally ``id``) so every row has
+    a distinct position. An empty cursor returns the first page. Returns
+    ``(items, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    Unlike OFFSET, the cost does not grow with how deep the page is, and no
+    ``COUNT`` is needed.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_after(ordering, decode_cursor(cursor, queryset.model, ordering)))
+
+    items = list(queryset[: per_page + 1])
+    if len(items) <= per_page:
+        return items, None
+
+    items = items[:per_page]
+    last = items[-1]
+    return items, encode_cursor(getattr(last, field.lstrip("-")) for field in ordering)
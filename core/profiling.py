@@ -0,0 +1,164 @@
+import json
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+from silk.collector import DataCollector
+from silk.middleware import SilkyMiddleware
+from silk.models import Request, Response
+
+from authentication.models import User
+from authentication.security import _token_user_id
+from core.metrics import measure
+
+logger = logging.getLogger(__name__)
+
+# Sampled Silk profiling. Silk writes a request row, its queries and its
+# response for every request it intercepts, so only a share of them is:
+#   - SILK_SAMPLE_RATE of all requests, or the rate of the longest matching
+#     SILK_SAMPLE_ROUTES path prefix;
+#   - every request of a staff user sending ``X-Silk-Profile: 1``;
+#   - a summary (timing, query count, status, no SQL) of any other request
+#     slower than SILK_SLOW_REQUEST_MS, since Silk decides before the view runs.
+# Recorded requests older than SILK_RETENTION_DAYS, or beyond the newest
+# SILK_MAX_RECORDED_REQUESTS, are purged every SILK_PURGE_INTERVAL seconds
+# on a background thread, so no request waits for it (and by
+# `manage.py purge_silk`, e.g. from cron with SILK_PURGE_INTERVAL=0).
+
+FORCE_HEADER = "X-Silk-Profile"
+PURGE_LOCK_KEY = "silk:purge"
+PURGE_BATCH_SIZE = 500
+
+# Monotonic time before which this process doesn't even ask the cache
+_next_purge_check = 0.0
+
+
+def sample_rate(path):
+    rate, matched = settings.SILK_SAMPLE_RATE, -1
+    for prefix, route_rate in settings.SILK_SAMPLE_ROUTES.items():
+        if path.startswith(prefix) and len(prefix) > matched:
+            rate, matched = route_rate, len(prefix)
+    return rate
+
+
+def _is_staff(request):
+    # Silk runs before authentication, so read the bearer token directly
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    user_id = _token_user_id(token) if scheme.lower() == "bearer" and token else None
+    return bool(user_id) and User.objects.filter(id=user_id, is_active=True, is_staff=True).exists()
+
+
+def should_profile(request):
+    """Whether Silk records this request in full."""
+    if request.headers.get(FORCE_HEADER) == "1" and _is_staff(request):
+        return True
+    return random.random() < sample_rate(request.path)
+
+
+def _is_silk(request):
+    try:
+        return request.path.startswith(reverse("silk:summary"))
+    except NoReverseMatch:
+        return False
+
+
+def record_slow_request(request, response, started_at, duration_ms, meter):
+    """Store a Silk summary of a request it did not profile."""
+    match = getattr(request, "resolver_match", None)
+    try:
+        silk_request = Request.objects.create(
+            path=request.path,
+            query_params=json.dumps(request.GET.dict()) if request.GET else "",
+            method=request.method,
+            view_name=match.view_name if match else "",
+            start_time=started_at,
+            end_time=started_at + timedelta(milliseconds=duration_ms),
+            num_sql_queries=meter.queries,
+        )
+        Response.objects.create(request=silk_request, status_code=response.status_code)
+    except DatabaseError:
+        logger.warning("Could not record slow request %s %s", request.method, request.path, exc_info=True)
+
+
+def purge(retention_days=None, max_requests=None):
+    """
+    Delete recorded requests (with their queries, profiles and response)
+    older than ``retention_days`` or beyond the newest ``max_requests``, in
+    batches. Returns the number of requests deleted.
+    """
+    retention_days = settings.SILK_RETENTION_DAYS if retention_days is None else retention_days
+    max_requests = settings.SILK_MAX_RECORDED_REQUESTS if max_requests is None else max_requests
+
+    expired = Q(start_time__lt=timezone.now() - timedelta(days=retention_days))
+    if max_requests:
+        beyond = list(
+            Request.objects.order_by("-start_time").values_list("start_time", flat=True)[max_requests : max_requests + 1]
+        )
+        if beyond:
+            expired |= Q(start_time__lte=beyond[0])
+
+    deleted = 0
+    while ids := list(Request.objects.filter(expired).values_list("id", flat=True)[:PURGE_BATCH_SIZE]):
+        Request.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+    return deleted
+
+
+def _purge_in_background():
+    try:
+        purge()
+    except DatabaseError:
+        logger.warning("Silk purge failed", exc_info=True)
+    finally:
+        # The thread's own connection; nothing else will close it
+        connection.close()
+
+
+def _start(target):
+    thread = threading.Thread(target=target, name="silk-purge", daemon=True)
+    thread.start()
+    return thread
+
+
+def purge_if_due():
+    """
+    Start ``purge`` on a background thread at most once per
+    ``SILK_PURGE_INTERVAL`` across the workers sharing the cache.
+    """
+    global _next_purge_check
+    interval = settings.SILK_PURGE_INTERVAL
+    if interval <= 0 or time.monotonic() < _next_purge_check:
+        return
+    _next_purge_check = time.monotonic() + interval
+    if cache.add(PURGE_LOCK_KEY, 1, interval):
+        _start(_purge_in_background)
+
+
+class SampledSilkyMiddleware(SilkyMiddleware):
+    """``SilkyMiddleware`` recording only the requests ``should_profile`` picks, plus slow ones."""
+
+    def process_request(self, request):
+        if should_profile(request):
+            return super().process_request(request)
+        DataCollector().clear()
+
+    def __call__(self, request):
+        started_at = timezone.now()
+        start = time.perf_counter()
+        with measure() as meter:
+            response = super().__call__(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        slow_ms = settings.SILK_SLOW_REQUEST_MS
+        if 0 < slow_ms <= duration_ms and not getattr(request, "silk_is_intercepted", False) and not _is_silk(request):
+            record_slow_request(request, response, started_at, duration_ms, meter)
+        purge_if_due()
+        return response
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+def enable_test_checks():
+    """Settings every test run gets, whichever runner starts it."""
+    # An N+1 regression fails the suite instead of logging a warning
+    settings.QUERY_BUDGET_STRICT = True
+
+
+class TestRunner(DiscoverRunner):
+    """``manage.py test`` and ``python -m django test`` (the ``TEST_RUNNER``)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        enable_test_checks()
@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from ninja.testing import TestClient
+
+from authentication.models import Toko, User
+from authentication.security import get_principal
+from produk.models import KategoriProduk, Produk
+
+# Shared fixtures for the API tests of every app.
+
+
+def auth_headers(user):
+    """``Authorization`` header of a request made as ``user``."""
+    token = jwt.encode({"user_id": user.id}, settings.SECRET_KEY, algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TokoTestMixin:
+    """
+    Act as the owner of a fresh toko.
+
+    ``setUp`` clears the cache and creates ``self.toko``, its ``self.owner``
+    (principal already cached, ``self.headers`` to authenticate as them) and
+    a ``self.kategori`` named ``kategori_nama``. When ``router`` is set,
+    ``self.client`` is a ``TestClient`` on it. Works with ``TestCase`` and
+    ``TransactionTestCase``.
+    """
+
+    router = None
+    kategori_nama = "Makanan"
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.toko = Toko.objects.create()
+        self.owner = User.objects.create_user(
+            username="owner", email="owner@example.com", password="password", role="Pemilik", toko=self.toko
+        )
+        self.kategori = KategoriProduk.objects.create(nama=self.kategori_nama, toko=self.toko)
+        get_principal(self.owner.id)
+        self.headers = auth_headers(self.owner)
+        if self.router is not None:
+            self.client = TestClient(self.router)
+
+    def create_bpr(self):
+        user = User.objects.create_user(username="bpr", email=settings.BPR_EMAIL, password="password", role="BPR")
+        get_principal(user.id)
+        return user
+
+    def create_product(self, nama="Produk", **fields):
+        """A product of ``self.toko``; ``fields`` override the defaults."""
+        fields = {
+            "foto": "",
+            "harga_modal": Decimal("1000"),
+            "harga_jual": Decimal("1500"),
+            "stok": 10,
+            "satuan": "Pcs",
+            "kategori": self.kategori,
+            "toko": self.toko,
+            **fields,
+        }
+        return Produk.objects.create(nama=nama, **fields)
+
+
+class TokoTestCase(TokoTestMixin, TestCase):
+    pass
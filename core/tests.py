@@ -0,0 +1,1206 @@
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from ninja.testing import TestAsyncClient, TestClient
+from PIL import Image
+from silk.models import Request as SilkRequest
+
+from authentication.models import Toko, User
+from authentication.security import get_principal
+from backend.api import get_cache_health, get_metrics
+from core import profiling
+from core.api import router as dashboard_router
+from core.cache import response_cache_stats, toko_version
+from core.dashboard import WIDGETS
+from core.exports import xlsx_chunks
+from core.metrics import REGISTRY, MetricsMiddleware, QueryBudgetExceeded, measure, query_budget
+from core.cache_config import build_caches, session_engine
+from core.pagination import decode_cursor, encode_cursor
+from core.testing import TokoTestCase, TokoTestMixin, auth_headers
+from produk.api import router as produk_router
+from produk.async_api import router as produk_async_router
+from produk import catalog, images
+from produk.models import KategoriProduk, Produk, Satuan
+from produk.schemas import ProdukResponseSchema
+from produk.search import IcontainsSearch, SqliteFtsSearch, filter_products, get_backend, search_products, word_similarity
+from transaksi.api import router as transaksi_router
+from transaksi.async_api import router as transaksi_async_router
+from transaksi.models import Transaksi
+from transaksi.stock import apply_stock_deltas, lock_products
+
+
+class KeysetPaginationTests(TokoTestCase):
+    def setUp(self):
+        super().setUp()
+
+        Transaksi.objects.bulk_create(
+            Transaksi(
+                id=f"K{i:05d}",
+                toko=self.toko,
+                created_by=self.owner,
+                transaction_type="pemasukan",
+                category="Pendapatan Lain-Lain",
+                total_amount=Decimal("1000"),
+                amount=Decimal("1000"),
+            )
+            for i in range(25)
+        )
+        # Ties on created_at must be broken by id
+        first = Transaksi.objects.order_by("id").first()
+        Transaksi.objects.filter(id__lt="K00010").update(created_at=first.created_at)
+
+        Produk.objects.bulk_create(
+            Produk(
+                nama=f"Produk {i}",
+                foto="",
+                harga_modal=Decimal("1000"),
+                harga_jual=Decimal("1500"),
+                stok=i % 4,
+                satuan="Pcs",
+                kategori=self.kategori,
+                toko=self.toko,
+            )
+            for i in range(17)
+        )
+
+    def _get(self, client, path="", **params):
+        # ninja's TestClient only reads query parameters from the path
+        return client.get(f"{path}?{urlencode(params)}", headers=self.headers)
+
+    def _walk(self, client, path, **params):
+        ids, cursor = [], ""
+        while cursor is not None:
+            response = self._get(client, path, cursor=cursor, **params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids += [item["id"] for item in data["items"]]
+            cursor = data["next_cursor"]
+        return ids
+
+    def test_transaksi_cursor_walk_matches_offset_order(self):
+        client = TestClient(transaksi_router)
+        expected = list(Transaksi.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+        self.assertEqual(self._walk(client, "", per_page=4), expected)
+
+        page_mode = self._get(client, page=2, per_page=4).json()
+        self.assertEqual(page_mode["total"], 25)
+        self.assertEqual(page_mode["total_pages"], 7)
+        self.assertIsNone(page_mode["next_cursor"])
+
+    def test_produk_cursor_walk_for_every_sort(self):
+        client = TestClient(produk_router)
+        for sort, ordering in [("stok", ["stok", "id"]), ("-stok", ["-stok", "-id"]), ("-id", ["-id"])]:
+            expected = list(Produk.objects.order_by(*ordering).values_list("id", flat=True))
+            self.assertEqual(self._walk(client, "/page/1", per_page=5, sort=sort), expected)
+
+    def test_cursor_mode_skips_count_and_offset(self):
+        client = TestClient(transaksi_router)
+        cursor = self._get(client, cursor="", per_page=5).json()["next_cursor"]
+
+        with CaptureQueriesContext(connection) as ctx:
+            data = self._get(client, cursor=cursor, per_page=5).json()
+        sql = " ".join(query["sql"] for query in ctx.captured_queries).upper()
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+        self.assertIsNone(data["total"])
+
+        data = self._get(client, cursor=cursor, per_page=5, with_total=True).json()
+        self.assertEqual(data["total"], 25)
+
+    def test_invalid_cursor_is_rejected(self):
+        client = TestClient(transaksi_router)
+        for cursor in ["not-base64!", encode_cursor(["x"]), encode_cursor(["not a date", "K00001"])]:
+            response = self._get(client, cursor=cursor)
+            self.assertEqual(response.status_code, 422)
+
+    def test_cursor_roundtrip_keeps_microseconds(self):
+        transaksi = Transaksi.objects.first()
+        values = decode_cursor(
+            encode_cursor([transaksi.created_at, transaksi.id]), Transaksi, ["-created_at", "-id"]
+        )
+        self.assertEqual(values, [transaksi.created_at, transaksi.id])
+
+    def test_benchmark_command_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_pagination", rows=30, per_page=5, repeat=1, stdout=out)
+
+        self.assertIn("keyset", out.getvalue())
+        self.assertEqual(Transaksi.objects.count(), 25)
+        self.assertEqual(Produk.objects.count(), 17)
+
+
+@override_settings(AUTH_PRINCIPAL_CACHE_TIMEOUT=60, RESPONSE_CACHE_TIMEOUT=300)
+class ResponseCacheTests(TokoTestCase):
+    def setUp(self):
+        super().setUp()
+        other_toko = Toko.objects.create()
+        self.other = User.objects.create_user(
+            username="other", email="other@example.com", password="password", role="Pemilik", toko=other_toko
+        )
+        self.produk = self.create_product(stok=1)
+        get_principal(self.other.id)
+
+    def test_second_request_is_served_from_cache(self):
+        client = TestClient(transaksi_router)
+        first = client.get("/summary/monthly?month=1&year=2025", headers=self.headers)
+        with self.assertNumQueries(0):
+            second = client.get("/summary/monthly?month=1&year=2025", headers=self.headers)
+        self.assertEqual(first.json(), second.json())
+
+        # Other parameters and other tokos get their own entries
+        with CaptureQueriesContext(connection) as ctx:
+            client.get("/summary/monthly?month=2&year=2025", headers=self.headers)
+            client.get("/summary/monthly?month=1&year=2025", headers=auth_headers(self.other))
+        self.assertTrue(ctx.captured_queries)
+
+        stats = response_cache_stats()["transaksi.api.get_monthly_summary"]
+        self.assertEqual(stats, {"hits": 1, "misses": 3})
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_zero_timeout_turns_the_cache_off(self):
+        client = TestClient(transaksi_router)
+        client.get("/summary/monthly?month=1&year=2025", headers=self.headers)
+        with CaptureQueriesContext(connection) as ctx:
+            client.get("/summary/monthly?month=1&year=2025", headers=self.headers)
+        self.assertTrue(ctx.captured_queries)
+        stats = response_cache_stats()["transaksi.api.get_monthly_summary"]
+        self.assertEqual(stats, {"hits": 0, "misses": 0})
+
+    def test_transaction_write_invalidates_the_toko(self):
+        client = TestClient(transaksi_router)
+        self.assertEqual(client.get("/debt-summary", headers=self.headers).json()["utang_pelanggan"], 0)
+        other_version = toko_version(self.other.toko_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(
+                "",
+                json={
+                    "transaction_type": "pemasukan",
+                    "category": "Pendapatan Lain-Lain",
+                    "total_amount": 700,
+                    "amount": 700,
+                    "status": "Belum Lunas",
+                },
+                headers=self.headers,
+            )
+
+        self.assertEqual(client.get("/debt-summary", headers=self.headers).json()["utang_pelanggan"], 700)
+        self.assertEqual(toko_version(self.other.toko_id), other_version)
+
+    def test_product_write_invalidates_low_stock(self):
+        client = TestClient(produk_router)
+        self.assertEqual(client.get("/low-stock", headers=self.headers).json()[0]["stock"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.produk.stok = 500
+            self.produk.save()
+
+        self.assertEqual(client.get("/low-stock", headers=self.headers).json()[0]["stock"], 500)
+
+    def test_stats_command(self):
+        out = StringIO()
+        call_command("response_cache_stats", stdout=out)
+        self.assertIn("produk.api.get_low_stock_products", out.getvalue())
+
+
+class CacheConfigTests(TestCase):
+    def test_tiers(self):
+        locmem = build_caches(key_prefix="pos-local")["default"]
+        self.assertEqual(locmem["BACKEND"], "django.core.cache.backends.locmem.LocMemCache")
+        self.assertEqual(locmem["KEY_PREFIX"], "pos-local")
+        self.assertNotIn("LOCATION", locmem)
+
+        self.assertEqual(build_caches("file", location="/srv/cache")["default"]["LOCATION"], "/srv/cache")
+        self.assertEqual(build_caches("db")["default"]["LOCATION"], "pos_cache")
+
+        redis = build_caches("redis", location="redis://cache:6379/1", serializer="pickle", compressor="none")
+        options = redis["default"]["OPTIONS"]
+        self.assertEqual(options["SERIALIZER"], "django_redis.serializers.pickle.PickleSerializer")
+        self.assertEqual(options["COMPRESSOR"], "django_redis.compressors.identity.IdentityCompressor")
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ImproperlyConfigured):
+            build_caches("memcached")
+        with self.assertRaises(ImproperlyConfigured):
+            build_caches("redis")
+        with self.assertRaises(ImproperlyConfigured):
+            build_caches("file")
+        with self.assertRaises(ImproperlyConfigured):
+            build_caches("redis", location="redis://cache:6379/1", serializer="yaml")
+
+    def test_sessions_fall_back_to_the_database_for_locmem(self):
+        self.assertEqual(session_engine("locmem"), "django.contrib.sessions.backends.cached_db")
+        self.assertEqual(session_engine("redis"), "django.contrib.sessions.backends.cache")
+
+
+class CacheHealthTests(TestCase):
+    # Called directly: going through the URLconf would run Silk's middleware,
+    # which keeps patching the SQL compiler for later query-count tests
+    def _get(self, token="rahasia"):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return get_cache_health(RequestFactory(headers=headers).get("/api/health/cache"))
+
+    def _check(self, caches):
+        with override_settings(CACHES=caches, METRICS_TOKEN="rahasia"):
+            cache.clear()
+            toko_version(1)
+            status, data = self._get()
+        self.assertEqual(status, 200)
+        return data
+
+    def test_locmem(self):
+        data = self._check(build_caches(key_prefix="pos-test"))
+        self.assertTrue(data["ok"])
+        self.assertFalse(data["shared"])
+        self.assertEqual(data["backend"], "LocMemCache")
+        self.assertEqual(data["key_prefix"], "pos-test")
+        self.assertIn("transaksi.api.get_monthly_summary", data["stats"])
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            data = self._check(build_caches("file", location=directory))
+        self.assertTrue(data["ok"])
+        self.assertTrue(data["shared"])
+
+    def test_db(self):
+        caches = build_caches("db", location="pos_cache_test")
+        with override_settings(CACHES=caches):
+            call_command("createcachetable", verbosity=0)
+        data = self._check(caches)
+        self.assertTrue(data["ok"])
+        self.assertEqual(data["backend"], "DatabaseCache")
+
+    def test_unreachable_redis_reports_503(self):
+        caches = build_caches("redis", location="redis://127.0.0.1:1/0", socket_timeout=0.1, ignore_exceptions=True)
+        with override_settings(CACHES=caches, METRICS_TOKEN="rahasia"):
+            status, data = self._get()
+            self.assertEqual(self._get(token=None), (503, {"status": "degraded"}))
+        self.assertEqual(status, 503)
+        self.assertFalse(data["ok"])
+
+    def test_details_need_the_metrics_token(self):
+        for token_setting, token in [("rahasia", None), ("rahasia", "salah"), ("", None)]:
+            with self.subTest(token_setting=token_setting, token=token):
+                with override_settings(METRICS_TOKEN=token_setting):
+                    self.assertEqual(self._get(token=token), (200, {"status": "ok"}))
+
+
+class AsyncEndpointTests(TokoTestCase):
+    """The ``/api/async/...`` variants answer exactly like the sync routes."""
+
+    def setUp(self):
+        super().setUp()
+        self.bpr = self.create_bpr()
+        products = [self.create_product(f"Produk {i}", stok=10 + i) for i in range(4)]
+        client = TestClient(transaksi_router)
+        for i, status in enumerate(["Lunas", "Belum Lunas", "Lunas"]):
+            response = client.post(
+                "",
+                json={
+                    "transaction_type": "pemasukan",
+                    "category": "Penjualan Barang",
+                    "total_amount": 1500 * (i + 1),
+                    "amount": 1500 * (i + 1),
+                    "status": status,
+                    "items": [
+                        {
+                            "product_id": products[i].id,
+                            "quantity": i + 1,
+                            "harga_jual_saat_transaksi": 1500,
+                            "harga_modal_saat_transaksi": 1000,
+                        }
+                    ],
+                },
+                headers=self.headers,
+            )
+            self.assertEqual(response.status_code, 201)
+
+    async def _compare(self, sync_router, async_router, path, user=None):
+        headers = auth_headers(user or self.owner)
+        expected = await sync_to_async(TestClient(sync_router).get)(path, headers=headers)
+        response = await TestAsyncClient(async_router).get(path, headers=headers)
+        self.assertEqual(response.status_code, expected.status_code, path)
+        self.assertEqual(response.json(), expected.json(), path)
+        return response.json()
+
+    async def test_transaksi_reads_match_sync(self):
+        today = date.today()
+        report = f"start_date={today.replace(day=1)}&end_date={today}"
+        for path in [
+            "/summary/monthly",
+            "/summary/monthly?month=13&year=2025",
+            "/debt-summary",
+            "/first-debt-date",
+            "/first-transaction-date",
+            f"/debt-report-by-date?{report}",
+            f"/financial-report-by-date?{report}",
+            "/financial-report-by-date?start_date=2025-03-02&end_date=2025-03-01",
+        ]:
+            await self._compare(transaksi_router, transaksi_async_router, path)
+
+        data = await self._compare(
+            transaksi_router, transaksi_async_router, f"/bpr/shop/{self.toko.id}/keuangan?{report}", self.bpr
+        )
+        self.assertEqual(len(data["transactions"]), 3)
+        self.assertEqual(len(data["transactions"][0]["items"]), 1)
+        await self._compare(transaksi_router, transaksi_async_router, f"/bpr/shop/{self.toko.id}/utang?{report}")
+        for report_name in ("keuangan", "utang"):
+            data = await self._compare(
+                transaksi_router, transaksi_async_router, f"/bpr/shop/999999/{report_name}?{report}", self.bpr
+            )
+            self.assertEqual(data, {"error": "Access denied"})
+
+    async def test_produk_reads_match_sync(self):
+        today = date.today()
+        for path in ["/most-popular", "/low-stock", f"/top-selling/{today.year}/{today.month}"]:
+            data = await self._compare(produk_router, produk_async_router, path)
+            self.assertTrue(data)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=300)
+    async def test_async_responses_are_cached(self):
+        client = TestAsyncClient(transaksi_async_router)
+        await client.get("/debt-summary", headers=self.headers)
+        await client.get("/debt-summary", headers=self.headers)
+        stats = await sync_to_async(response_cache_stats)()
+        self.assertEqual(stats["transaksi.async_api.get_debt_summary"], {"hits": 1, "misses": 1})
+
+    async def test_requires_a_token(self):
+        response = await TestAsyncClient(transaksi_async_router).get("/debt-summary")
+        self.assertEqual(response.status_code, 401)
+
+
+class DashboardTestMixin(TokoTestMixin):
+    def setUp(self):
+        super().setUp()
+        produk = self.create_product(stok=20)
+        response = TestClient(transaksi_router).post(
+            "",
+            json={
+                "transaction_type": "pemasukan",
+                "category": "Penjualan Barang",
+                "total_amount": 3000,
+                "amount": 3000,
+                "status": "Belum Lunas",
+                "items": [
+                    {
+                        "product_id": produk.id,
+                        "quantity": 2,
+                        "harga_jual_saat_transaksi": 1500,
+                        "harga_modal_saat_transaksi": 1000,
+                    }
+                ],
+            },
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+@override_settings(AUTH_PRINCIPAL_CACHE_TIMEOUT=60)
+class DashboardTests(DashboardTestMixin, TestCase):
+    router = dashboard_router
+
+    def test_all_widgets_match_their_endpoints(self):
+        response = self.client.get("", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        widgets = response.json()["widgets"]
+        self.assertEqual(list(widgets), list(WIDGETS))
+        for result in widgets.values():
+            self.assertEqual(result["status"], 200)
+            self.assertGreaterEqual(result["ms"], 0)
+
+        transaksi = TestClient(transaksi_router)
+        produk = TestClient(produk_router)
+        self.assertEqual(widgets["debt_summary"]["data"], transaksi.get("/debt-summary", headers=self.headers).json())
+        self.assertEqual(
+            widgets["monthly_summary"]["data"], transaksi.get("/summary/monthly", headers=self.headers).json()
+        )
+        self.assertEqual(widgets["low_stock"]["data"], produk.get("/low-stock", headers=self.headers).json())
+        self.assertEqual(widgets["most_popular"]["data"][0]["sold"], 2)
+        self.assertEqual(widgets["top_selling"]["data"][0]["sold"], 2)
+        self.assertEqual(widgets["aruskas"]["data"]["transactions"], [])
+
+    def test_one_round_trip_costs_one_query_per_widget_read(self):
+        # monthly, debt, popular rows + products, low stock, top selling, aruskas report
+        with self.assertNumQueries(7):
+            self.client.get("", headers=self.headers)
+
+    def test_subset_and_errors(self):
+        response = self.client.get("?widgets=debt_summary,top_selling&month=13&year=2025", headers=self.headers)
+        widgets = response.json()["widgets"]
+        self.assertEqual(list(widgets), ["debt_summary", "top_selling"])
+        self.assertEqual(widgets["debt_summary"]["status"], 200)
+        self.assertEqual(widgets["top_selling"]["status"], 400)
+        self.assertEqual(widgets["top_selling"]["message"], "Month must be between 1 and 12")
+
+        response = self.client.get("?widgets=debt_summary,cuaca", headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cuaca", response.json()["message"])
+
+
+class ParallelDashboardTests(DashboardTestMixin, TransactionTestCase):
+    def test_parallel_matches_serial(self):
+        client = TestClient(dashboard_router)
+        serial = client.get("", headers=self.headers).json()["widgets"]
+        parallel = client.get("?parallel=true", headers=self.headers).json()["widgets"]
+        self.assertEqual(
+            {name: result.get("data") for name, result in parallel.items()},
+            {name: result.get("data") for name, result in serial.items()},
+        )
+
+
+class ProdukSearchTests(TokoTestCase):
+    NAMES = ["Indomie Goreng", "Indomie Soto", "Mie Sedaap", "Kopi Kapal Api", "Aqua 600ml", "Beras Pandan Wangi"]
+
+    def setUp(self):
+        super().setUp()
+        for nama in self.NAMES:
+            self.create_product(nama)
+        other_toko = Toko.objects.create()
+        Produk.objects.create(
+            nama="Indomie Kari", foto="", harga_modal=1000, harga_jual=1500, stok=10, satuan="Pcs",
+            kategori=KategoriProduk.objects.create(nama="Makanan", toko=other_toko), toko=other_toko,
+        )
+        self.products = Produk.objects.filter(toko=self.toko)
+
+    def _names(self, products):
+        return [product.nama for product in products]
+
+    def test_filter_matches_icontains(self):
+        for query in ["indomie", "MIE", "pal a", "600", "a", "tidak ada"]:
+            self.assertEqual(
+                set(self._names(filter_products(self.products, self.toko.id, query))),
+                set(self._names(IcontainsSearch().filter(self.products, self.toko.id, query))),
+                query,
+            )
+
+    def test_index_follows_writes(self):
+        produk = Produk.objects.get(nama="Aqua 600ml")
+        produk.nama = "Le Minerale 600ml"
+        produk.save()
+        Produk.objects.filter(nama="Mie Sedaap").delete()
+
+        self.assertEqual(self._names(filter_products(self.products, self.toko.id, "minerale")), ["Le Minerale 600ml"])
+        self.assertEqual(list(filter_products(self.products, self.toko.id, "aqua")), [])
+        self.assertEqual(list(filter_products(self.products, self.toko.id, "sedaap")), [])
+
+    def test_triggers_survive_later_table_rebuilds(self):
+        if not isinstance(get_backend(), SqliteFtsSearch):
+            self.skipTest("No FTS5 search table on this database")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'produk_produk'")
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertTrue({"produk_search_ai", "produk_search_ad", "produk_search_au"} <= triggers)
+
+    def test_ranking_and_typos(self):
+        # Prefix matches first, then other substring matches; other tokos never show up
+        self.assertEqual(
+            self._names(search_products(self.toko.id, "mie")), ["Mie Sedaap", "Indomie Soto", "Indomie Goreng"]
+        )
+        self.assertEqual(self._names(search_products(self.toko.id, "indomei goreng"))[0], "Indomie Goreng")
+        self.assertEqual(self._names(search_products(self.toko.id, "kopi kpal")), ["Kopi Kapal Api"])
+        self.assertEqual(search_products(self.toko.id, "xyz"), [])
+        self.assertEqual(len(search_products(self.toko.id, "i", limit=2)), 2)
+        self.assertGreater(word_similarity("indomei", "Indomie Goreng"), 0.5)
+
+    def test_endpoints(self):
+        client = TestClient(produk_router)
+        response = client.get("/search?q=indomi", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["nama"] for p in response.json()], ["Indomie Soto", "Indomie Goreng"])
+
+        page = client.get("/page/1?q=INDOMIE", headers=self.headers).json()
+        self.assertEqual(page["total"], 2)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_search", rows=50, repeat=1, stdout=out)
+        self.assertIn(type(get_backend()).__name__, out.getvalue())
+        self.assertEqual(Produk.objects.count(), 7)
+
+
+class CatalogTests(TokoTestCase):
+    router = produk_router
+
+    def setUp(self):
+        super().setUp()
+        self.products = [self.create_product(nama) for nama in ["Indomie Goreng", "Aqua 600ml", "Kopi Kapal Api"]]
+
+    def test_snapshot_is_columnar_and_revalidates(self):
+        response = self.client.get("/catalog", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["version"], catalog.current_version(self.toko.id))
+        self.assertEqual(body["products"]["nama"], ["Indomie Goreng", "Aqua 600ml", "Kopi Kapal Api"])
+        self.assertEqual(body["products"]["kategori"], ["Makanan"] * 3)
+
+        etag = response["ETag"]
+        response = self.client.get("/catalog", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.products[0].nama = "Indomie Soto"
+        self.products[0].save()
+        response = self.client.get("/catalog", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_snapshot_revalidation_compares_whole_etags(self):
+        etag = self.client.get("/catalog", headers=self.headers)["ETag"]
+        for if_none_match, status in (
+            (f'"other", W/{etag}', 304),
+            ("*", 304),
+            (f"{etag}x", 200),
+            (f'"x{etag}"', 200),
+        ):
+            response = self.client.get("/catalog", headers={**self.headers, "If-None-Match": if_none_match})
+            self.assertEqual(response.status_code, status, if_none_match)
+
+    def test_snapshot_is_memoized_per_version(self):
+        catalog.snapshot(self.toko.id)
+        with CaptureQueriesContext(connection) as queries:
+            catalog.snapshot(self.toko.id)
+        # Only the version lookup
+        self.assertEqual(len(queries), 1)
+
+    def test_delta_tracks_updates_sales_and_deletes(self):
+        since = catalog.current_version(self.toko.id)
+        self.assertEqual(self.client.get(f"/catalog/delta?since={since}", headers=self.headers).json()["products"]["id"], [])
+
+        aqua, kopi = self.products[1], self.products[2]
+        aqua.harga_jual = 2000
+        aqua.save()
+        with transaction.atomic():
+            versi = catalog.next_version(self.toko.id)
+            apply_stock_deltas(lock_products(self.toko.id, [kopi.id]), {kopi.id: -3}, versi)
+        baru = Produk.objects.create(
+            nama="Teh Botol", foto="", harga_modal=1000, harga_jual=1500, stok=5, satuan="Pcs",
+            kategori=self.kategori, toko=self.toko,
+        )
+        deleted_id = self.products[0].id
+        self.products[0].delete()
+
+        body = self.client.get(f"/catalog/delta?since={since}", headers=self.headers).json()
+        self.assertEqual(body["products"]["id"], [aqua.id, kopi.id, baru.id])
+        self.assertEqual(body["products"]["harga_jual"], [2000.0, 1500.0, 1500.0])
+        self.assertEqual(body["products"]["stok"], [10, 7, 5])
+        self.assertEqual(body["deleted"], [deleted_id])
+        self.assertEqual(body["version"], catalog.current_version(self.toko.id))
+
+        # Caught up: nothing left to send
+        body = self.client.get(f"/catalog/delta?since={body['version']}", headers=self.headers).json()
+        self.assertEqual((body["products"]["id"], body["deleted"]), ([], []))
+
+    def test_unknown_version_conflicts(self):
+        since = catalog.current_version(self.toko.id) + 1
+        response = self.client.get(f"/catalog/delta?since={since}", headers=self.headers)
+        self.assertEqual(response.status_code, 409)
+
+
+class CatalogVersionOrderTests(TransactionTestCase):
+    """A catalog version never becomes visible before the write it stamps."""
+
+    def setUp(self):
+        self.toko = Toko.objects.create()
+        self.kategori = KategoriProduk.objects.create(nama="Makanan", toko=self.toko)
+        self.other = self._produk("Teh Botol")
+
+    def _produk(self, nama):
+        return Produk.objects.create(
+            nama=nama, foto="", harga_modal=1000, harga_jual=1500, stok=10, satuan="Pcs",
+            kategori=self.kategori, toko=self.toko,
+        )
+
+    def test_concurrent_write_waits_for_the_stamped_product(self):
+        stamped, release = threading.Event(), threading.Event()
+        next_version = catalog.next_version
+
+        def pause_after_stamping(toko_id):
+            version = next_version(toko_id)
+            if threading.current_thread().name == "writer":
+                stamped.set()
+                release.wait(5)
+            return version
+
+        def write():
+            try:
+                self._produk("Indomie Goreng")
+            finally:
+                connection.close()
+
+        outcome = []
+
+        def concurrent_write():
+            try:
+                catalog.touch(self.toko.id, [self.other.id])
+                # Committed after the paused product's version: it must be visible too
+                outcome.append(Produk.objects.filter(nama="Indomie Goreng").exists())
+            except OperationalError:
+                # SQLite's shared-cache table lock refuses instead of waiting
+                outcome.append(True)
+            finally:
+                connection.close()
+
+        with patch("produk.signals.catalog.next_version", side_effect=pause_after_stamping):
+            writer = threading.Thread(target=write, name="writer")
+            writer.start()
+            self.assertTrue(stamped.wait(5))
+            other = threading.Thread(target=concurrent_write)
+            other.start()
+            other.join(1)
+            release.set()
+            writer.join(5)
+            other.join(5)
+
+        self.assertEqual(outcome, [True])
+        indomie = Produk.objects.get(nama="Indomie Goreng")
+        self.assertEqual(indomie.versi, 2)
+
+
+@override_settings(CONDITIONAL_GET_ENABLED=True, AUTH_PRINCIPAL_CACHE_TIMEOUT=60)
+class ConditionalGetTests(TokoTestCase):
+    router = produk_router
+
+    def setUp(self):
+        super().setUp()
+        self.produk = self.create_product("Indomie Goreng")
+
+    def test_matching_etag_skips_the_handler(self):
+        response = self.client.get("/page/1", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/page/1", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+        # Other parameters are another representation
+        response = self.client.get("/page/1?sort=stok", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(f"/{self.produk.id}", headers=self.headers)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.produk.stok = 5
+            self.produk.save()
+        response = self.client.get(f"/{self.produk.id}", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["stok"], 5)
+
+        etag = self.client.get("/units", headers=self.headers)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Satuan.objects.create(nama="Lusin", toko=self.toko)
+        response = self.client.get("/units", headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(response.json(), ["Lusin"])
+
+    def test_if_modified_since(self):
+        # Last-Modified only shows once the version's second is over
+        with patch("core.conditional.time.time", return_value=time.time() + 2):
+            response = self.client.get("/low-stock", headers=self.headers)
+            last_modified = response["Last-Modified"]
+            response = self.client.get("/low-stock", headers={**self.headers, "If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get("/low-stock", headers={**self.headers, "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_errors_and_other_tokos_get_no_validators(self):
+        response = self.client.get("/999999", headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response.headers)
+
+        transaksi = TestClient(transaksi_router)
+        response = transaksi.get(f"/bpr/shop/{self.toko.id}/utang", headers=self.headers)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn("ETag", response.headers)
+
+    @override_settings(CONDITIONAL_GET_ENABLED=False)
+    def test_disabled_without_a_shared_cache(self):
+        response = self.client.get("/page/1", headers=self.headers)
+        self.assertNotIn("ETag", response.headers)
+        response = self.client.get("/page/1", headers={**self.headers, "If-None-Match": "*"})
+        self.assertEqual(response.status_code, 200)
+
+    async def test_async_routes(self):
+        client = TestAsyncClient(produk_async_router)
+        response = await client.get("/low-stock", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        response = await client.get("/low-stock", headers={**self.headers, "If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+
+class ProdukImageTests(TokoTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _photo(self, name="foto.png", size=(1000, 800), mode="RGBA"):
+        output = BytesIO()
+        Image.new(mode, size, "red").save(output, "PNG")
+        return SimpleUploadedFile(name, output.getvalue(), content_type="image/png")
+
+    def _produk(self, foto):
+        return self.create_product("Indomie Goreng", foto=foto)
+
+    def _open_variant(self, produk, variant):
+        return Image.open(default_storage.open(images.variant_name(produk.foto_hash, variant)))
+
+    def test_upload_builds_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            produk = self._produk(self._photo())
+        produk.refresh_from_db()
+
+        self.assertEqual(len(produk.foto_hash), 64)
+        thumb = self._open_variant(produk, "thumb")
+        self.assertEqual((thumb.format, thumb.size), ("WEBP", (128, 102)))
+        self.assertEqual(self._open_variant(produk, "medium").size, (512, 410))
+
+        body = ProdukResponseSchema.from_orm(produk)
+        self.assertTrue(body.foto_thumbnail.endswith(f"{produk.foto_hash}-thumb128.webp"))
+        self.assertEqual(catalog.snapshot(self.toko.id)["products"]["thumbnail"], [body.foto_thumbnail])
+
+        # Same photo again: same content address, nothing rebuilt
+        with self.captureOnCommitCallbacks(execute=True):
+            other = self._produk(self._photo(name="lagi.png"))
+        other.refresh_from_db()
+        self.assertEqual(other.foto_hash, produk.foto_hash)
+
+    def test_redirect_and_backfill(self):
+        produk = self._produk(self._photo())
+        legacy = self._produk(self._photo(size=(60, 60), mode="RGB"))
+        url = images.thumbnail_url(produk)
+        self.assertEqual(url, f"/api/produk/{produk.id}/foto/thumb")
+
+        # Until the variants exist the original is served, and nothing is built on request
+        response = TestClient(produk_router).get(f"/{produk.id}/foto/thumb")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], produk.foto.url)
+        produk.refresh_from_db()
+        self.assertEqual(produk.foto_hash, "")
+        self.assertEqual(TestClient(produk_router).get(f"/{produk.id}/foto/huge").status_code, 404)
+
+        out = StringIO()
+        call_command("backfill_produk_images", stdout=out)
+        self.assertIn("Processed 2 products, 0 failed", out.getvalue())
+        produk.refresh_from_db()
+        response = TestClient(produk_router).get(f"/{produk.id}/foto/thumb")
+        self.assertEqual(response["Location"], images.thumbnail_url(produk))
+        legacy.refresh_from_db()
+        # Never upscaled
+        self.assertEqual(self._open_variant(legacy, "thumb").size, (60, 60))
+
+    def test_unreadable_photo_falls_back_to_original(self):
+        produk = self._produk(SimpleUploadedFile("foto.png", b"not an image"))
+
+        with patch.object(images, "generate_variants") as generate_variants:
+            for _ in range(2):
+                response = TestClient(produk_router).get(f"/{produk.id}/foto/thumb")
+                self.assertEqual(response["Location"], produk.foto.url)
+        generate_variants.assert_not_called()
+
+        out = StringIO()
+        call_command("backfill_produk_images", stdout=out)
+        self.assertIn("Processed 0 products, 1 failed", out.getvalue())
+
+    @override_settings(PRODUK_IMAGE_FORMAT="JPEG")
+    def test_jpeg_variants_are_flattened(self):
+        produk = self._produk(self._photo())
+        images.generate_variants(produk)
+
+        thumb = self._open_variant(produk, "thumb")
+        self.assertEqual((thumb.format, thumb.mode), ("JPEG", "RGB"))
+
+
+class ProdukImportTests(TokoTestCase):
+    HEADER = ["nama", "harga_modal", "harga_jual", "stok", "satuan", "kategori"]
+
+    router = produk_router
+    kategori_nama = "Minuman"
+
+    def setUp(self):
+        super().setUp()
+        self.aqua = self.create_product("Aqua 600ml", harga_modal=2000, harga_jual=3000, stok=5, satuan="Botol")
+
+    def _csv(self, rows, header=None, delimiter=","):
+        lines = [header or self.HEADER, *rows]
+        content = "\n".join(delimiter.join(map(str, line)) for line in lines)
+        return SimpleUploadedFile("produk.csv", content.encode("utf-8-sig"), content_type="text/csv")
+
+    def _import(self, file, path="/import"):
+        return self.client.post(path, FILES={"file": file}, headers=self.headers)
+
+    def test_csv_creates_updates_and_reports_bad_rows(self):
+        other_toko = Toko.objects.create()
+        other = Produk.objects.create(
+            nama="Rahasia", foto="", harga_modal=1, harga_jual=1, stok=1, satuan="Pcs",
+            kategori=KategoriProduk.objects.create(nama="Lain", toko=other_toko), toko=other_toko,
+        )
+        file = self._csv(
+            [
+                ["Indomie Goreng", 2500, 3500, 40, "Pcs", "Makanan"],
+                ["Aqua 600ml", 2100, 3200, 12, "Botol", "Minuman"],
+                ["Rusak", -1, 3000, 1, "Pcs", "Makanan"],
+                ["", 1000, 2000, 1, "Pcs", "Makanan"],
+                ["Teh Botol", "abc", 4000, 1, "Botol", "Minuman"],
+                ["Sabun", 1000, 2000, 3, "Batang panjang sekali", "Mandi"],
+                [],
+                ["Indomie Goreng", 2600, 3600, 50, "Pcs", "Makanan"],
+            ],
+            header=[" Nama", "HARGA_MODAL", "harga_jual", "stok", "satuan", "Kategori "],
+            delimiter=";",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._import(file)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["created"], body["updated"], body["failed"]), (1, 1, 4))
+        self.assertEqual([error["row"] for error in body["errors"]], [4, 5, 6, 7])
+        self.assertIn("nama is required", body["errors"][1]["message"])
+
+        self.aqua.refresh_from_db()
+        self.assertEqual((self.aqua.harga_jual, self.aqua.stok), (3200, 12))
+        # The later row for the same name wins
+        indomie = Produk.objects.get(toko=self.toko, nama="Indomie Goreng")
+        self.assertEqual((indomie.harga_modal, indomie.stok, indomie.kategori.nama), (2600, 50, "Makanan"))
+        self.assertEqual(
+            set(KategoriProduk.objects.filter(toko=self.toko).values_list("nama", flat=True)), {"Minuman", "Makanan"}
+        )
+        self.assertEqual(set(Satuan.objects.filter(toko=self.toko).values_list("nama", flat=True)), {"Pcs", "Botol"})
+        self.assertFalse(Produk.objects.filter(nama="Rahasia", toko=self.toko).exists())
+        other.refresh_from_db()
+        self.assertEqual(other.nama, "Rahasia")
+
+        # Searchable, and visible to catalog deltas
+        self.assertEqual([p.nama for p in search_products(self.toko.id, "indomie")], ["Indomie Goreng"])
+        self.assertEqual(indomie.versi, catalog.current_version(self.toko.id))
+
+    def test_xlsx_updates_by_id(self):
+        other = Produk.objects.create(
+            nama="Milik toko lain", foto="", harga_modal=1, harga_jual=1, stok=1, satuan="Pcs",
+            kategori=self.kategori, toko=Toko.objects.create(),
+        )
+        rows = [
+            ["id", *self.HEADER],
+            [self.aqua.id, "Aqua 1500ml", 4000, 6000, 8, "Botol", "Minuman"],
+            [other.id, "Dibajak", 1, 1, 1, "Pcs", "Minuman"],
+            ["", "Kopi Kapal Api", 1000, 1500, 20, "Sachet", "Minuman"],
+        ]
+        content = b"".join(xlsx_chunks(rows))
+        before = toko_version(self.toko.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._import(SimpleUploadedFile("produk.XLSX", content))
+
+        body = response.json()
+        self.assertEqual((body["created"], body["updated"], body["failed"]), (1, 1, 1))
+        self.assertEqual(body["errors"], [{"row": 3, "message": f"Produk {other.id} tidak ditemukan"}])
+        self.aqua.refresh_from_db()
+        self.assertEqual((self.aqua.nama, self.aqua.harga_jual), ("Aqua 1500ml", 6000))
+        other.refresh_from_db()
+        self.assertEqual(other.nama, "Milik toko lain")
+        self.assertNotEqual(toko_version(self.toko.id), before)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def import_queries(count, prefix):
+            rows = [[f"{prefix} {i}", 1000, 1500, i, f"{prefix[0]}{i % 3}", f"{prefix} {i % 4}"] for i in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self._import(self._csv(rows))
+            self.assertEqual(response.json()["created"], count)
+            return len(queries)
+
+        # First request caches the principal
+        import_queries(1, "Pemanasan")
+        # 60 rows still fit one INSERT under SQLite's variable limit
+        self.assertEqual(import_queries(5, "Kecil"), import_queries(60, "Besar"))
+
+    def test_unreadable_files_are_rejected(self):
+        response = self._import(self._csv([["Aqua"]], header=["nama", "harga"]))
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("harga_modal", response.json()["message"])
+
+        response = self._import(SimpleUploadedFile("produk.pdf", b"%PDF"))
+        self.assertEqual(response.json(), {"message": "File must be csv or xlsx"})
+
+        response = self._import(SimpleUploadedFile("produk.bin", b"not a zip"), path="/import?format=xlsx")
+        self.assertEqual(response.json(), {"message": "Not a valid xlsx file"})
+
+    @patch("produk.imports.IMPORT_CHUNK_SIZE", 100)
+    def test_damage_after_written_chunks_is_reported_with_counts(self):
+        # A latin-1 byte well past the first block the text layer decodes
+        rows = "".join(f"Produk {i},1000,1500,1,Pcs,Makanan\n" for i in range(1000))
+        content = f"{','.join(self.HEADER)}\n{rows}".encode() + b"Kop\xe9,1000,1500,1,Pcs,Makanan\n"
+        before = toko_version(self.toko.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._import(SimpleUploadedFile("produk.csv", content))
+
+        self.assertEqual(response.status_code, 422)
+        body = response.json()
+        self.assertIn("File is not UTF-8 text", body["message"])
+        written = Produk.objects.filter(toko=self.toko, nama__startswith="Produk ").count()
+        self.assertGreater(written, 0)
+        self.assertEqual((body["created"], body["updated"]), (written, 0))
+        self.assertIn(f"{written} products were created", body["message"])
+        self.assertNotEqual(toko_version(self.toko.id), before)
+
+    def test_malformed_files_are_rejected_not_500(self):
+        huge = "x" * (csv.field_size_limit() + 1)
+        response = self._import(self._csv([[huge, 1000, 1500, 1, "Pcs", "Makanan"]]))
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("Invalid CSV at line 2", response.json()["message"])
+
+        # A shared string that doesn't exist, and a sheet cut off mid-row
+        for damage in (b"<row><c t=\"s\"><v>99</v></c></row></sheetData>", b"<row><c>"):
+            broken = BytesIO()
+            with zipfile.ZipFile(BytesIO(b"".join(xlsx_chunks([self.HEADER])))) as source, zipfile.ZipFile(broken, "w") as target:
+                for item in source.infolist():
+                    data = source.read(item)
+                    if item.filename.startswith("xl/worksheets/"):
+                        data = data.replace(b"</sheetData>", damage)
+                    target.writestr(item, data)
+            response = self._import(SimpleUploadedFile("produk.xlsx", broken.getvalue()))
+            self.assertEqual(response.status_code, 422)
+            self.assertEqual(response.json(), {"message": "Not a valid xlsx file"})
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8") as file:
+            file.write("nama,harga_modal,harga_jual,stok,satuan,kategori\nGula 1kg,12000,14000,10,Kg,Sembako\n,1,1,1,,\n")
+            file.flush()
+            out = StringIO()
+            call_command("import_produk", file.name, toko=self.toko.id, stdout=out)
+
+        self.assertIn("row 3: nama is required", out.getvalue())
+        self.assertIn("Created 1 products, updated 0, 1 failed", out.getvalue())
+        self.assertTrue(Produk.objects.filter(toko=self.toko, nama="Gula 1kg").exists())
+
+
+class MetricsTests(TokoTestCase):
+    def setUp(self):
+        super().setUp()
+        REGISTRY.reset()
+        self.products = [self.create_product(f"Produk {i}", stok=50) for i in range(6)]
+
+    def _handle(self, request):
+        # What Django's handler does after the middleware, minus Silk
+        request.resolver_match = resolve(request.path)
+        return request.resolver_match.func(request, *request.resolver_match.args, **request.resolver_match.kwargs)
+
+    def test_middleware_records_route_histograms(self):
+        middleware = MetricsMiddleware(self._handle)
+        factory = RequestFactory(headers=self.headers)
+        for produk in self.products[:3]:
+            response = middleware(factory.get(f"/api/produk/{produk.id}"))
+            self.assertEqual(response.status_code, 200)
+
+        body = get_metrics(RequestFactory().get("/api/metrics")).content.decode()
+        labels = 'route="api/produk/<id>",method="GET"'
+        self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 3", body)
+        self.assertIn(f'http_request_queries_bucket{{{labels},le="0"}} 0', body)
+        self.assertIn(f'http_request_queries_bucket{{{labels},le="+Inf"}} 3', body)
+        self.assertIn(f'http_responses_total{{{labels},status="200"}} 3', body)
+
+        # Routers are rebound to the api of the last TestClient built on them;
+        # an api-level route always renders through backend.api's renderer
+        middleware(factory.get("/api/version"))
+        body = get_metrics(RequestFactory().get("/api/metrics")).content.decode()
+        serialization = next(
+            line for line in body.splitlines() if line.startswith('http_request_serialization_seconds_sum{route="api/version"')
+        )
+        self.assertGreater(float(serialization.split()[-1]), 0)
+
+    def test_metrics_token(self):
+        with override_settings(METRICS_TOKEN="rahasia"):
+            self.assertEqual(get_metrics(RequestFactory().get("/api/metrics")).status_code, 401)
+            request = RequestFactory(headers={"Authorization": "Bearer rahasia"}).get("/api/metrics")
+            response = get_metrics(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+    def test_test_runs_are_strict(self):
+        # Set by core.test_runner / conftest.py, not by how the suite was started
+        self.assertTrue(settings.QUERY_BUDGET_STRICT)
+
+    def test_query_budget(self):
+        @query_budget(2)
+        def view(request, count):
+            for _ in range(count):
+                Toko.objects.exists()
+            return count
+
+        request = RequestFactory().get("/")
+        with measure() as meter:
+            self.assertEqual(view(request, 2), 2)
+        self.assertEqual(meter.queries, 2)
+        with self.assertRaisesMessage(QueryBudgetExceeded, "ran 3 queries, its budget is 2"):
+            view(request, 3)
+
+        with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs("core.metrics", "WARNING"):
+            self.assertEqual(view(request, 3), 3)
+        self.assertIn("http_query_budget_exceeded_total{view=", REGISTRY.render())
+
+    def test_async_query_budget(self):
+        @query_budget(1)
+        async def view(request):
+            await sync_to_async(Toko.objects.exists)()
+            await sync_to_async(Toko.objects.exists)()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            async_to_sync(view)(RequestFactory().get("/"))
+
+    def test_transaksi_detail_within_budget_for_many_items(self):
+        client = TestClient(transaksi_router)
+        items = [
+            {"product_id": produk.id, "quantity": 1, "harga_jual_saat_transaksi": 1500, "harga_modal_saat_transaksi": 1000}
+            for produk in self.products
+        ]
+        response = client.post(
+            "",
+            json={
+                "transaction_type": "pemasukan", "category": "Penjualan Barang", "total_amount": 9000,
+                "amount": 9000, "status": "Lunas", "items": items,
+            },
+            headers=self.headers,
+        )
+        # Items and their products are prefetched, not loaded one by one
+        response = client.get(f"/{response.json()['id']}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 6)
+
+
+
+class SilkSamplingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(
+            username="staff", email="staff@example.com", password="password", is_staff=True
+        )
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="password")
+
+    def _request(self, path="/api/produk", user=None, force=False):
+        headers = auth_headers(user) if user else {}
+        if force:
+            headers[profiling.FORCE_HEADER] = "1"
+        return RequestFactory(headers=headers).get(path)
+
+    @override_settings(SILK_SAMPLE_RATE=0.01, SILK_SAMPLE_ROUTES={"/api/transaksi": 0.5, "/api/transaksi/bulk": 1.0})
+    def test_sample_rate_per_route(self):
+        self.assertEqual(profiling.sample_rate("/api/produk"), 0.01)
+        self.assertEqual(profiling.sample_rate("/api/transaksi/abc"), 0.5)
+        self.assertEqual(profiling.sample_rate("/api/transaksi/bulk"), 1.0)
+
+    @override_settings(SILK_SAMPLE_RATE=0)
+    def test_staff_can_force_a_capture(self):
+        self.assertFalse(profiling.should_profile(self._request()))
+        self.assertTrue(profiling.should_profile(self._request(user=self.staff, force=True)))
+        self.assertFalse(profiling.should_profile(self._request(user=self.owner, force=True)))
+        self.assertFalse(profiling.should_profile(self._request(user=self.staff)))
+
+    @override_settings(SILK_SAMPLE_RATE=0, SILK_SLOW_REQUEST_MS=20, SILK_PURGE_INTERVAL=0)
+    def test_unsampled_slow_requests_get_a_summary(self):
+        def slow(request):
+            Toko.objects.exists()
+            time.sleep(0.03)
+            return HttpResponse(status=201)
+
+        middleware = profiling.SampledSilkyMiddleware(slow)
+        middleware(self._request("/api/transaksi?page=2"))
+        middleware = profiling.SampledSilkyMiddleware(lambda request: HttpResponse())
+        middleware(self._request("/api/produk"))
+
+        recorded = SilkRequest.objects.get()
+        self.assertEqual((recorded.path, recorded.method, recorded.num_sql_queries), ("/api/transaksi", "GET", 1))
+        self.assertEqual(json.loads(recorded.query_params), {"page": "2"})
+        self.assertGreaterEqual(recorded.time_taken, 20)
+        self.assertEqual(recorded.response.status_code, 201)
+
+    def _record(self, count, age):
+        for _ in range(count):
+            SilkRequest.objects.create(path="/api/produk", method="GET", start_time=timezone.now() - age)
+
+    def test_purge_keeps_recent_and_bounded_history(self):
+        self._record(3, timedelta(days=10))
+        self._record(5, timedelta(hours=1))
+        self._record(2, timedelta(minutes=1))
+
+        self.assertEqual(profiling.purge(retention_days=7, max_requests=0), 3)
+        self.assertEqual(SilkRequest.objects.count(), 7)
+        self.assertEqual(profiling.purge(retention_days=7, max_requests=2), 5)
+        self.assertEqual(SilkRequest.objects.count(), 2)
+
+        out = StringIO()
+        call_command("purge_silk", days=0, stdout=out)
+        self.assertIn("Deleted 2 recorded requests", out.getvalue())
+
+    @override_settings(SILK_RETENTION_DAYS=7, SILK_PURGE_INTERVAL=3600)
+    def test_purge_runs_once_per_interval(self):
+        self._record(2, timedelta(days=10))
+        # The test database is not visible from another thread's connection
+        with patch.object(profiling, "_next_purge_check", 0.0), patch.object(
+            profiling, "_start", side_effect=lambda target: target()
+        ) as start, patch.object(profiling.connection, "close"):
+            profiling.purge_if_due()
+            start.assert_called_once_with(profiling._purge_in_background)
+            self.assertFalse(SilkRequest.objects.exists())
+
+            self._record(2, timedelta(days=10))
+            profiling.purge_if_due()
+            self.assertEqual(SilkRequest.objects.count(), 2)
+
+
+class SeedLoadtestTests(TestCase):
+    def _seed(self, output, sales):
+        with override_settings(SEED_LOGS_DIR=os.path.dirname(output)):
+            call_command(
+                "seed_loadtest", shops=1, mode="local", sales=sales, days=30, output=output, stdout=StringIO()
+            )
+        with open(output) as file:
+            return json.load(file)
+
+    def test_seeds_history_and_accounts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = f"{directory}/accounts.json"
+            manifest = self._seed(output, sales=20)
+            shop = manifest["shops"][0]
+            sales = Transaksi.objects.filter(toko_id=shop["toko_id"], category="Penjualan Barang")
+
+            self.assertEqual(manifest["bpr_email"], settings.BPR_EMAIL)
+            self.assertTrue(User.objects.filter(email=settings.BPR_EMAIL).exists())
+            self.assertEqual(shop["owner_email"], "loadtest-owner-0@example.com")
+            self.assertTrue(User.objects.filter(email__in=shop["cashier_emails"], toko_id=shop["toko_id"]).exists())
+            self.assertTrue(shop["products"])
+            self.assertEqual(sales.filter(idempotency_key__startswith="loadtest-").count(), 20)
+            self.assertTrue(sales.filter(created_at__lt=timezone.now() - timedelta(hours=1)).exists())
+
+            # A second run only tops the history up
+            self._seed(output, sales=25)
+            self.assertEqual(sales.filter(idempotency_key__startswith="loadtest-").count(), 25)
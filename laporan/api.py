@@ -3,18 +3,18 @@ from datetime import date, datetime
 from decimal import Decimal
 from typing import List, Optional
 
-from django.db.models import Sum
 from django.shortcuts import get_object_or_404
 from ninja import Router
 from ninja.security import django_auth
 from ninja.errors import HttpError
-from ninja.security import HttpBearer
-import jwt
-from backend import settings
 
+from core.conditional import bpr_shop, conditional_per_toko
+from laporan import queries
 from laporan.models import ArusKasReport, DetailArusKas
-from transaksi.models import Transaksi
-from authentication.models import Toko, User
+from laporan.rollup import rollup_range
+from transaksi.aggregates import bucket_sums, category_buckets
+from authentication.models import Toko
+from authentication.security import AuthBearer
 from .schemas import (
     ArusKasReportWithDetailsSchema,
     DateRangeRequest,
@@ -28,22 +28,14 @@ router = Router(tags=["Income Statement"])
 
 
 def _aggregate(toko: Toko, start: date, end: date):
-    qs = Transaksi.objects.filter(
-        toko=toko,
-        is_deleted=False,
-        status="Lunas",
-        created_at__date__gte=start,
-        created_at__date__lte=end,
+    qs = rollup_range(toko.id, start, end).filter(status="Lunas")
+
+    totals = bucket_sums(
+        qs, category_buckets([*INCOME_CATEGORIES.values(), *EXPENSE_CATEGORIES.values()])
     )
 
     def sum_by(cats: dict) -> List[IncomeStatementLine]:
-        out = []
-        for label in cats.values():
-            amt = qs.filter(category=label).aggregate(total=Sum("total_amount"))[
-                "total"
-            ] or Decimal("0")
-            out.append(IncomeStatementLine(name=label, total=amt))
-        return out
+        return [IncomeStatementLine(name=label, total=totals[label]) for label in cats.values()]
 
     inc = sum_by(INCOME_CATEGORIES)
     exp = sum_by(EXPENSE_CATEGORIES)
@@ -96,21 +88,19 @@ def _month_bounds(year: int, month: int):
 
 
 def _aggregate(toko: Toko, first: date, last: date):
-    base_qs = Transaksi.objects.filter(
-        toko=toko,
-        is_deleted=False,
-        status="Lunas",
-        created_at__date__range=(first, last),
+    base_qs = rollup_range(toko.id, first, last).filter(status="Lunas")
+
+    # Every income and expense category is summed in a single query
+    totals = bucket_sums(
+        base_qs,
+        category_buckets([*INCOME_CATEGORIES.values(), *EXPENSE_CATEGORIES.values()]),
     )
 
     def sum_by(categories: dict) -> List[IncomeStatementLine]:
-        lines = []
-        for label in categories.values():
-            total = base_qs.filter(category=label).aggregate(total=Sum("total_amount"))[
-                "total"
-            ] or Decimal("0")
-            lines.append(IncomeStatementLine(name=label, total=total))
-        return lines
+        return [
+            IncomeStatementLine(name=label, total=totals[label])
+            for label in categories.values()
+        ]
 
     income_lines = sum_by(INCOME_CATEGORIES)
     expense_lines = sum_by(EXPENSE_CATEGORIES)
@@ -150,18 +140,6 @@ def download_income_statement(request, month: str):
     return build_csv(month, toko.id, income_lines, expense_lines, net)
 
 
-class AuthBearer(HttpBearer):
-    def authenticate(self, request, token):
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id = payload.get("user_id")
-            if user_id:
-                return user_id
-        except jwt.PyJWTError:
-            return None
-        return None
-
-
 router = Router(auth=AuthBearer())
 
 
@@ -172,6 +150,7 @@ def _month_bounds(year: int, month: int):
 
 
 @router.get("/aruskas-report", response=ArusKasReportWithDetailsSchema)
+@conditional_per_toko()
 def aruskas_report(
     request, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None
 ):
@@ -179,33 +158,11 @@ def aruskas_report(
     Get a cash flow report with optional date filters for transactions.
     """
     if hasattr(request, "auth") and request.auth:
-        user_id = request.auth
-        user = User.objects.get(id=user_id)
-        toko = user.toko
+        toko_id = request.auth.toko_id
     else:
-        toko = request.user.toko
-
-    report = ArusKasReport.objects.filter(toko=toko).first()
+        toko_id = request.user.toko_id
 
-    if not report:
-        return ArusKasReportWithDetailsSchema(
-            id=0,
-            month=0,
-            year=0,
-            total_inflow=Decimal("0"),
-            total_outflow=Decimal("0"),
-            balance=Decimal("0"),
-            transactions=[],
-        )
-
-    transactions = DetailArusKas.objects.filter(report=report)
-
-    if start_date:
-        transactions = transactions.filter(tanggal_transaksi__gte=start_date)
-    if end_date:
-        transactions = transactions.filter(tanggal_transaksi__lte=end_date)
-
-    return ArusKasReportWithDetailsSchema.from_report(report, transactions)
+    return queries.aruskas_report(toko_id, start_date, end_date)
 
 
 # laporan/api.py
@@ -214,15 +171,12 @@ def aruskas_report(
     response={200: ArusKasReportWithDetailsSchema, 403: dict, 404: dict},
     auth=AuthBearer(),
 )
+@conditional_per_toko(toko=bpr_shop)
 def get_shop_aruskas_for_bpr(request, shop_id: int):
     """Get cash flow report for a specific shop for BPR users."""
-    user_id = request.auth
-
     try:
-        user = User.objects.get(id=user_id)
-
         # Check ONLY the email, not the role
-        if user.email != settings.BPR_EMAIL:
+        if not request.auth.is_bpr:
             return 403, {"error": "Only BPR users can access this endpoint"}
 
         # Get the shop
@@ -0,0 +1,157 @@
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.timezone import localtime
+
+from transaksi.models import Transaksi
+from .models import ArusKasReport, DetailArusKas
+
+CHUNK_SIZE = 1000
+
+_local = threading.local()
+
+
+def schedule(transaksi_id):
+    """
+    Queue a transaction for the ArusKas ledger once the current DB transaction commits.
+
+    Every save in one DB transaction is flushed together by a single ``sync``
+    call, so a seeder or import that saves thousands of rows pays for a few
+    set-based statements instead of a report update per row.
+    """
+    schedule_many([transaksi_id])
+
+
+def schedule_many(transaksi_ids):
+    """``schedule`` for a batch of transactions."""
+    pending = getattr(_local, "pending", None)
+    if pending is None:
+        pending = _local.pending = set()
+    pending.update(transaksi_ids)
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    pending = getattr(_local, "pending", None)
+    _local.pending = set()
+    if pending:
+        sync(pending)
+
+
+def sync(transaksi_ids):
+    """
+    Make the ledger match the current state of the given transactions (bulk mode).
+
+    A transaction that is "Lunas" and not deleted has exactly one DetailArusKas
+    row; anything else has none. Running it twice for the same IDs is a no-op,
+    and IDs that no longer exist (e.g. from a rolled-back transaction) only
+    lose their stale ledger rows.
+    """
+    ids = sorted(set(transaksi_ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        _sync_chunk(ids[start : start + CHUNK_SIZE])
+
+
+def _jenis(transaksi):
+    return "inflow" if transaksi.transaction_type.lower() in ["pemasukan"] else "outflow"
+
+
+def _report_key(transaksi):
+    waktu = localtime(transaksi.created_at)
+    return (transaksi.toko_id, waktu.month, waktu.year)
+
+
+def _ensure_reports(keys):
+    """Report id per (toko_id, bulan, tahun), creating missing months in bulk."""
+    if not keys:
+        return {}
+    lookup = Q()
+    for toko_id, bulan, tahun in keys:
+        lookup |= Q(toko_id=toko_id, bulan=bulan, tahun=tahun)
+
+    ArusKasReport.objects.bulk_create(
+        [ArusKasReport(toko_id=toko_id, bulan=bulan, tahun=tahun) for toko_id, bulan, tahun in keys],
+        ignore_conflicts=True,
+    )
+    return {
+        (toko_id, bulan, tahun): report_id
+        for report_id, toko_id, bulan, tahun in ArusKasReport.objects.filter(lookup).values_list(
+            "id", "toko_id", "bulan", "tahun"
+        )
+    }
+
+
+@transaction.atomic
+def _sync_chunk(ids):
+    transactions = Transaksi.objects.filter(id__in=ids).only(
+        "id", "toko_id", "transaction_type", "category", "amount", "status", "is_deleted", "created_at"
+    )
+    wanted = {t.id: t for t in transactions if t.status == "Lunas" and not t.is_deleted}
+    report_ids = _ensure_reports({_report_key(t) for t in wanted.values()})
+
+    # Lock every report this chunk touches (new and old months) so concurrent
+    # syncs of the same report serialize and never double count.
+    list(
+        ArusKasReport.objects.select_for_update()
+        .filter(
+            Q(id__in=report_ids.values())
+            | Q(id__in=DetailArusKas.objects.filter(transaksi_id__in=ids).values("report_id"))
+        )
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+    existing = {}
+    stale = []
+    for detail in DetailArusKas.objects.filter(transaksi_id__in=ids):
+        transaksi = wanted.get(detail.transaksi_id)
+        up_to_date = (
+            transaksi is not None
+            and detail.transaksi_id not in existing
+            and detail.report_id == report_ids[_report_key(transaksi)]
+            and detail.jenis == _jenis(transaksi)
+            and detail.nominal == Decimal(str(transaksi.amount))
+        )
+        if up_to_date:
+            existing[detail.transaksi_id] = detail
+        else:
+            stale.append(detail)
+
+    # report_id -> [inflow delta, outflow delta]
+    deltas = defaultdict(lambda: [Decimal("0"), Decimal("0")])
+    for detail in stale:
+        deltas[detail.report_id][0 if detail.jenis == "inflow" else 1] -= detail.nominal
+    if stale:
+        DetailArusKas.objects.filter(id__in=[detail.id for detail in stale]).delete()
+
+    new_details = []
+    for transaksi_id, transaksi in wanted.items():
+        if transaksi_id in existing:
+            continue
+        jenis = _jenis(transaksi)
+        nominal = Decimal(str(transaksi.amount))
+        report_id = report_ids[_report_key(transaksi)]
+        deltas[report_id][0 if jenis == "inflow" else 1] += nominal
+        new_details.append(
+            DetailArusKas(
+                report_id=report_id,
+                transaksi_id=transaksi_id,
+                jenis=jenis,
+                nominal=nominal,
+                kategori=transaksi.category,
+                tanggal_transaksi=transaksi.created_at,
+                keterangan=f"Transaksi {transaksi.category}",
+            )
+        )
+    DetailArusKas.objects.bulk_create(new_details, batch_size=CHUNK_SIZE)
+
+    for report_id, (inflow, outflow) in deltas.items():
+        if inflow or outflow:
+            ArusKasReport.objects.filter(id=report_id).update(
+                total_inflow=F("total_inflow") + inflow,
+                total_outflow=F("total_outflow") + outflow,
+                saldo=F("saldo") + inflow - outflow,
+            )
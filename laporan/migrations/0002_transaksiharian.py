@@ -0,0 +1,66 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_transaksi_harian(apps, schema_editor):
+    Transaksi = apps.get_model('transaksi', 'Transaksi')
+    TransaksiHarian = apps.get_model('laporan', 'TransaksiHarian')
+
+    rows = (
+        Transaksi.objects.filter(is_deleted=False)
+        .annotate(tanggal=TruncDate('created_at'))
+        .values('toko_id', 'tanggal', 'transaction_type', 'category', 'status')
+        .annotate(sum_amount=Sum('total_amount'), sum_modal=Sum('total_modal'), jumlah=Count('id'))
+        .order_by()
+    )
+    TransaksiHarian.objects.bulk_create(
+        (
+            TransaksiHarian(
+                toko_id=row['toko_id'],
+                tanggal=row['tanggal'],
+                transaction_type=row['transaction_type'],
+                category=row['category'],
+                status=row['status'],
+                total_amount=row['sum_amount'],
+                total_modal=row['sum_modal'],
+                jumlah_transaksi=row['jumlah'],
+            )
+            for row in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_user_role'),
+        ('laporan', '0001_initial'),
+        ('transaksi', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransaksiHarian',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('tanggal', models.DateField()),
+                ('transaction_type', models.CharField(max_length=20)),
+                ('category', models.CharField(max_length=50)),
+                ('status', models.CharField(max_length=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_modal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('jumlah_transaksi', models.IntegerField(default=0)),
+                ('toko', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaksi_harian', to='authentication.toko')),
+            ],
+            options={
+                'ordering': ['-tanggal'],
+                'unique_together': {('toko', 'tanggal', 'transaction_type', 'category', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_transaksi_harian, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:02
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Q, Sum
+
+
+def drop_duplicate_details(apps, schema_editor):
+    """The old post_save handler added an entry on every save; keep the first one."""
+    ArusKasReport = apps.get_model('laporan', 'ArusKasReport')
+    DetailArusKas = apps.get_model('laporan', 'DetailArusKas')
+
+    duplicates = (
+        DetailArusKas.objects.filter(transaksi__isnull=False)
+        .values('transaksi_id')
+        .annotate(keep=Min('id'), n=Count('id'))
+        .filter(n__gt=1)
+    )
+    affected_reports = set()
+    for row in duplicates:
+        extra = DetailArusKas.objects.filter(transaksi_id=row['transaksi_id']).exclude(id=row['keep'])
+        affected_reports.update(extra.values_list('report_id', flat=True))
+        extra.delete()
+
+    for report in ArusKasReport.objects.filter(id__in=affected_reports):
+        totals = DetailArusKas.objects.filter(report=report).aggregate(
+            inflow=Sum('nominal', filter=Q(jenis='inflow')),
+            outflow=Sum('nominal', filter=Q(jenis='outflow')),
+        )
+        report.total_inflow = totals['inflow'] or 0
+        report.total_outflow = totals['outflow'] or 0
+        report.saldo = report.total_inflow - report.total_outflow
+        report.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laporan', '0002_transaksiharian'),
+        ('transaksi', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_details, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='detailaruskas',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaksi__isnull', False)), fields=('transaksi',), name='unique_detail_aruskas_per_transaksi'),
+        ),
+    ]
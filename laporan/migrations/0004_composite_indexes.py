@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laporan', '0003_unique_detail_aruskas_per_transaksi'),
+        ('transaksi', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='detailaruskas',
+            index=models.Index(fields=['report', '-tanggal_transaksi'], name='detailaruskas_report_tgl_idx'),
+        ),
+    ]
@@ -64,6 +64,37 @@ class DetailArusKas(models.Model):
     
     class Meta:
         ordering = ['-tanggal_transaksi']
+        constraints = [
+            # One ledger entry per transaksi; manual entries have no transaksi
+            models.UniqueConstraint(
+                fields=['transaksi'],
+                condition=models.Q(transaksi__isnull=False),
+                name='unique_detail_aruskas_per_transaksi',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['report', '-tanggal_transaksi'], name='detailaruskas_report_tgl_idx'),
+        ]
         
     def __str__(self):
-        return f"{self.jenis.capitalize()} - {self.transaksi.id if self.transaksi else 'Manual'} - {self.nominal}"
\ No newline at end of file
+        return f"{self.jenis.capitalize()} - {self.transaksi.id if self.transaksi else 'Manual'} - {self.nominal}"
+
+class TransaksiHarian(models.Model):
+    """Per-toko daily rollup of transactions, kept in step by laporan.rollup."""
+
+    id = models.AutoField(primary_key=True)
+    toko = models.ForeignKey(Toko, on_delete=models.CASCADE, related_name="transaksi_harian")
+    tanggal = models.DateField()
+    transaction_type = models.CharField(max_length=20)
+    category = models.CharField(max_length=50)
+    status = models.CharField(max_length=20)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_modal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    jumlah_transaksi = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-tanggal']
+        unique_together = ['toko', 'tanggal', 'transaction_type', 'category', 'status']
+
+    def __str__(self):
+        return f"Transaksi Harian - {self.tanggal} - {self.category} ({self.status})"
@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+from laporan.models import ArusKasReport, DetailArusKas
+from laporan.schemas import ArusKasReportWithDetailsSchema
+
+# Report building shared by ``laporan.api`` and the composite dashboard.
+
+
+def aruskas_report(toko_id, start_date=None, end_date=None):
+    """The toko's cash flow report, its details optionally limited to a date range."""
+    report = ArusKasReport.objects.filter(toko_id=toko_id).first()
+
+    if not report:
+        return ArusKasReportWithDetailsSchema(
+            id=0,
+            month=0,
+            year=0,
+            total_inflow=Decimal("0"),
+            total_outflow=Decimal("0"),
+            balance=Decimal("0"),
+            transactions=[],
+        )
+
+    transactions = DetailArusKas.objects.filter(report=report)
+
+    if start_date:
+        transactions = transactions.filter(tanggal_transaksi__gte=start_date)
+    if end_date:
+        transactions = transactions.filter(tanggal_transaksi__lte=end_date)
+
+    return ArusKasReportWithDetailsSchema.from_report(report, transactions)
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from transaksi.models import Transaksi
+from .models import TransaksiHarian
+
+ROLLUP_KEY = ("toko_id", "tanggal", "transaction_type", "category", "status")
+
+
+def record(transaksi, sign=1, status=None):
+    """
+    Add (``sign=1``) or remove (``sign=-1``) one transaction from its daily row.
+
+    ``status`` overrides ``transaksi.status`` so a status change can take the
+    transaction out of the bucket it used to be in.
+    """
+    row, _ = TransaksiHarian.objects.get_or_create(
+        toko_id=transaksi.toko_id,
+        tanggal=timezone.localtime(transaksi.created_at).date(),
+        transaction_type=transaksi.transaction_type,
+        category=transaksi.category,
+        status=status or transaksi.status,
+    )
+    TransaksiHarian.objects.filter(pk=row.pk).update(
+        total_amount=F("total_amount") + sign * Decimal(str(transaksi.total_amount)),
+        total_modal=F("total_modal") + sign * Decimal(str(transaksi.total_modal)),
+        jumlah_transaksi=F("jumlah_transaksi") + sign,
+    )
+
+
+def record_many(transactions):
+    """
+    ``record`` for a batch of new transactions: missing daily rows are
+    inserted in one statement, then each row touched gets one ``UPDATE``.
+    """
+    totals = defaultdict(lambda: [Decimal("0"), Decimal("0"), 0])
+    for transaksi in transactions:
+        key = (
+            transaksi.toko_id,
+            timezone.localtime(transaksi.created_at).date(),
+            transaksi.transaction_type,
+            transaksi.category,
+            transaksi.status,
+        )
+        total = totals[key]
+        total[0] += Decimal(str(transaksi.total_amount))
+        total[1] += Decimal(str(transaksi.total_modal))
+        total[2] += 1
+    if not totals:
+        return
+
+    TransaksiHarian.objects.bulk_create(
+        [TransaksiHarian(**dict(zip(ROLLUP_KEY, key))) for key in totals], ignore_conflicts=True
+    )
+    for key, (amount, modal, count) in totals.items():
+        TransaksiHarian.objects.filter(**dict(zip(ROLLUP_KEY, key))).update(
+            total_amount=F("total_amount") + amount,
+            total_modal=F("total_modal") + modal,
+            jumlah_transaksi=F("jumlah_transaksi") + count,
+        )
+
+
+def move_status(transaksi, old_status):
+    """Shift a transaction from its ``old_status`` row to its current one."""
+    record(transaksi, sign=-1, status=old_status)
+    record(transaksi)
+
+
+def rollup_range(toko_id, start, end):
+    """Daily rows for a toko between two dates, both inclusive."""
+    return TransaksiHarian.objects.filter(toko_id=toko_id, tanggal__range=(start, end))
+
+
+def _expected_rows(toko_id=None):
+    qs = Transaksi.objects.filter(is_deleted=False)
+    if toko_id is not None:
+        qs = qs.filter(toko_id=toko_id)
+    return (
+        qs.annotate(tanggal=TruncDate("created_at"))
+        .values(*ROLLUP_KEY)
+        .annotate(
+            sum_amount=Sum("total_amount"),
+            sum_modal=Sum("total_modal"),
+            jumlah=Count("id"),
+        )
+        .order_by()
+    )
+
+
+@transaction.atomic
+def rebuild(toko_id=None):
+    """Recompute the rollup from raw transactions. Returns the number of rows written."""
+    existing = TransaksiHarian.objects.all()
+    if toko_id is not None:
+        existing = existing.filter(toko_id=toko_id)
+    existing.delete()
+
+    rows = TransaksiHarian.objects.bulk_create(
+        (
+            TransaksiHarian(
+                toko_id=row["toko_id"],
+                tanggal=row["tanggal"],
+                transaction_type=row["transaction_type"],
+                category=row["category"],
+                status=row["status"],
+                total_amount=row["sum_amount"],
+                total_modal=row["sum_modal"],
+                jumlah_transaksi=row["jumlah"],
+            )
+            for row in _expected_rows(toko_id).iterator(chunk_size=2000)
+        ),
+        batch_size=1000,
+    )
+    return len(rows)
+
+
+def check(toko_id=None):
+    """
+    Compare the rollup against raw transactions.
+
+    Returns a list of ``(key, expected, actual)`` tuples, where each side is
+    ``(total_amount, total_modal, jumlah_transaksi)``; an empty list means the
+    rollup is consistent.
+    """
+    expected = {
+        tuple(row[k] for k in ROLLUP_KEY): (row["sum_amount"], row["sum_modal"], row["jumlah"])
+        for row in _expected_rows(toko_id)
+    }
+
+    stored = TransaksiHarian.objects.all()
+    if toko_id is not None:
+        stored = stored.filter(toko_id=toko_id)
+    actual = {
+        tuple(row[k] for k in ROLLUP_KEY): (row["total_amount"], row["total_modal"], row["jumlah_transaksi"])
+        for row in stored.values(*ROLLUP_KEY, "total_amount", "total_modal", "jumlah_transaksi")
+        # Rows emptied by deletes or status changes stay behind at zero
+        if row["jumlah_transaksi"] != 0
+    }
+
+    zero = (Decimal("0"), Decimal("0"), 0)
+    return [
+        (key, expected.get(key, zero), actual.get(key, zero))
+        for key in sorted(expected.keys() | actual.keys(), key=str)
+        if expected.get(key, zero) != actual.get(key, zero)
+    ]
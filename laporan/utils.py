@@ -1,7 +1,6 @@
-import csv
-from io import StringIO
 from decimal import Decimal, ROUND_HALF_UP
 from django.http import StreamingHttpResponse
+from core.exports import csv_lines
 from .schemas import IncomeStatementLine
 
 INCOME_CATEGORIES = {
@@ -23,24 +22,24 @@ def _format_parentheses(value: Decimal) -> str:
     num = f"{abs(q):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
     return f"({num})" if is_negative else num
 
-def build_csv(period: str, toko_id: int, income_lines, expense_lines, net_profit):
-    f = StringIO()
-    writer = csv.writer(f)
-    writer.writerow(["Toko ID", toko_id])
-    writer.writerow(["Periode", period])
-    writer.writerow([])
-    writer.writerow(["Pendapatan"])
+def _income_statement_rows(period, toko_id, income_lines, expense_lines, net_profit):
+    yield ["Toko ID", toko_id]
+    yield ["Periode", period]
+    yield []
+    yield ["Pendapatan"]
     for line in income_lines:
-        writer.writerow([line.name, _format_parentheses(line.total)])
-    writer.writerow([])
-    writer.writerow(["Beban"])
+        yield [line.name, _format_parentheses(line.total)]
+    yield []
+    yield ["Beban"]
     for line in expense_lines:
-        writer.writerow([line.name, _format_parentheses(line.total)])
-    writer.writerow([])
-    writer.writerow(["Laba (Rugi) Bersih", _format_parentheses(net_profit)])
-    raw = f.getvalue().replace('"', '')
-    f2 = StringIO(raw)
+        yield [line.name, _format_parentheses(line.total)]
+    yield []
+    yield ["Laba (Rugi) Bersih", _format_parentheses(net_profit)]
+
+def build_csv(period: str, toko_id: int, income_lines, expense_lines, net_profit):
+    rows = _income_statement_rows(period, toko_id, income_lines, expense_lines, net_profit)
+    # Each line is written and sent as it is produced; quotes are dropped as before
     return StreamingHttpResponse(
-        f2, content_type="text/csv",
+        (line.replace('"', '') for line in csv_lines(rows)), content_type="text/csv",
         headers={"Content-Disposition": f'attachment; filename="income_statement_{period}.csv"'}
     )
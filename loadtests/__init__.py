@@ -0,0 +1,22 @@
+"""
+Role-based load tests (Locust).
+
+Seed the target database first; this creates the shops, their sales
+history and ``loadtests/accounts.json``, the accounts the users log in with:
+
+    python manage.py seed_loadtest --shops 5 --sales 2000
+
+then run against a server started with that database:
+
+    locust -f loadtests/locustfile.py --host http://localhost:8000 \\
+        --headless -u 50 -r 5 -t 5m MixedUser
+
+User classes: ``CashierUser`` (sales), ``OwnerUser`` (dashboard and
+reports), ``BprUser`` (portfolio and per-shop reports) and ``MixedUser``
+(all three, weighted like production traffic). ``TraceUser`` replays a
+JSONL trace instead (``LOADTEST_TRACE``, see ``loadtests/trace.py``).
+
+When a run stops, p50/p95/p99 per endpoint are written to
+``loadtests/results/<commit>-<timestamp>.json`` (``LOADTEST_RESULTS``);
+compare two runs with ``python -m loadtests.report BASE.json NEW.json``.
+"""
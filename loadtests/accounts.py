@@ -0,0 +1,40 @@
+import json
+import os
+import random
+from functools import lru_cache
+
+# Written by `manage.py seed_loadtest`
+ACCOUNTS_FILE = os.environ.get(
+    "LOADTEST_ACCOUNTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "accounts.json")
+)
+
+
+@lru_cache(maxsize=None)
+def manifest():
+    try:
+        with open(ACCOUNTS_FILE) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        raise RuntimeError(f"{ACCOUNTS_FILE} not found, run `python manage.py seed_loadtest` first") from None
+
+
+def random_shop():
+    return random.choice(manifest()["shops"])
+
+
+def login(client, email):
+    """Log ``email`` in through the Google session endpoint; returns the auth headers, or None."""
+    name = email.split("@")[0]
+    session_data = {
+        "user": {
+            "email": email,
+            "name": name,
+            "picture": "https://example.com/profile.jpg",
+            "sub": f"google_id_{name}",
+        }
+    }
+    with client.post("/api/auth/process-session", json=session_data, name="auth: login", catch_response=True) as response:
+        if response.status_code != 200 or not response.json().get("access"):
+            response.failure(f"Failed to login {email}: {response.status_code}, {response.text}")
+            return None
+        return {"Authorization": f"Bearer {response.json()['access']}"}
@@ -0,0 +1,26 @@
+import logging
+import os
+import sys
+
+# Locust only puts this directory on the path; the package lives one up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from locust import events  # noqa: E402
+from locust.runners import WorkerRunner
+
+from loadtests import report
+from loadtests.trace import TRACE_FILE
+from loadtests.users import BprUser, CashierUser, MixedUser, OwnerUser  # noqa: F401
+
+if TRACE_FILE:
+    from loadtests.trace import TraceUser  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+@events.quitting.add_listener
+def write_results(environment, **kwargs):
+    # Workers only forward their stats; the master (or a local run) has them all
+    if environment.runner is None or isinstance(environment.runner, WorkerRunner):
+        return
+    logger.info("Results written to %s", report.write(environment))
@@ -0,0 +1,93 @@
+"""
+Per-endpoint latency percentiles of a run, as JSON, and their comparison.
+
+    python -m loadtests.report BASE.json NEW.json
+"""
+
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+PERCENTILES = (0.5, 0.95, 0.99)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def entry_summary(entry):
+    summary = {
+        "requests": entry.num_requests,
+        "failures": entry.num_failures,
+        "avg_ms": round(entry.avg_response_time, 1),
+        "max_ms": round(entry.max_response_time or 0, 1),
+        "rps": round(entry.total_rps, 2),
+    }
+    for percentile in PERCENTILES:
+        summary[f"p{int(percentile * 100)}_ms"] = entry.get_response_time_percentile(percentile)
+    return summary
+
+
+def results(environment, commit=None):
+    stats = environment.runner.stats
+    return {
+        "meta": {
+            "commit": commit or git_commit(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "host": environment.host,
+            "users": environment.runner.user_count,
+            "user_classes": sorted(cls.__name__ for cls in environment.user_classes),
+        },
+        "endpoints": {
+            f"{entry.method} {entry.name}": entry_summary(entry) for entry in stats.entries.values()
+        },
+        "total": entry_summary(stats.total),
+    }
+
+
+def write(environment, path=None):
+    data = results(environment)
+    path = path or os.environ.get("LOADTEST_RESULTS") or os.path.join(
+        RESULTS_DIR, f"{data['meta']['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+    return path
+
+
+def compare(base, new):
+    """Lines of p50/p95/p99 of every endpoint in ``new`` against ``base``, with the change in percent."""
+    keys = [f"p{int(percentile * 100)}_ms" for percentile in PERCENTILES]
+    lines = [f"{'endpoint':60} " + " ".join(f"{key:>20}" for key in keys)]
+    for name, summary in sorted(new["endpoints"].items()) + [("total", new["total"])]:
+        before = base["total"] if name == "total" else base["endpoints"].get(name)
+        cells = []
+        for key in keys:
+            if not before or not before.get(key):
+                cells.append(f"{summary[key]:>20}")
+                continue
+            change = (summary[key] - before[key]) / before[key] * 100
+            cells.append(f"{before[key]:>7} -> {summary[key]:<5} {change:+5.0f}%")
+        lines.append(f"{name[:60]:60} " + " ".join(cells))
+    return lines
+
+
+def main(argv):
+    if len(argv) != 2:
+        sys.exit("usage: python -m loadtests.report BASE.json NEW.json")
+    base, new = (json.load(open(path)) for path in argv)
+    print(f"{base['meta']['commit']} -> {new['meta']['commit']}")
+    print("\n".join(compare(base, new)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
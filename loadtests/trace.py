@@ -0,0 +1,146 @@
+"""
+Replay a JSONL traffic trace.
+
+Each line has the shape of the backlog's ``requests.jsonl``, a
+``request_id``, a ``title`` and a ``body``, plus what the request needs:
+
+    {"request_id": "r-1", "title": "transaksi: create sale",
+     "method": "POST", "path": "/api/transaksi", "role": "cashier",
+     "body": {...}, "params": {...}, "offset_ms": 1200}
+
+``request_id`` is sent as ``X-Request-ID``, ``title`` is the name the
+request is reported under (the path when empty) and ``body`` the JSON
+payload. ``role`` (cashier, owner or bpr, default owner) picks the account
+and ``{toko_id}``, ``{shop_id}`` and ``{product_id}`` in the path are filled
+in from the accounts file. With ``offset_ms`` (since the start of the trace)
+the original pacing is kept, divided by ``LOADTEST_TRACE_SPEED``; without it
+lines are sent back to back. Lines without a ``path``, such as the change
+requests of the backlog itself, are skipped.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from locust import HttpUser, constant, task
+from locust.exception import StopUser
+
+from loadtests.accounts import login, manifest, random_shop
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = os.environ.get("LOADTEST_TRACE", "")
+TRACE_SPEED = float(os.environ.get("LOADTEST_TRACE_SPEED", "1"))
+
+ROLES = ("cashier", "owner", "bpr")
+
+
+def load_trace(path):
+    """The replayable entries of the trace at ``path`` and the number of lines skipped."""
+    entries, skipped = [], 0
+    with open(path) as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("%s:%d is not valid JSON, skipped", path, number)
+                skipped += 1
+                continue
+            if not isinstance(entry, dict) or not entry.get("path"):
+                skipped += 1
+                continue
+            if entry.get("role", "owner") not in ROLES:
+                logger.warning("%s:%d has unknown role %r, skipped", path, number, entry["role"])
+                skipped += 1
+                continue
+            entries.append(entry)
+    return entries, skipped
+
+
+class Trace:
+    """The trace's entries, handed out once each across all the users of this process."""
+
+    def __init__(self, path):
+        self.entries, self.skipped = load_trace(path)
+        if self.skipped:
+            logger.info("%s: %d lines without a request skipped", path, self.skipped)
+        self._position = 0
+        self._lock = threading.Lock()
+        self.started_at = None
+
+    def next(self):
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+            if self._position >= len(self.entries):
+                return None
+            entry = self.entries[self._position]
+            self._position += 1
+            return entry
+
+
+_trace = None
+
+
+def trace():
+    global _trace
+    if _trace is None:
+        if not TRACE_FILE:
+            raise RuntimeError("Set LOADTEST_TRACE to the JSONL trace to replay")
+        _trace = Trace(TRACE_FILE)
+    return _trace
+
+
+class TraceUser(HttpUser):
+    """Sends the trace's requests in order, as whichever role each line names."""
+
+    wait_time = constant(0)
+
+    def on_start(self):
+        self.shop = random_shop()
+        self.headers = {}
+
+    def headers_for(self, role):
+        if role not in self.headers:
+            if role == "bpr":
+                email = manifest()["bpr_email"]
+            elif role == "cashier":
+                email = random.choice(self.shop["cashier_emails"])
+            else:
+                email = self.shop["owner_email"]
+            self.headers[role] = login(self.client, email) or {}
+        return self.headers[role]
+
+    def url(self, entry):
+        return entry["path"].format(
+            toko_id=self.shop["toko_id"],
+            shop_id=random_shop()["toko_id"],
+            product_id=random.choice(self.shop["products"])["id"],
+        )
+
+    @task
+    def replay(self):
+        entry = trace().next()
+        if entry is None:
+            raise StopUser()
+
+        if "offset_ms" in entry:
+            due = trace().started_at + entry["offset_ms"] / 1000 / TRACE_SPEED
+            time.sleep(max(0.0, due - time.monotonic()))
+
+        headers = dict(self.headers_for(entry.get("role", "owner")))
+        if entry.get("request_id"):
+            headers["X-Request-ID"] = str(entry["request_id"])
+        self.client.request(
+            entry.get("method", "GET").upper(),
+            self.url(entry),
+            params=entry.get("params"),
+            json=entry.get("body"),
+            headers=headers,
+            name=entry.get("title") or entry["path"],
+        )
@@ -0,0 +1,208 @@
+import random
+import uuid
+from datetime import date, timedelta
+
+from locust import HttpUser, TaskSet, between, task
+
+from loadtests.accounts import login, manifest, random_shop
+
+# Report windows the owner and BPR pages ask for, in days back from today
+REPORT_WINDOWS = (7, 30, 90, 365)
+
+
+def report_range():
+    end = date.today()
+    start = end - timedelta(days=random.choice(REPORT_WINDOWS))
+    return {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+
+class RoleTasks(TaskSet):
+    """Logs in once per user as the role's ``account`` and sends the token with every request."""
+
+    # Accounts file key of the email to log in with: a key of the shop (a
+    # list picks one at random), else a top-level key
+    account = "owner_email"
+
+    def email(self, shop):
+        value = shop[self.account] if self.account in shop else manifest()[self.account]
+        return random.choice(value) if isinstance(value, list) else value
+
+    def on_start(self):
+        # A MixedUser switches between task sets; keep one login per role
+        sessions = self.user.__dict__.setdefault("sessions", {})
+        role = type(self).__name__
+        if role not in sessions:
+            shop = random_shop()
+            headers = login(self.client, self.email(shop))
+            if headers is None:
+                # Retry after the user's wait time
+                self.interrupt()
+            sessions[role] = (shop, headers)
+        self.shop, self.headers = sessions[role]
+
+    def get(self, path, name=None, **params):
+        return self.client.get(path, params=params, headers=self.headers, name=name or path)
+
+    @task(1)
+    def stop(self):
+        # Give MixedUser the chance to pick another role
+        self.interrupt()
+
+
+class CashierTasks(RoleTasks):
+    account = "cashier_emails"
+
+    def basket(self):
+        products = random.sample(self.shop["products"], min(len(self.shop["products"]), random.randint(1, 4)))
+        return [
+            {
+                "product_id": product["id"],
+                "quantity": random.randint(1, 3),
+                "harga_jual_saat_transaksi": product["harga_jual"],
+                "harga_modal_saat_transaksi": product["harga_modal"],
+            }
+            for product in products
+        ]
+
+    def sale(self, items):
+        total = sum(item["harga_jual_saat_transaksi"] * item["quantity"] for item in items)
+        return {
+            "transaction_type": "pemasukan",
+            "category": "Penjualan Barang",
+            "total_amount": total,
+            "total_modal": sum(item["harga_modal_saat_transaksi"] * item["quantity"] for item in items),
+            "amount": total,
+            "status": "Belum Lunas" if random.random() < 0.15 else "Lunas",
+            "items": items,
+        }
+
+    @task(10)
+    def create_sale(self):
+        with self.client.post(
+            "/api/transaksi", json=self.sale(self.basket()), headers=self.headers,
+            name="transaksi: create sale", catch_response=True,
+        ) as response:
+            # Out of stock is the shop's state, not a server failure
+            if response.status_code == 422 and "stok" in response.text.lower():
+                response.success()
+
+    @task(1)
+    def restock(self):
+        items = [dict(item, quantity=50) for item in self.basket()]
+        total = sum(item["harga_modal_saat_transaksi"] * item["quantity"] for item in items)
+        payload = {
+            "transaction_type": "pengeluaran",
+            "category": "Pembelian Stok",
+            "total_amount": total,
+            "total_modal": total,
+            "amount": total,
+            "items": items,
+        }
+        self.client.post("/api/transaksi", json=payload, headers=self.headers, name="transaksi: restock")
+
+    @task(2)
+    def offline_sync(self):
+        rows = [dict(self.sale(self.basket()), idempotency_key=str(uuid.uuid4())) for _ in range(random.randint(5, 25))]
+        self.client.post(
+            "/api/transaksi/bulk", json={"transactions": rows}, headers=self.headers, name="transaksi: bulk sync"
+        )
+
+    @task(4)
+    def search_product(self):
+        # What the cashier has typed so far
+        name = random.choice(self.shop["products"])["nama"]
+        self.get("/api/produk/search", name="produk: search", q=name[: random.randint(2, 6)], limit=20)
+
+    @task(2)
+    def list_transactions(self):
+        self.get("/api/transaksi", name="transaksi: list", cursor="")
+
+
+class OwnerTasks(RoleTasks):
+    account = "owner_email"
+
+    @task(5)
+    def dashboard(self):
+        self.get("/api/dashboard", name="dashboard")
+
+    @task(3)
+    def financial_report(self):
+        self.get("/api/transaksi/financial-report-by-date", name="transaksi: financial report", **report_range())
+
+    @task(2)
+    def debt_report(self):
+        self.get("/api/transaksi/debt-report-by-date", name="transaksi: debt report", **report_range())
+
+    @task(2)
+    def cash_flow(self):
+        self.get("/api/laporan/aruskas-report", name="laporan: aruskas")
+
+    @task(2)
+    def monthly_summary(self):
+        today = date.today()
+        self.get("/api/transaksi/summary/monthly", name="transaksi: monthly summary", month=today.month, year=today.year)
+
+    @task(2)
+    def transactions(self):
+        self.get("/api/transaksi", name="transaksi: list", page=random.randint(1, 5), with_total="true")
+
+    @task(1)
+    def products(self):
+        self.get("/api/produk/page/1", name="produk: page", sort=random.choice(["stok", "-stok", "-id"]))
+
+    @task(1)
+    def catalog(self):
+        self.get("/api/produk/catalog", name="produk: catalog")
+
+
+class BprTasks(RoleTasks):
+    account = "bpr_email"
+
+    def shop_id(self):
+        return random_shop()["toko_id"]
+
+    @task(3)
+    def portfolio(self):
+        self.get("/api/auth/bpr/portfolio", name="bpr: portfolio", page=1, sort=random.choice(["-revenue_30d", "-piutang"]))
+
+    @task(1)
+    def shops(self):
+        self.get("/api/auth/bpr/shops", name="bpr: shops")
+
+    @task(2)
+    def shop_info(self):
+        self.get(f"/api/auth/bpr/shop/{self.shop_id()}", name="bpr: shop info")
+
+    @task(2)
+    def shop_debt(self):
+        self.get(f"/api/transaksi/bpr/shop/{self.shop_id()}/utang", name="bpr: shop utang", **report_range())
+
+    @task(2)
+    def shop_financial(self):
+        self.get(f"/api/transaksi/bpr/shop/{self.shop_id()}/keuangan", name="bpr: shop keuangan", **report_range())
+
+    @task(2)
+    def shop_cash_flow(self):
+        self.get(f"/api/laporan/bpr/shop/{self.shop_id()}/aruskas", name="bpr: shop aruskas")
+
+
+class CashierUser(HttpUser):
+    wait_time = between(1, 3)
+    tasks = [CashierTasks]
+
+
+class OwnerUser(HttpUser):
+    wait_time = between(2, 5)
+    tasks = [OwnerTasks]
+
+
+class BprUser(HttpUser):
+    wait_time = between(3, 8)
+    tasks = [BprTasks]
+
+
+class MixedUser(HttpUser):
+    """Cashiers, owners and BPR officers in roughly production proportions."""
+
+    wait_time = between(1, 5)
+    tasks = {CashierTasks: 6, OwnerTasks: 3, BprTasks: 1}
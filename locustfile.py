@@ -1,7 +1,13 @@
 from locust import HttpUser, task, between
+from datetime import date
 import json
+import os
 import random
 
+# Route prefix of the dashboard reads: "/api" for the sync (WSGI) handlers,
+# "/api/async" for their async variants when the target runs under uvicorn
+DASHBOARD_API_PREFIX = os.environ.get("DASHBOARD_API_PREFIX", "/api")
+
 class ProductUser(HttpUser):
     wait_time = between(1, 3)  # Wait 1-3 seconds between tasks
     
@@ -120,3 +126,101 @@ class ProductUser(HttpUser):
         # Test getting product units
         self.client.get("/api/produk/units",
                        headers=self.headers)
+
+
+class DashboardUser(HttpUser):
+    """
+    Home-screen page loads: the 8 independent reads the dashboard fires.
+
+    Run once per deployment and compare the p95 columns, e.g. with
+    scripts/compare_wsgi_asgi.sh.
+    """
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        random_int = random.randint(1, 1000)
+        session_data = {
+            "user": {
+                "email": f"testuser{random_int}@gmail.com",
+                "name": f"Test User {random_int}",
+                "picture": "https://example.com/profile.jpg",
+                "sub": f"google_id_{random_int}"
+            }
+        }
+        response = self.client.post("/api/auth/process-session", json=session_data)
+        self.headers = {"Authorization": f"Bearer {response.json().get('access')}"} if response.ok else {}
+
+    @task
+    def load_dashboard(self):
+        today = date.today()
+        report = {"start_date": str(today.replace(day=1)), "end_date": str(today)}
+        reads = [
+            ("/transaksi/summary/monthly", None),
+            ("/transaksi/debt-summary", None),
+            ("/transaksi/first-transaction-date", None),
+            ("/transaksi/financial-report-by-date", report),
+            ("/transaksi/debt-report-by-date", report),
+            ("/produk/most-popular", None),
+            ("/produk/low-stock", None),
+            (f"/produk/top-selling/{today.year}/{today.month}", None),
+        ]
+        for path, params in reads:
+            # Named without the prefix so sync and async runs line up in the stats
+            self.client.get(f"{DASHBOARD_API_PREFIX}{path}", params=params, headers=self.headers, name=path)
+
+
+class PollingUser(HttpUser):
+    """
+    A client polling lists and reports that rarely change between polls.
+
+    With CONDITIONAL_GET=1 it revalidates with the ETag of its last 200 for
+    each URL, as a browser cache does; compare the "Average size" and
+    response time columns of a run with and without it (e.g. with
+    scripts/compare_conditional_get.sh).
+    """
+    wait_time = between(1, 3)
+    conditional = os.environ.get("CONDITIONAL_GET", "0") == "1"
+
+    def on_start(self):
+        random_int = random.randint(1, 1000)
+        session_data = {
+            "user": {
+                "email": f"testuser{random_int}@gmail.com",
+                "name": f"Test User {random_int}",
+                "picture": "https://example.com/profile.jpg",
+                "sub": f"google_id_{random_int}"
+            }
+        }
+        response = self.client.post("/api/auth/process-session", json=session_data)
+        self.headers = {"Authorization": f"Bearer {response.json().get('access')}"} if response.ok else {}
+        self.etags = {}
+
+    def poll(self, path, params=None):
+        key = (path, tuple(sorted((params or {}).items())))
+        headers = dict(self.headers)
+        if self.conditional and key in self.etags:
+            headers["If-None-Match"] = self.etags[key]
+        with self.client.get(f"/api{path}", params=params, headers=headers, name=path, catch_response=True) as response:
+            if response.status_code == 200:
+                self.etags[key] = response.headers.get("ETag")
+                response.success()
+            elif response.status_code == 304:
+                response.success()
+            else:
+                response.failure(f"{response.status_code}: {response.text}")
+
+    @task(3)
+    def product_pages(self):
+        self.poll("/produk/page/1", {"sort": random.choice(["stok", "-stok", "-id"])})
+
+    @task(3)
+    def transaction_list(self):
+        self.poll("/transaksi")
+
+    @task(1)
+    def reports(self):
+        today = date.today()
+        report = {"start_date": str(today.replace(day=1)), "end_date": str(today)}
+        self.poll("/transaksi/financial-report-by-date", report)
+        self.poll("/transaksi/debt-report-by-date", report)
+        self.poll("/laporan/aruskas-report")
@@ -1,89 +1,98 @@
 from ninja import Router, UploadedFile
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponseBadRequest
-from backend import settings
 from produk.models import Produk, KategoriProduk, Satuan
-from ninja.security import HttpBearer
-import jwt
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, HttpResponseRedirect, JsonResponse
 from produk.schemas import (
     PaginatedResponseSchema,
     ProdukResponseSchema,
     CreateProdukSchema,
     UpdateProdukSchema,
 )
-from authentication.models import User
-from django.db.models import Sum, F
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
-from transaksi.models import TransaksiItem
-from typing import Optional
-
-
-class AuthBearer(HttpBearer):
-    def authenticate(self, request, token):
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id = payload.get("user_id")
-            if user_id:
-                return user_id
-        except jwt.PyJWTError:
-            return None
-        return None
+from authentication.security import AuthBearer
+from core.cache import cached_per_toko
+from core.conditional import conditional_per_toko, etag_matches
+from core.metrics import query_budget
+from core.pagination import keyset_page
+from core.imports import import_format
+from produk import catalog, images, queries
+from produk.imports import ImportInterrupted, import_products
+from produk.search import filter_products, search_products
+from typing import List, Optional
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for ?format=msgpack catalogs
+    msgpack = None
 
 
 router = Router(auth=AuthBearer())
 
 
-@router.get("", response={200: PaginatedResponseSchema, 404: dict})
-def get_produk_default(request, sort: str = None):
-    return get_produk_paginated(request, page=1, sort=sort)
+@router.get("", response={200: PaginatedResponseSchema, 404: dict, 422: dict})
+@query_budget(3)
+@conditional_per_toko()
+def get_produk_default(request, sort: str = None, cursor: str = None, with_total: bool = False):
+    return get_produk_paginated(request, page=1, sort=sort, cursor=cursor, with_total=with_total)
 
 
 @router.get("/categories", response={200: list, 404: dict})
+@query_budget(1)
+@conditional_per_toko()
 def get_categories(request):
-    user_id = request.auth
-    user = User.objects.get(id=user_id)
+    principal = request.auth
 
-    if not user.toko:
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
 
-    categories = KategoriProduk.objects.filter(toko=user.toko).values_list('nama', flat=True)
+    categories = KategoriProduk.objects.filter(toko_id=principal.toko_id).values_list('nama', flat=True)
     return 200, list(categories)
 
 
 @router.get("/units", response={200: list, 404: dict})
+@query_budget(1)
+@conditional_per_toko()
 def get_units(request):
-    user_id = request.auth
-    user = User.objects.get(id=user_id)
+    principal = request.auth
 
-    if not user.toko:
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
 
-    units = Satuan.objects.filter(toko=user.toko).values_list('nama', flat=True)
+    units = Satuan.objects.filter(toko_id=principal.toko_id).values_list('nama', flat=True)
     return 200, list(units)
 
 
-@router.get("/page/{page}", response={200: PaginatedResponseSchema, 404: dict})
-def get_produk_paginated(request, page: int, sort: str = None, q: str = ""):
+# Keyset ordering per sort option; always ends in the unique id
+KEYSET_ORDERING = {
+    "stok": ["stok", "id"],
+    "-stok": ["-stok", "-id"],
+    "-id": ["-id"],
+}
+
+
+@router.get("/page/{page}", response={200: PaginatedResponseSchema, 404: dict, 422: dict})
+@query_budget(3)
+@conditional_per_toko()
+def get_produk_paginated(
+    request, page: int, sort: str = None, q: str = "", cursor: str = None, with_total: bool = False
+):
     if sort not in [None, "stok", "-stok", "-id"]:
         return HttpResponseBadRequest("Invalid sort parameter. Use 'asc' or 'desc'.")
 
     if sort is None:
         sort = "-id"
     
-    user_id = request.auth
-    user = User.objects.get(id=user_id)
-    
+    principal = request.auth
+
     # Check if user has a toko
-    if not user.toko:
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
 
     # Filter products by toko instead of user
-    queryset = Produk.objects.filter(toko=user.toko)
+    queryset = Produk.objects.filter(toko_id=principal.toko_id)
 
     if q:
-        queryset = queryset.filter(nama__icontains=q)
+        queryset = filter_products(queryset, principal.toko_id, q)
 
     queryset = queryset.select_related("kategori").order_by(sort)
 
@@ -92,6 +101,19 @@ def get_produk_paginated(request, page: int, sort: str = None, q: str = ""):
     except ValueError:
         per_page = 7
 
+    if cursor is not None:
+        # Keyset mode: the page number is ignored, follow next_cursor instead
+        try:
+            page_items, next_cursor = keyset_page(queryset, KEYSET_ORDERING[sort], cursor, per_page)
+        except ValueError as e:
+            return 422, {"message": str(e)}
+        return 200, {
+            "items": [ProdukResponseSchema.from_orm(p) for p in page_items],
+            "total": queryset.count() if with_total else None,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+        }
+
     total = queryset.count()
     total_pages = (total + per_page - 1) // per_page
 
@@ -109,19 +131,89 @@ def get_produk_paginated(request, page: int, sort: str = None, q: str = ""):
         "total_pages": total_pages,
     }
 
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+def _catalog_response(request, payload, etag=None):
+    """JSON, or MessagePack when asked for with ``?format=msgpack`` or the Accept header."""
+    wants_msgpack = request.GET.get("format") == "msgpack" or "msgpack" in request.headers.get("Accept", "")
+    if wants_msgpack:
+        if msgpack is None:
+            return JsonResponse({"message": "MessagePack is not available on this server"}, status=406)
+        response = HttpResponse(msgpack.packb(payload), content_type=MSGPACK_CONTENT_TYPE)
+    else:
+        response = JsonResponse(payload)
+    if etag:
+        response["ETag"] = etag
+    response["Vary"] = "Accept"
+    return response
+
+
+@router.get("/catalog", response={200: dict, 304: None, 404: dict, 406: dict})
+@query_budget(3)
+def get_catalog(request):
+    """
+    The toko's whole catalog as columns, for the POS client to sync once
+    and search locally. Revalidate with ``If-None-Match``; then keep it
+    current with ``/catalog/delta?since=<version>``.
+    """
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    version = catalog.current_version(principal.toko_id)
+    etag = f'"catalog-{principal.toko_id}-{version}"'
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    return _catalog_response(request, catalog.snapshot(principal.toko_id, version), etag)
+
+
+@router.get("/catalog/delta", response={200: dict, 404: dict, 406: dict, 409: dict})
+@query_budget(4)
+def get_catalog_delta(request, since: int):
+    """Products changed and ids deleted since a catalog version the client already has."""
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    try:
+        payload = catalog.delta(principal.toko_id, since)
+    except ValueError as e:
+        return 409, {"message": str(e)}
+    return _catalog_response(request, payload)
+
+
+@router.get("/search", response={200: List[ProdukResponseSchema], 404: dict})
+@query_budget(2)
+@conditional_per_toko()
+def search_produk(request, q: str = "", limit: int = 20):
+    """Ranked name search for the cashier's type-ahead; tolerates small typos."""
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    queryset = Produk.objects.filter(toko_id=principal.toko_id).select_related("kategori")
+    products = search_products(principal.toko_id, q, limit=min(max(limit, 1), 100), queryset=queryset)
+    return 200, [ProdukResponseSchema.from_orm(p) for p in products]
+
 import sentry_sdk
 
 @router.post("/create", response={201: ProdukResponseSchema, 422: dict})
 def create_produk(request, payload: CreateProdukSchema, foto: UploadedFile = None):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
+    principal = request.auth
 
-    if not user.toko:
-        sentry_sdk.capture_message(f"[Produk] Gagal create: user {user_id} belum punya toko", level="warning")
+    if not principal.toko_id:
+        sentry_sdk.capture_message(f"[Produk] Gagal create: user {principal.user_id} belum punya toko", level="warning")
         return 422, {"message": "User doesn't have a toko"}
 
-    kategori_obj, _ = KategoriProduk.objects.get_or_create(nama=payload.kategori, toko=user.toko)
-    satuan_obj, _ = Satuan.objects.get_or_create(nama=payload.satuan, toko=user.toko)
+    kategori_obj, _ = KategoriProduk.objects.get_or_create(nama=payload.kategori, toko_id=principal.toko_id)
+    satuan_obj, _ = Satuan.objects.get_or_create(nama=payload.satuan, toko_id=principal.toko_id)
 
     produk = Produk.objects.create(
         nama=payload.nama,
@@ -131,101 +223,118 @@ def create_produk(request, payload: CreateProdukSchema, foto: UploadedFile = Non
         stok=payload.stok,
         satuan=satuan_obj.nama,
         kategori=kategori_obj,
-        toko=user.toko,
+        toko_id=principal.toko_id,
     )
 
     sentry_sdk.capture_message(
-        f"[Produk] Produk '{produk.nama}' berhasil dibuat oleh {user.username} (ID: {user_id})", level="info"
+        f"[Produk] Produk '{produk.nama}' berhasil dibuat oleh user {principal.user_id}", level="info"
     )
 
     return 201, ProdukResponseSchema.from_orm(produk)
 
 
+@router.post("/import", response={200: dict, 422: dict})
+def import_produk(request, file: UploadedFile, format: Optional[str] = None):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 422, {"message": "User doesn't have a toko"}
+
+    try:
+        summary = import_products(principal.toko_id, file.file, import_format(file.name, format))
+    except ImportInterrupted as e:
+        # The rows before the damage are in; tell the client which
+        return 422, {"message": str(e), **e.summary}
+    except ValueError as e:
+        return 422, {"message": str(e)}
+
+    sentry_sdk.capture_message(
+        f"[Produk] Import oleh user {principal.user_id}: {summary['created']} dibuat, "
+        f"{summary['updated']} diperbarui, {summary['failed']} gagal",
+        level="info",
+    )
+    return 200, summary
+
+
 @router.get("/most-popular", response={200: list, 404: dict})
+@query_budget(3)
+@conditional_per_toko()
+@cached_per_toko()
 def get_most_popular_products(request):
-    user_id = request.auth
-    user = User.objects.get(id=user_id)
-    
-    if not user.toko:
+    principal = request.auth
+
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
     # Get most popular products by all-time sales volume
-    popular_products = (
-        TransaksiItem.objects
-        .filter(
-            transaksi__toko=user.toko,
-            transaksi__is_deleted=False,
-            transaksi__category="Penjualan Barang"
-        )
-        .values('product__id', 'product__nama')
-        .annotate(total_sold=Sum('quantity'))
-        .order_by('-total_sold')[:3]  # Get top 3
-    )
-    
-    result = []
-    for item in popular_products:
-        product = Produk.objects.get(id=item['product__id'])
-        result.append({
-            "id": product.id,
-            "name": product.nama,
-            "sold": item['total_sold'],  # Show sold instead of stock
-            "imageUrl": product.foto.url if product.foto else None,
-        })
-    
-    return 200, result
+    popular_products = list(queries.most_popular_query(principal.toko_id))
+    products = Produk.objects.in_bulk([item['product__id'] for item in popular_products])
+    return 200, queries.most_popular_payload(popular_products, products)
 
 @router.get("/low-stock", response={200: list, 404: dict})
+@query_budget(2)
+@conditional_per_toko()
+@cached_per_toko()
 def get_low_stock_products(request):
-    user_id = request.auth
-    user = User.objects.get(id=user_id)
-    
-    if not user.toko:
+    principal = request.auth
+
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
-    products = (
-        Produk.objects.select_related("kategori")
-        .filter(toko=user.toko)
-        .order_by('stok')[:5]  # Get top 5 with lowest stock
-    )
-    
-    result = []
-    for product in products:
-        result.append({
-            "id": product.id,
-            "name": product.nama,
-            "stock": product.stok,
-            "imageUrl": product.foto.url if product.foto else None,
-        })
-    
-    return 200, result
+    return 200, queries.low_stock_payload(queries.low_stock_query(principal.toko_id))
 
 @router.get("/{id}", response={200: ProdukResponseSchema, 404: dict})
+@query_budget(2)
+@conditional_per_toko()
 def get_produk_by_id(request, id: int):
-    user_id = request.auth
-    user = User.objects.get(id=user_id)
-    
-    if not user.toko:
+    principal = request.auth
+
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
     try:
         # Get product by id and check if it belongs to user's toko
-        produk = get_object_or_404(Produk, id=id, toko=user.toko)
+        produk = get_object_or_404(Produk, id=id, toko_id=principal.toko_id)
         return 200, ProdukResponseSchema.from_orm(produk)
     except Exception as e:
         return 404, {"message": "Produk tidak ditemukan"}
 
 
+@router.get("/{id}/foto/{variant}", response={404: dict}, auth=None, url_name="produk_foto_variant")
+def get_produk_foto_variant(request, id: int, variant: str):
+    """
+    Redirect to a resized copy of the product photo, or to the original
+    until its variants exist (they are built on upload and by
+    ``backfill_produk_images``, never here).
+
+    Public like the media files it points to, so ``<img>`` tags can use it.
+    """
+    if variant not in images.VARIANTS:
+        return 404, {"message": f"Unknown variant. Available: {', '.join(images.VARIANTS)}"}
+    produk = Produk.objects.filter(id=id).only("id", "foto", "foto_hash").first()
+    if produk is None or not produk.foto:
+        return 404, {"message": "Produk tidak ditemukan"}
+
+    if produk.foto_hash:
+        url = images.variant_url(produk.id, produk.foto.name, produk.foto_hash, variant)
+    else:
+        url = produk.foto.url
+    response = HttpResponseRedirect(url)
+    # Short, so the variants are picked up soon after they are built
+    response["Cache-Control"] = "public, max-age=300"
+    return response
+
+
 @router.post("/update/{id}", response={200: ProdukResponseSchema, 404: dict, 422: dict})
 def update_produk(request, id: int, payload: UpdateProdukSchema, foto: UploadedFile = None):
-    user_id = request.auth
-    user = User.objects.get(id=user_id)
-    
-    if not user.toko:
+    principal = request.auth
+
+    if not principal.toko_id:
         return 422, {"message": "User doesn't have a toko"}
 
     try:
         # Get product by id and check if it belongs to user's toko
-        produk = get_object_or_404(Produk, id=id, toko=user.toko)
+        produk = get_object_or_404(Produk, id=id, toko_id=principal.toko_id)
 
         # Convert payload to dict and filter out None values
         update_data = {k: v for k, v in payload.dict().items() if v is not None}
@@ -235,14 +344,14 @@ def update_produk(request, id: int, payload: UpdateProdukSchema, foto: UploadedF
             kategori_name = update_data.pop('kategori')
             kategori_obj, _ = KategoriProduk.objects.get_or_create(
                 nama=kategori_name,
-                toko=user.toko
+                toko_id=principal.toko_id
             )
             produk.kategori = kategori_obj
         
         # Handle satuan separately to ensure it's added to the Satuan model with toko
         if 'satuan' in update_data:
             satuan_name = update_data.pop('satuan')
-            satuan_obj, _ = Satuan.objects.get_or_create(nama=satuan_name, toko=user.toko)
+            satuan_obj, _ = Satuan.objects.get_or_create(nama=satuan_name, toko_id=principal.toko_id)
             produk.satuan = satuan_obj.nama
         
         # Update all other fields
@@ -263,17 +372,16 @@ def update_produk(request, id: int, payload: UpdateProdukSchema, foto: UploadedF
 
 @router.delete("/delete/{id}")
 def delete_produk(request, id: int):
-    user_id = request.auth
-    user = User.objects.get(id=user_id)
-    
-    if not user.toko:
+    principal = request.auth
+
+    if not principal.toko_id:
         return {"message": "User doesn't have a toko"}
     
-    produk = get_object_or_404(Produk, id=id, toko=user.toko)
+    produk = get_object_or_404(Produk, id=id, toko_id=principal.toko_id)
     produk.delete()
     
     sentry_sdk.capture_message(
-        f"[Produk] Produk ID {id} dihapus oleh user {user_id}",
+        f"[Produk] Produk ID {id} dihapus oleh user {principal.user_id}",
         level="warning"
     )
     
@@ -281,46 +389,20 @@ def delete_produk(request, id: int):
 
 
 @router.get("/top-selling/{year}/{month}", response={200: list, 404: dict})
+@query_budget(2)
+@conditional_per_toko()
+@cached_per_toko()
 def get_top_selling_products(request, year: int, month: int):
-    user_id = request.auth
-    user = User.objects.get(id=user_id)
-    
-    if not user.toko:
+    principal = request.auth
+
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
-    # Define the month period
-    start_date = datetime(year, month, 1)
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1)
-    else:
-        end_date = datetime(year, month + 1, 1)
-    
     # Get top-selling products for the specified month by querying TransaksiItem
-    top_products = (
-        TransaksiItem.objects
-        .filter(
-            transaksi__toko=user.toko,
-            transaksi__created_at__gte=start_date,
-            transaksi__created_at__lt=end_date,
-            transaksi__is_deleted=False,
-            transaksi__category="Penjualan Barang"  # Only include actual sales
-        )
-        .values('product__id', 'product__nama', 'product__foto')
-        .annotate(sold=Sum('quantity'))
-        .order_by('-sold')[:3]  # Get top 3
-    )
-    
-    result = []
-    for product in top_products:
-        result.append({
-            "id": product['product__id'],
-            "name": product['product__nama'],
-            "imageUrl": product['product__foto'],
-            "sold": product['sold']
-        })
-        
+    result = queries.top_selling_payload(queries.top_selling_query(principal.toko_id, year, month))
+
     sentry_sdk.capture_message(
-        f"[Produk] Akses laporan top-selling bulan {month}/{year} oleh user {user_id}",
+        f"[Produk] Akses laporan top-selling bulan {month}/{year} oleh user {principal.user_id}",
         level="info"
     )
     
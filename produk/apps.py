@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProdukConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'produk'
+
+    def ready(self):
+        import produk.signals
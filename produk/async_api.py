@@ -0,0 +1,54 @@
+from ninja import Router
+
+from authentication.security import AsyncAuthBearer
+from core.cache import cached_per_toko
+from core.conditional import conditional_per_toko
+from produk import queries
+from produk.models import Produk
+
+# Async variants of the dashboard reads in ``produk.api``, mounted under
+# ``/api/async/produk`` for ASGI (uvicorn) deployments. As in
+# ``transaksi.async_api``, reads are awaited in turn, not gathered: the
+# most-popular products depend on the popular ids and the other reads are
+# single queries.
+router = Router(auth=AsyncAuthBearer())
+
+
+@router.get("/most-popular", response={200: list, 404: dict})
+@conditional_per_toko()
+@cached_per_toko()
+async def get_most_popular_products(request):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    popular_products = [item async for item in queries.most_popular_query(principal.toko_id)]
+    products = await Produk.objects.ain_bulk([item['product__id'] for item in popular_products])
+    return 200, queries.most_popular_payload(popular_products, products)
+
+
+@router.get("/low-stock", response={200: list, 404: dict})
+@conditional_per_toko()
+@cached_per_toko()
+async def get_low_stock_products(request):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    products = [product async for product in queries.low_stock_query(principal.toko_id)]
+    return 200, queries.low_stock_payload(products)
+
+
+@router.get("/top-selling/{year}/{month}", response={200: list, 404: dict})
+@conditional_per_toko()
+@cached_per_toko()
+async def get_top_selling_products(request, year: int, month: int):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    rows = [row async for row in queries.top_selling_query(principal.toko_id, year, month)]
+    return 200, queries.top_selling_payload(rows)
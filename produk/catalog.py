@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from produk import images
+from produk.models import KatalogVersi, Produk, ProdukTerhapus
+
+# Column order of catalog snapshots and deltas
+CATALOG_COLUMNS = ["id", "nama", "harga_jual", "stok", "satuan", "kategori", "foto", "thumbnail"]
+
+
+def current_version(toko_id):
+    """The toko's catalog version; 0 until its first product change."""
+    return KatalogVersi.objects.filter(toko_id=toko_id).values_list("versi", flat=True).first() or 0
+
+
+def next_version(toko_id):
+    """
+    Bump and return the toko's catalog version.
+
+    The ``UPDATE`` keeps the counter row locked until the surrounding
+    transaction commits, so catalog writes of one toko commit in version
+    order and a client never skips a version that commits late. That only
+    holds when the stamped rows are written in the same transaction: call
+    it inside one (``Produk.save``, ``touch`` and ``record_deletion`` open
+    their own).
+    """
+    if not KatalogVersi.objects.filter(toko_id=toko_id).update(versi=F("versi") + 1):
+        KatalogVersi.objects.get_or_create(toko_id=toko_id)
+        KatalogVersi.objects.filter(toko_id=toko_id).update(versi=F("versi") + 1)
+    return KatalogVersi.objects.filter(toko_id=toko_id).values_list("versi", flat=True).get()
+
+
+def touch(toko_id, product_ids):
+    """
+    Mark products as changed after writes that skip ``Produk.save``
+    (``bulk_create``, ``queryset.update``).
+    """
+    if product_ids:
+        with transaction.atomic(savepoint=False):
+            Produk.objects.filter(toko_id=toko_id, id__in=product_ids).update(versi=next_version(toko_id))
+
+
+def record_deletion(toko_id, produk_id):
+    with transaction.atomic(savepoint=False):
+        ProdukTerhapus.objects.create(toko_id=toko_id, produk_id=produk_id, versi=next_version(toko_id))
+
+
+def _columns(products):
+    columns = {name: [] for name in CATALOG_COLUMNS}
+    rows = products.values_list("id", "nama", "harga_jual", "stok", "satuan", "kategori__nama", "foto", "foto_hash")
+    for produk_id, nama, harga_jual, stok, satuan, kategori, foto, foto_hash in rows:
+        columns["id"].append(produk_id)
+        columns["nama"].append(nama)
+        columns["harga_jual"].append(float(harga_jual))
+        columns["stok"].append(stok)
+        columns["satuan"].append(satuan)
+        columns["kategori"].append(kategori)
+        columns["foto"].append(images.foto_url(foto))
+        columns["thumbnail"].append(images.variant_url(produk_id, foto, foto_hash))
+    return columns
+
+
+def snapshot(toko_id, version=None):
+    """
+    The toko's whole catalog as columns (one list per ``CATALOG_COLUMNS``
+    entry), memoized in the cache per catalog version.
+    """
+    if version is None:
+        version = current_version(toko_id)
+    key = f"catalog:{toko_id}:{version}"
+    payload = cache.get(key)
+    if payload is None:
+        products = Produk.objects.filter(toko_id=toko_id).order_by("id")
+        payload = {"version": version, "products": _columns(products)}
+        # Superseded versions are never asked for again and just expire
+        cache.set(key, payload, 24 * 3600)
+    return payload
+
+
+def delta(toko_id, since, version=None):
+    """
+    Products changed and ids deleted after version ``since``.
+
+    Raises ``ValueError`` when ``since`` is newer than the catalog, i.e. the
+    client holds a version this server never issued.
+    """
+    if version is None:
+        version = current_version(toko_id)
+    if since < 0 or since > version:
+        raise ValueError("Unknown catalog version, fetch a new snapshot")
+
+    changed = Produk.objects.filter(toko_id=toko_id, versi__gt=since).order_by("id")
+    deleted = (
+        ProdukTerhapus.objects.filter(toko_id=toko_id, versi__gt=since)
+        .order_by("produk_id")
+        .values_list("produk_id", flat=True)
+    )
+    return {
+        "version": version,
+        "since": since,
+        "products": _columns(changed),
+        "deleted": list(deleted),
+    }
@@ -0,0 +1,141 @@
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from core.cache import bump_toko_version
+from produk import catalog
+from produk.models import Produk
+
+# Resized copies of product photos, so list screens never download the
+# multi-megabyte original for a 40px avatar.
+#
+# Variants are content-addressed: named after the SHA-256 of the original
+# plus the variant size and format, stored next to the originals and never
+# rewritten, so the storage/CDN can cache them forever. ``Produk.foto_hash``
+# is only set once every variant exists. Variants are built after an upload
+# commits and by ``backfill_produk_images``; until then (and for photos that
+# are not readable images) responses point at the ``/produk/{id}/foto/
+# {variant}`` redirect, which serves the original meanwhile. That route is
+# public, so it never decodes or writes anything itself.
+
+# Longest side in pixels; thumb covers a 40px avatar on a 3x screen
+VARIANTS = {"thumb": 128, "medium": 512}
+
+VARIANT_DIR = "produk/variants"
+
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+_STORAGE = Produk._meta.get_field("foto").storage
+
+
+@lru_cache(maxsize=None)
+def _webp_supported():
+    return features.check("webp")
+
+
+def output_format():
+    """``PRODUK_IMAGE_FORMAT``, falling back to JPEG when Pillow was built without WebP."""
+    output_format = settings.PRODUK_IMAGE_FORMAT.upper()
+    if output_format not in EXTENSIONS:
+        raise ValueError(f"PRODUK_IMAGE_FORMAT must be one of {', '.join(EXTENSIONS)}")
+    if output_format == "WEBP" and not _webp_supported():
+        return "JPEG"
+    return output_format
+
+
+def variant_name(foto_hash, variant):
+    extension = EXTENSIONS[output_format()]
+    return f"{VARIANT_DIR}/{foto_hash[:2]}/{foto_hash}-{variant}{VARIANTS[variant]}.{extension}"
+
+
+def variant_url(produk_id, foto, foto_hash, variant="thumb"):
+    """
+    URL of a product photo variant from the ``id``/``foto``/``foto_hash``
+    columns, without touching storage; ``None`` for products without a photo.
+    """
+    if not foto:
+        return None
+    if foto_hash:
+        return _STORAGE.url(variant_name(foto_hash, variant))
+    return reverse("api-1.0.0:produk_foto_variant", kwargs={"id": produk_id, "variant": variant})
+
+
+def foto_url(foto):
+    """URL of the original photo from the ``foto`` column."""
+    return _STORAGE.url(foto) if foto else None
+
+
+def thumbnail_url(produk):
+    return variant_url(produk.id, produk.foto.name, produk.foto_hash)
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _render(image, size, image_format):
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+    has_alpha = variant.mode in ("RGBA", "LA", "PA") or "transparency" in variant.info
+    if has_alpha and image_format == "WEBP":
+        variant = variant.convert("RGBA")
+    elif has_alpha:
+        # JPEG has no alpha; product cut-outs go on white, not black
+        rgba = variant.convert("RGBA")
+        variant = Image.new("RGB", rgba.size, "white")
+        variant.paste(rgba, mask=rgba.getchannel("A"))
+    else:
+        variant = variant.convert("RGB")
+
+    output = BytesIO()
+    variant.save(output, image_format, quality=settings.PRODUK_IMAGE_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def generate_variants(produk):
+    """
+    Write the missing variants of the product's photo and record its hash.
+
+    Returns the hash. Raises ``ValueError`` when the photo is not a readable
+    image and ``OSError`` when storage fails (e.g. the original is gone).
+    Cheap to repeat: variants that exist are not rebuilt.
+    """
+    image_format = output_format()
+    with produk.foto.open("rb") as original:
+        foto_hash = content_hash(original)
+        missing = [variant for variant in VARIANTS if not _STORAGE.exists(variant_name(foto_hash, variant))]
+        if missing:
+            original.seek(0)
+            try:
+                image = Image.open(original)
+                # Decode big JPEGs at reduced scale straight away; far cheaper
+                image.draft("RGB", (max(VARIANTS.values()) * 2,) * 2)
+                image = ImageOps.exif_transpose(image)
+            except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+                raise ValueError(f"{produk.foto.name} is not a readable image: {e}") from e
+            for variant in missing:
+                _STORAGE.save(variant_name(foto_hash, variant), ContentFile(_render(image, VARIANTS[variant], image_format)))
+
+    if produk.foto_hash != foto_hash:
+        # Unless the photo was replaced meanwhile; its own generation follows
+        with transaction.atomic():
+            # Responses and catalogs now carry the direct variant URLs. The
+            # catalog counter is locked before the product row, as by every
+            # other product write
+            versi = catalog.next_version(produk.toko_id)
+            updated = Produk.objects.filter(id=produk.id, foto=produk.foto.name).update(
+                foto_hash=foto_hash, versi=versi
+            )
+        if updated:
+            transaction.on_commit(lambda: bump_toko_version(produk.toko_id))
+        produk.foto_hash = foto_hash
+    return foto_hash
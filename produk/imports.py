@@ -0,0 +1,176 @@
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from pydantic import ValidationError
+
+from core.cache import bump_toko_version
+from core.imports import read_rows
+from produk import catalog
+from produk.models import KategoriProduk, Produk, Satuan
+from produk.schemas import CreateProdukSchema
+
+# Bulk product import from CSV/XLSX: one header row, then one product per
+# row. Rows with an ``id`` update that product; otherwise a product of the
+# toko with the same ``nama`` is updated, or a new one is created.
+
+IMPORT_COLUMNS = ["nama", "harga_modal", "harga_jual", "stok", "satuan", "kategori"]
+
+# Rows validated, resolved and written per round of queries
+IMPORT_CHUNK_SIZE = 1000
+
+# Longest value each text column may hold (Produk.satuan is shorter than Satuan.nama)
+MAX_LENGTHS = {
+    "nama": Produk._meta.get_field("nama").max_length,
+    "satuan": Produk._meta.get_field("satuan").max_length,
+    "kategori": KategoriProduk._meta.get_field("nama").max_length,
+}
+
+UPDATED_FIELDS = ["nama", "harga_modal", "harga_jual", "stok", "satuan", "kategori", "versi"]
+
+
+class ImportInterrupted(ValueError):
+    """The file became unreadable after some chunks were written; ``summary`` says what went in."""
+
+    def __init__(self, message, summary):
+        super().__init__(message)
+        self.summary = summary
+
+
+def _header(row):
+    columns = [cell.strip().lower() for cell in row]
+    missing = [name for name in IMPORT_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return columns
+
+
+def _validate(number, values):
+    """``(row number, produk id or None, CreateProdukSchema)``; raises ``ValueError`` with a row message."""
+    data = {name: values.get(name, "").strip() for name in IMPORT_COLUMNS}
+    for name, max_length in MAX_LENGTHS.items():
+        if not data[name]:
+            raise ValueError(f"{name} is required")
+        if len(data[name]) > max_length:
+            raise ValueError(f"{name} is longer than {max_length} characters")
+    try:
+        row = CreateProdukSchema(**data)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+    produk_id = values.get("id", "").strip()
+    if produk_id and not produk_id.isdigit():
+        raise ValueError("id must be a number")
+    return number, int(produk_id) if produk_id else None, row
+
+
+def _resolve(model, toko_id, names):
+    """``{nama: instance}`` for every name, creating the missing ones in one statement."""
+    found = {obj.nama: obj for obj in model.objects.filter(toko_id=toko_id, nama__in=names)}
+    missing = set(names) - found.keys()
+    if missing:
+        # Conflicts are names another import created in the meantime
+        model.objects.bulk_create([model(nama=nama, toko_id=toko_id) for nama in missing], ignore_conflicts=True)
+        found.update((obj.nama, obj) for obj in model.objects.filter(toko_id=toko_id, nama__in=missing))
+    return found
+
+
+@transaction.atomic
+def _write_chunk(toko_id, rows, errors):
+    kategori = _resolve(KategoriProduk, toko_id, {row.kategori for _, _, row in rows})
+    _resolve(Satuan, toko_id, {row.satuan for _, _, row in rows})
+
+    ids = {produk_id for _, produk_id, _ in rows if produk_id}
+    names = {row.nama for _, produk_id, row in rows if not produk_id}
+    existing = Produk.objects.filter(Q(id__in=ids) | Q(nama__in=names), toko_id=toko_id).order_by("-id")
+    by_id = {produk.id: produk for produk in existing}
+    # The oldest product wins when several share a name
+    by_name = {produk.nama: produk for produk in by_id.values()}
+
+    versi = catalog.next_version(toko_id)
+    created, updated = {}, {}
+    for number, produk_id, row in rows:
+        if produk_id:
+            produk = by_id.get(produk_id)
+            if produk is None:
+                errors.append({"row": number, "message": f"Produk {produk_id} tidak ditemukan"})
+                continue
+        else:
+            produk = by_name.get(row.nama) or created.get(row.nama)
+
+        if produk is None:
+            produk = Produk(toko_id=toko_id, foto="")
+            created[row.nama] = produk
+        elif produk.pk:
+            updated[produk.pk] = produk
+        produk.nama = row.nama
+        produk.harga_modal = row.harga_modal
+        produk.harga_jual = row.harga_jual
+        produk.stok = row.stok
+        produk.satuan = row.satuan
+        produk.kategori = kategori[row.kategori]
+        # bulk_create/bulk_update skip the pre_save receiver that stamps this
+        produk.versi = versi
+        # A later row for the same name replaces an earlier one
+        by_name[produk.nama] = produk
+
+    Produk.objects.bulk_create(created.values(), batch_size=500)
+    Produk.objects.bulk_update(updated.values(), UPDATED_FIELDS, batch_size=500)
+    return len(created), len(updated)
+
+
+def import_products(toko_id, file, import_format):
+    """
+    Create and update the toko's products from a CSV or XLSX file.
+
+    The file is read as a stream and written in chunks of
+    ``IMPORT_CHUNK_SIZE`` rows, each with a fixed number of queries:
+    categories and units are fetched once and the missing ones created with
+    one ``bulk_create``, matching products are fetched once, then new and
+    changed products go in with ``bulk_create``/``bulk_update``. Invalid rows
+    are reported and skipped; the rest of the file still goes in.
+
+    Returns ``{"created", "updated", "failed", "errors": [{"row", "message"}]}``
+    with 1-based row numbers as a spreadsheet shows them. Raises
+    ``ValueError`` when the file cannot be read or lacks a column, and
+    ``ImportInterrupted`` (with the summary so far) when it breaks off after
+    earlier chunks were written; those stay, a re-import of the fixed file
+    updates them by name.
+    """
+    rows = read_rows(file, import_format)
+    try:
+        header = _header(next(rows))
+    except StopIteration:
+        raise ValueError("File is empty")
+
+    created = updated = 0
+    errors = []
+    numbered = enumerate(rows, start=2)
+    try:
+        while chunk := list(islice(numbered, IMPORT_CHUNK_SIZE)):
+            valid = []
+            for number, cells in chunk:
+                if not any(cell.strip() for cell in cells):
+                    continue
+                try:
+                    valid.append(_validate(number, dict(zip(header, cells))))
+                except ValueError as e:
+                    errors.append({"row": number, "message": str(e)})
+            if valid:
+                chunk_created, chunk_updated = _write_chunk(toko_id, valid, errors)
+                created += chunk_created
+                updated += chunk_updated
+    except ValueError as e:
+        if not (created or updated):
+            raise
+        errors.sort(key=lambda error: error["row"])
+        raise ImportInterrupted(
+            f"{e}; {created} products were created and {updated} updated before that",
+            {"created": created, "updated": updated, "failed": len(errors), "errors": errors},
+        ) from e
+    finally:
+        if created or updated:
+            # Lists, reports and caches of the toko show product data
+            transaction.on_commit(lambda: bump_toko_version(toko_id))
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": created, "updated": updated, "failed": len(errors), "errors": errors}
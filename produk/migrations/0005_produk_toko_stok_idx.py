@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_user_role'),
+        ('produk', '0004_satuan_toko_alter_satuan_nama_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produk',
+            index=models.Index(fields=['toko', 'stok', 'id'], name='produk_toko_stok_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+from django.db import migrations
+
+# Search indexes for produk.search; which one depends on the database.
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS produk_nama_trgm_idx ON produk_produk USING gin (nama gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS produk_nama_trgm_idx"]
+
+# External-content FTS5 table over produk_produk, kept in sync by triggers
+# so bulk inserts and queryset.update() are covered too
+SQLITE_CREATE_TABLE = """
+    CREATE VIRTUAL TABLE produk_search USING fts5(
+        nama, toko_id UNINDEXED, content='produk_produk', content_rowid='id', tokenize='trigram'
+    )
+"""
+SQLITE_CREATE_TRIGGERS = [
+    """
+    CREATE TRIGGER produk_search_ai AFTER INSERT ON produk_produk BEGIN
+        INSERT INTO produk_search(rowid, nama, toko_id) VALUES (new.id, new.nama, new.toko_id);
+    END
+    """,
+    """
+    CREATE TRIGGER produk_search_ad AFTER DELETE ON produk_produk BEGIN
+        INSERT INTO produk_search(produk_search, rowid, nama, toko_id)
+        VALUES ('delete', old.id, old.nama, old.toko_id);
+    END
+    """,
+    """
+    CREATE TRIGGER produk_search_au AFTER UPDATE OF nama, toko_id ON produk_produk BEGIN
+        INSERT INTO produk_search(produk_search, rowid, nama, toko_id)
+        VALUES ('delete', old.id, old.nama, old.toko_id);
+        INSERT INTO produk_search(rowid, nama, toko_id) VALUES (new.id, new.nama, new.toko_id);
+    END
+    """,
+]
+SQLITE_DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS produk_search_ai",
+    "DROP TRIGGER IF EXISTS produk_search_ad",
+    "DROP TRIGGER IF EXISTS produk_search_au",
+]
+SQLITE_REBUILD = "INSERT INTO produk_search(produk_search) VALUES ('rebuild')"
+SQLITE_DROP_TABLE = "DROP TABLE IF EXISTS produk_search"
+
+SQLITE_FORWARD = [SQLITE_CREATE_TABLE, *SQLITE_CREATE_TRIGGERS, SQLITE_REBUILD]
+SQLITE_BACKWARD = [*SQLITE_DROP_TRIGGERS, SQLITE_DROP_TABLE]
+
+
+def restore_sqlite_search_triggers(apps, schema_editor):
+    """
+    RunPython for later migrations that rebuild produk_produk on SQLite
+    (most AddField/AlterField), which drops the table's triggers.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        if "produk_search" not in connection.introspection.table_names(cursor):
+            return
+        for statement in SQLITE_DROP_TRIGGERS + SQLITE_CREATE_TRIGGERS:
+            cursor.execute(statement)
+
+
+def _sqlite_has_fts5_trigram(cursor):
+    # The trigram tokenizer needs SQLite 3.34+ built with FTS5
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.produk_search_probe USING fts5(x, tokenize='trigram')")
+        cursor.execute("DROP TABLE temp.produk_search_probe")
+    except Exception:
+        return False
+    return True
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        connection = schema_editor.connection
+        statements = statements_by_vendor.get(connection.vendor, [])
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite" and not _sqlite_has_fts5_trigram(cursor):
+                # produk.search falls back to icontains
+                return
+            for statement in statements:
+                cursor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produk', '0005_produk_toko_stok_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD}),
+        ),
+    ]
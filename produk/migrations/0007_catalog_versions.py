@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:41
+
+import importlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+produk_search = importlib.import_module("produk.migrations.0006_produk_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_user_role'),
+        ('produk', '0006_produk_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KatalogVersi',
+            fields=[
+                ('toko', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='katalog_versi', serialize=False, to='authentication.toko')),
+                ('versi', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProdukTerhapus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('produk_id', models.IntegerField()),
+                ('versi', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='produk',
+            name='versi',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='produk',
+            index=models.Index(fields=['toko', 'versi'], name='produk_toko_versi_idx'),
+        ),
+        migrations.RunPython(produk_search.restore_sqlite_search_triggers, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='produkterhapus',
+            name='toko',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='produk_terhapus', to='authentication.toko'),
+        ),
+        migrations.AddIndex(
+            model_name='produkterhapus',
+            index=models.Index(fields=['toko', 'versi'], name='produkterhapus_toko_versi_idx'),
+        ),
+    ]
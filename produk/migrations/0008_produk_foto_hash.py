@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:51
+
+import importlib
+
+from django.db import migrations, models
+
+produk_search = importlib.import_module("produk.migrations.0006_produk_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produk', '0007_catalog_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produk',
+            name='foto_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.RunPython(produk_search.restore_sqlite_search_triggers, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
 from authentication.models import Toko
@@ -27,6 +27,8 @@ class Produk(models.Model):
     id = models.AutoField(primary_key=True)
     nama = models.CharField(max_length=255)
     foto = models.ImageField(upload_to='produk/')
+    # SHA-256 of the photo once its resized variants exist (produk.images)
+    foto_hash = models.CharField(max_length=64, blank=True, default="")
     harga_modal = models.DecimalField(max_digits=10, decimal_places=2)
     harga_jual = models.DecimalField(max_digits=10, decimal_places=2)
     stok = models.IntegerField()
@@ -38,4 +40,40 @@ class Produk(models.Model):
         Toko,
         on_delete=models.CASCADE,
         related_name="produk",
-    )
\ No newline at end of file
+    )
+    # Catalog version of the toko when this product last changed (produk.catalog)
+    versi = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Stock-sorted product pages (both directions) and their keyset cursors
+            models.Index(fields=["toko", "stok", "id"], name="produk_toko_stok_idx"),
+            # Catalog deltas: products of a toko changed after a version
+            models.Index(fields=["toko", "versi"], name="produk_toko_versi_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The pre_save receiver stamps ``versi``; the stamp and the row must
+        # commit together for catalog versions to commit in order
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class KatalogVersi(models.Model):
+    """Per-toko catalog version counter, bumped by every product change."""
+
+    toko = models.OneToOneField(Toko, on_delete=models.CASCADE, primary_key=True, related_name="katalog_versi")
+    versi = models.BigIntegerField(default=0)
+
+
+class ProdukTerhapus(models.Model):
+    """Tombstone of a deleted product, so catalog deltas can report the deletion."""
+
+    toko = models.ForeignKey(Toko, on_delete=models.CASCADE, related_name="produk_terhapus")
+    produk_id = models.IntegerField()
+    versi = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["toko", "versi"], name="produkterhapus_toko_versi_idx"),
+        ]
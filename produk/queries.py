@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from django.db.models import Sum
+
+from produk import images
+from produk.models import Produk
+from transaksi.models import TransaksiItem
+
+# Querysets and response shaping shared by the sync handlers in
+# ``produk.api`` and their async variants in ``produk.async_api``.
+
+
+def most_popular_query(toko_id):
+    """Top 3 products by all-time sales volume, as ``product__id``/``total_sold`` rows."""
+    return (
+        TransaksiItem.objects
+        .filter(
+            transaksi__toko_id=toko_id,
+            transaksi__is_deleted=False,
+            transaksi__category="Penjualan Barang"
+        )
+        .values('product__id', 'product__nama')
+        .annotate(total_sold=Sum('quantity'))
+        .order_by('-total_sold')[:3]
+    )
+
+
+def most_popular_payload(rows, products):
+    """``products`` maps ids to the ``Produk`` of each row (``in_bulk``)."""
+    result = []
+    for item in rows:
+        product = products[item['product__id']]
+        result.append({
+            "id": product.id,
+            "name": product.nama,
+            "sold": item['total_sold'],  # Show sold instead of stock
+            "imageUrl": product.foto.url if product.foto else None,
+            "thumbnailUrl": images.thumbnail_url(product),
+        })
+    return result
+
+
+def low_stock_query(toko_id):
+    """The 5 products with the lowest stock."""
+    return Produk.objects.filter(toko_id=toko_id).order_by('stok')[:5]
+
+
+def low_stock_payload(products):
+    return [
+        {
+            "id": product.id,
+            "name": product.nama,
+            "stock": product.stok,
+            "imageUrl": product.foto.url if product.foto else None,
+            "thumbnailUrl": images.thumbnail_url(product),
+        }
+        for product in products
+    ]
+
+
+def top_selling_query(toko_id, year, month):
+    """Top 3 products sold in a month, as ``product__*``/``sold`` rows."""
+    start_date = datetime(year, month, 1)
+    if month == 12:
+        end_date = datetime(year + 1, 1, 1)
+    else:
+        end_date = datetime(year, month + 1, 1)
+
+    return (
+        TransaksiItem.objects
+        .filter(
+            transaksi__toko_id=toko_id,
+            transaksi__created_at__gte=start_date,
+            transaksi__created_at__lt=end_date,
+            transaksi__is_deleted=False,
+            transaksi__category="Penjualan Barang"  # Only include actual sales
+        )
+        .values('product__id', 'product__nama', 'product__foto', 'product__foto_hash')
+        .annotate(sold=Sum('quantity'))
+        .order_by('-sold')[:3]
+    )
+
+
+def top_selling_payload(rows):
+    return [
+        {
+            "id": row['product__id'],
+            "name": row['product__nama'],
+            "imageUrl": images.foto_url(row['product__foto']),
+            "thumbnailUrl": images.variant_url(row['product__id'], row['product__foto'], row['product__foto_hash']),
+            "sold": row['sold'],
+        }
+        for row in rows
+    ]
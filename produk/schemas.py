@@ -2,11 +2,14 @@ from ninja import Schema, UploadedFile
 from typing import List, Optional
 from pydantic import BaseModel, Field, field_validator
 
+from produk import images
+
 
 class ProdukResponseSchema(Schema):
     id: int
     nama: str
     foto: Optional[str]
+    foto_thumbnail: Optional[str] = None
     harga_modal: float
     harga_jual: float
     stok: float
@@ -20,6 +23,7 @@ class ProdukResponseSchema(Schema):
             id=produk.id,
             nama=produk.nama,
             foto=produk.foto.url if produk.foto else None,
+            foto_thumbnail=images.thumbnail_url(produk),
             harga_modal=float(produk.harga_modal),
             harga_jual=float(produk.harga_jual),
             stok=float(produk.stok),
@@ -82,7 +86,8 @@ class UpdateProdukSchema(Schema):
 
 class PaginatedResponseSchema(Schema):
     items: List[ProdukResponseSchema]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
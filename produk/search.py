@@ -0,0 +1,181 @@
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Length
+
+from produk.models import Produk
+
+# Product name search behind one API for every database:
+#
+# - ``filter_products`` narrows a queryset to names containing the query
+#   (what ``nama__icontains`` did), served by an index where there is one;
+# - ``search_products`` returns the best matches ranked, tolerating typos.
+#
+# Postgres uses a ``pg_trgm`` GIN index on ``nama``; SQLite an FTS5 table
+# (``produk_search``, trigram tokenizer) kept in sync by triggers. Both are
+# created by migration 0006. Anything else falls back to ``icontains``.
+# Migrations that rebuild produk_produk on SQLite (most AddField/AlterField)
+# drop its triggers and must re-create them with 0006's
+# ``restore_sqlite_search_triggers``, as 0007 and 0008 do.
+
+FTS_TABLE = "produk_search"
+
+# Shorter queries have no trigram to look up and use a plain ``icontains``
+MIN_INDEXED_QUERY = 3
+
+# Share of the query's trigrams a name must contain to count as a typo match
+SIMILARITY_THRESHOLD = 0.5
+
+# How many FTS candidates are re-ranked in Python on SQLite
+FTS_CANDIDATES = 200
+
+
+def trigrams(text):
+    """pg_trgm-style trigrams: per lowercased word, padded with two leading and one trailing space."""
+    grams = set()
+    for word in text.lower().split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def word_similarity(query, name):
+    """Share of the query's trigrams found in ``name`` (0..1), like pg_trgm's ``word_similarity``."""
+    query_grams = trigrams(query)
+    if not query_grams:
+        return 0.0
+    return len(query_grams & trigrams(name)) / len(query_grams)
+
+
+def _rank(products, query):
+    lowered = query.lower()
+    scored = []
+    for product in products:
+        score = word_similarity(query, product.nama)
+        name = product.nama.lower()
+        if lowered in name or score >= SIMILARITY_THRESHOLD:
+            scored.append((not name.startswith(lowered), lowered not in name, -score, len(name), product.id, product))
+    scored.sort(key=lambda row: row[:5])
+    return [row[-1] for row in scored]
+
+
+def _contains_ranked(queryset, query, limit):
+    """Names containing ``query``, prefix matches and then shorter names first; ranked by the database."""
+    return list(
+        queryset.filter(nama__icontains=query)
+        .annotate(
+            prefix=Case(When(nama__istartswith=query, then=Value(1)), default=Value(0), output_field=IntegerField()),
+            name_length=Length("nama"),
+        )
+        .order_by("-prefix", "name_length", "id")[:limit]
+    )
+
+
+class IcontainsSearch:
+    """No index: substring filter, ranking and typo matching done in Python."""
+
+    def filter(self, queryset, toko_id, query):
+        return queryset.filter(nama__icontains=query)
+
+    def candidates(self, queryset, toko_id, query):
+        return queryset
+
+    def search(self, queryset, toko_id, query, limit):
+        if len(query) < MIN_INDEXED_QUERY:
+            # Too short for a typo to be told apart from a different word
+            return _contains_ranked(queryset, query, limit)
+        return _rank(self.candidates(queryset, toko_id, query), query)[:limit]
+
+
+class SqliteFtsSearch(IcontainsSearch):
+    """FTS5 trigram table; candidates share at least one trigram with the query."""
+
+    @staticmethod
+    def _phrase(text):
+        return '"' + text.replace('"', '""') + '"'
+
+    def filter(self, queryset, toko_id, query):
+        if len(query) < MIN_INDEXED_QUERY:
+            return super().filter(queryset, toko_id, query)
+        # A quoted phrase matches any substring, case-insensitively
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND toko_id = %s",
+                [self._phrase(query), toko_id],
+            )
+        )
+
+    def candidates(self, queryset, toko_id, query):
+        lowered = query.lower()
+        grams = {lowered[i : i + 3] for i in range(len(lowered) - 2)}
+        grams = {gram for gram in grams if " " not in gram}
+        if not grams:
+            return queryset.filter(nama__icontains=query)
+        # Any shared trigram makes a candidate; bm25 puts the closest first
+        ids = RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND toko_id = %s ORDER BY rank LIMIT %s",
+            [" OR ".join(self._phrase(gram) for gram in sorted(grams)), toko_id, FTS_CANDIDATES],
+        )
+        return queryset.filter(id__in=ids)
+
+
+class PostgresTrigramSearch:
+    """``pg_trgm``: ``ILIKE`` and the ``%>`` word-similarity operator both use the GIN index."""
+
+    def filter(self, queryset, toko_id, query):
+        return queryset.filter(nama__icontains=query)
+
+    def search(self, queryset, toko_id, query, limit):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        if len(query) < MIN_INDEXED_QUERY:
+            return _contains_ranked(queryset, query, limit)
+        matches = queryset.filter(Q(nama__icontains=query) | Q(nama__trigram_word_similar=query))
+        return list(
+            matches.annotate(
+                prefix=Case(When(nama__istartswith=query, then=Value(1)), default=Value(0), output_field=IntegerField()),
+                similarity=TrigramWordSimilarity(query, "nama"),
+            ).order_by("-prefix", "-similarity", "id")[:limit]
+        )
+
+
+@lru_cache(maxsize=None)
+def _backend_for(vendor, has_fts_table):
+    if vendor == "postgresql":
+        return PostgresTrigramSearch()
+    if vendor == "sqlite" and has_fts_table:
+        return SqliteFtsSearch()
+    return IcontainsSearch()
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(database_name):
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def get_backend():
+    """The search backend matching the default database."""
+    has_fts_table = connection.vendor == "sqlite" and _has_fts_table(str(connection.settings_dict["NAME"]))
+    return _backend_for(connection.vendor, has_fts_table)
+
+
+def filter_products(queryset, toko_id, query):
+    """``queryset`` (products of ``toko_id``) narrowed to names containing ``query``, case-insensitively."""
+    return get_backend().filter(queryset, toko_id, query)
+
+
+def search_products(toko_id, query, limit=20, queryset=None):
+    """
+    Up to ``limit`` products of the toko best matching ``query``.
+
+    Names starting with the query come first, then names containing it,
+    then close (mistyped) matches, each group by similarity.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    if queryset is None:
+        queryset = Produk.objects.filter(toko_id=toko_id)
+    return get_backend().search(queryset, toko_id, query, limit)
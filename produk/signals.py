@@ -0,0 +1,65 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from authentication.models import Toko
+from core.cache import bump_toko_version
+from . import catalog, images
+from .models import KategoriProduk, Produk, Satuan
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Produk)
+@receiver(post_delete, sender=Produk)
+def bump_toko_cache_version(sender, instance, **kwargs):
+    # Popular, low-stock and top-selling lists all show product data
+    transaction.on_commit(lambda: bump_toko_version(instance.toko_id))
+
+
+@receiver(post_save, sender=KategoriProduk)
+@receiver(post_delete, sender=KategoriProduk)
+@receiver(post_save, sender=Satuan)
+@receiver(post_delete, sender=Satuan)
+def bump_toko_version_for_lookups(sender, instance, **kwargs):
+    # The category and unit pickers revalidate against the toko version
+    if instance.toko_id:
+        transaction.on_commit(lambda: bump_toko_version(instance.toko_id))
+
+
+@receiver(pre_save, sender=Produk)
+def stamp_catalog_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.versi = catalog.next_version(instance.toko_id)
+
+
+@receiver(pre_delete, sender=Produk)
+def record_catalog_deletion(sender, instance, origin=None, **kwargs):
+    # A deleted toko takes its whole catalog (and counter) with it. Before the
+    # DELETE, so the catalog counter is locked ahead of the product row like
+    # every other product write (the deletion's own transaction holds both).
+    if not isinstance(origin, Toko):
+        catalog.record_deletion(instance.toko_id, instance.id)
+
+
+@receiver(pre_save, sender=Produk)
+def forget_replaced_foto(sender, instance, raw=False, **kwargs):
+    # A new upload has no variants yet; responses use the redirect until it does
+    if not raw and instance.foto and not instance.foto._committed:
+        instance.foto_hash = ""
+
+
+@receiver(post_save, sender=Produk)
+def build_foto_variants(sender, instance, raw=False, **kwargs):
+    if not raw and instance.foto and not instance.foto_hash:
+        transaction.on_commit(lambda: _build_foto_variants(instance))
+
+
+def _build_foto_variants(produk):
+    try:
+        images.generate_variants(produk)
+    except (ValueError, OSError):
+        # Not an image, or the original is gone; the redirect keeps serving the original
+        logger.warning("No photo variants for product %s", produk.id, exc_info=True)
@@ -0,0 +1,62 @@
+#!/bin/bash
+
+# Usage: ./scripts/compare_conditional_get.sh HOST [USERS] [DURATION] [SERVER_PROCESS]
+# Runs locust's PollingUser against HOST twice, plain and revalidating with
+# If-None-Match (CONDITIONAL_GET=1), and prints the average response size and
+# median latency per read. When SERVER_PROCESS (a pgrep -f pattern, e.g.
+# "gunicorn backend.wsgi") matches processes on this machine, the CPU seconds
+# they used during each run are printed too.
+
+HOST=${1:?Usage: $0 HOST [USERS] [DURATION] [SERVER_PROCESS]}
+USERS=${2:-50}
+DURATION=${3:-2m}
+SERVER_PROCESS=$4
+OUT_DIR=$(mktemp -d)
+
+cpu_seconds() {
+  # utime + stime of every matching process, in seconds
+  [ -z "$SERVER_PROCESS" ] && { echo 0; return; }
+  local ticks=0
+  for pid in $(pgrep -f "$SERVER_PROCESS"); do
+    ticks=$((ticks + $(awk '{print $14 + $15}' "/proc/$pid/stat" 2>/dev/null || echo 0)))
+  done
+  echo "scale=2; $ticks / $(getconf CLK_TCK)" | bc
+}
+
+run() {
+  local before=$(cpu_seconds)
+  CONDITIONAL_GET=$2 locust -f locustfile.py PollingUser --headless \
+    --host "$HOST" --users "$USERS" --spawn-rate 10 --run-time "$DURATION" \
+    --csv "$OUT_DIR/$1" --only-summary > /dev/null 2>&1
+  echo "$(cpu_seconds) - $before" | bc > "$OUT_DIR/$1_cpu"
+}
+
+echo "Running $USERS users for $DURATION, without and with conditional GET..."
+run plain 0
+run conditional 1
+
+python - "$OUT_DIR" "$SERVER_PROCESS" <<'PY'
+import csv
+import sys
+
+def stats(name):
+    with open(f"{sys.argv[1]}/{name}_stats.csv") as f:
+        return {row["Name"]: row for row in csv.DictReader(f)}
+
+def cpu(name):
+    with open(f"{sys.argv[1]}/{name}_cpu") as f:
+        return f.read().strip()
+
+plain, conditional = stats("plain"), stats("conditional")
+print(f"{'read':45} {'avg bytes':>10} {'(cond.)':>10} {'median ms':>10} {'(cond.)':>10}")
+for name, row in plain.items():
+    other = conditional.get(name, {})
+    print(
+        f"{name:45} {float(row['Average Content Size']):>10.0f} {float(other.get('Average Content Size', 0)):>10.0f}"
+        f" {row['Median Response Time']:>10} {other.get('Median Response Time', '-'):>10}"
+    )
+if sys.argv[2]:
+    print(f"server CPU seconds: plain {cpu('plain')}, conditional {cpu('conditional')}")
+PY
+
+rm -rf "$OUT_DIR"
@@ -0,0 +1,39 @@
+#!/bin/bash
+
+# Usage: ./scripts/compare_wsgi_asgi.sh WSGI_HOST ASGI_HOST [USERS] [DURATION]
+# Runs locust's DashboardUser against both deployments (the sync routes on
+# the WSGI host, the /api/async routes on the ASGI host) and prints p95 per read.
+# Both run each read's queries in turn; the difference measured is workers
+# blocking on the database (WSGI) versus awaiting it (ASGI).
+
+WSGI_HOST=${1:?Usage: $0 WSGI_HOST ASGI_HOST [USERS] [DURATION]}
+ASGI_HOST=${2:?Usage: $0 WSGI_HOST ASGI_HOST [USERS] [DURATION]}
+USERS=${3:-50}
+DURATION=${4:-2m}
+OUT_DIR=$(mktemp -d)
+
+run() {
+  DASHBOARD_API_PREFIX=$3 locust -f locustfile.py DashboardUser --headless \
+    --host "$1" --users "$USERS" --spawn-rate 10 --run-time "$DURATION" \
+    --csv "$OUT_DIR/$2" --only-summary > /dev/null 2>&1
+}
+
+echo "Running $USERS users for $DURATION against each deployment..."
+run "$WSGI_HOST" wsgi /api
+run "$ASGI_HOST" asgi /api/async
+
+python - "$OUT_DIR" <<'PY'
+import csv
+import sys
+
+def p95(name):
+    with open(f"{sys.argv[1]}/{name}_stats.csv") as f:
+        return {row["Name"]: row["95%"] for row in csv.DictReader(f)}
+
+wsgi, asgi = p95("wsgi"), p95("asgi")
+print(f"{'read':45} {'wsgi p95 ms':>12} {'asgi p95 ms':>12}")
+for name in wsgi:
+    print(f"{name:45} {wsgi[name]:>12} {asgi.get(name, '-'):>12}")
+PY
+
+rm -rf "$OUT_DIR"
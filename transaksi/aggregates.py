@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+
+
+def bucket_sums(queryset, buckets, field="total_amount", default=Decimal("0")):
+    """
+    Sum ``field`` over every named ``Q`` bucket in a single aggregate query.
+
+    Bucket names can be any label (e.g. a category with spaces); empty buckets
+    come back as ``default`` instead of ``None``.
+    """
+    names = list(buckets)
+    totals = queryset.aggregate(**_bucket_aggregates(names, buckets, field))
+    return _bucket_totals(names, totals, default)
+
+
+async def abucket_sums(queryset, buckets, field="total_amount", default=Decimal("0")):
+    """``bucket_sums`` for async handlers."""
+    names = list(buckets)
+    totals = await queryset.aaggregate(**_bucket_aggregates(names, buckets, field))
+    return _bucket_totals(names, totals, default)
+
+
+def _bucket_aggregates(names, buckets, field):
+    return {f"bucket_{i}": Sum(field, filter=buckets[name]) for i, name in enumerate(names)}
+
+
+def _bucket_totals(names, totals, default):
+    result = {}
+    for i, name in enumerate(names):
+        total = totals[f"bucket_{i}"]
+        result[name] = default if total is None else total
+    return result
+
+
+def category_buckets(categories):
+    """One bucket per category label, keyed by the label itself."""
+    return {label: Q(category=label) for label in categories}
@@ -1,19 +1,30 @@
-from ninja import Router
+from ninja import Query, Router
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.http import HttpResponseBadRequest
 from transaksi.models import Transaksi, TransaksiItem
-from produk.models import Produk
 from transaksi.schemas import (
+    BulkTransaksiRequest,
+    BulkTransaksiResponse,
     CreateTransaksiRequest,
     TransaksiResponse,
     PaginatedTransaksiResponse,
+    ReportRangeQuery,
 )
-from authentication.models import Toko, User
-from produk.api import AuthBearer
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from django.db.models import Sum
+from authentication.models import Toko
+from authentication.security import AuthBearer
+from core.cache import cached_per_toko
+from core.conditional import bpr_shop, conditional_per_toko
+from core.metrics import query_budget
+from core.pagination import keyset_page
+from transaksi import bulk, queries
+from transaksi.aggregates import bucket_sums
+from laporan import rollup
+from produk import catalog
+from transaksi.exports import EXPORT_FORMATS, export_response
+from transaksi.dates import month_range
+from transaksi.stock import STOCK_SIGNS, apply_stock_deltas, lock_products, quantity_deltas
 
 router = Router(auth=AuthBearer())
 
@@ -21,71 +32,51 @@ router = Router(auth=AuthBearer())
 @router.post("", response={201: TransaksiResponse, 422: dict})
 @transaction.atomic
 def create_transaksi(request, payload: CreateTransaksiRequest):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
+    principal = request.auth
+
     # Check if user has a toko
-    if not user.toko:
+    if not principal.toko_id:
         return 422, {"message": "User doesn't have a toko"}
 
     try:
-        # Create main transaction
-        transaksi = Transaksi.objects.create(
-            toko=user.toko,  # Associate with toko instead of user
-            created_by=user,  # Keep track of which user created the transaction
-            transaction_type=payload.transaction_type,
-            category=payload.category,
-            total_amount=payload.total_amount,
-            total_modal=payload.total_modal,
-            amount=payload.amount,
-            status=payload.status,
-        )
-
-        # Create transaction items and update stock if this is a product sale
-        if payload.category == "Penjualan Barang" and payload.items:
-            for item_data in payload.items:
-                product = get_object_or_404(
-                    Produk, id=item_data.product_id, toko=user.toko
-                )
-
-                # Create transaction item
-                TransaksiItem.objects.create(
-                    transaksi=transaksi,
-                    product=product,
-                    quantity=item_data.quantity,
-                    harga_jual_saat_transaksi=item_data.harga_jual_saat_transaksi,
-                    harga_modal_saat_transaksi=item_data.harga_modal_saat_transaksi,
-                )
-
-                # Update product stock
-                if product.stok < item_data.quantity:
-                    raise ValueError(f"Stok tidak cukup untuk produk {product.nama}")
-                product.stok -= item_data.quantity
-                product.save()
-
-        # Create transaction items and update stock if this is a stock purchase
-        elif payload.category == "Pembelian Stok" and payload.items:
-            for item_data in payload.items:
-                product = get_object_or_404(
-                    Produk, id=item_data.product_id, toko=user.toko
-                )
-
-                # Create transaction item
-                TransaksiItem.objects.create(
-                    transaksi=transaksi,
-                    product=product,
-                    quantity=item_data.quantity,
-                    harga_jual_saat_transaksi=item_data.harga_jual_saat_transaksi,
-                    harga_modal_saat_transaksi=item_data.harga_modal_saat_transaksi,
+        with transaction.atomic():
+            stock_sign = STOCK_SIGNS.get(payload.category)
+            items = payload.items if stock_sign else []
+
+            # Lock every referenced product up front so concurrent sales queue behind us,
+            # after the catalog counter like every other product write
+            versi = catalog.next_version(principal.toko_id) if items else None
+            products = lock_products(principal.toko_id, [item.product_id for item in items])
+
+            # Create main transaction
+            transaksi = Transaksi.objects.create(
+                toko_id=principal.toko_id,  # Associate with toko instead of user
+                created_by_id=principal.user_id,  # Keep track of which user created the transaction
+                transaction_type=payload.transaction_type,
+                category=payload.category,
+                total_amount=payload.total_amount,
+                total_modal=payload.total_modal,
+                amount=payload.amount,
+                status=payload.status,
+            )
+            rollup.record(transaksi)
+
+            if items:
+                TransaksiItem.objects.bulk_create(
+                    TransaksiItem(
+                        transaksi=transaksi,
+                        product=products[item_data.product_id],
+                        quantity=item_data.quantity,
+                        harga_jual_saat_transaksi=item_data.harga_jual_saat_transaksi,
+                        harga_modal_saat_transaksi=item_data.harga_modal_saat_transaksi,
+                    )
+                    for item_data in items
                 )
-
-                # Increase product stock
-                product.stok += item_data.quantity
-                product.save()
+                apply_stock_deltas(products, quantity_deltas(items, stock_sign), versi)
 
         # Reload transaction with all items for response
-        transaksi = Transaksi.objects.get(id=transaksi.id)
-        return 201, TransaksiResponse.from_orm(transaksi)
+        transaksi = TransaksiResponse.from_queryset(Transaksi.objects.filter(id=transaksi.id))[0]
+        return 201, transaksi
 
     except ValueError as e:
         return 422, {"message": str(e)}
@@ -93,7 +84,41 @@ def create_transaksi(request, payload: CreateTransaksiRequest):
         return 422, {"message": f"Error during transaction: {str(e)}"}
 
 
-@router.get("", response={200: PaginatedTransaksiResponse, 404: dict})
+@router.post("/bulk", response={200: BulkTransaksiResponse, 409: dict, 422: dict})
+def create_transaksi_bulk(request, payload: BulkTransaksiRequest):
+    """
+    Record a batch of offline-queued transactions in one request.
+
+    Each row carries a client-generated ``idempotency_key``, so replaying a
+    batch (e.g. after a timeout) never records a sale twice. Rows are checked
+    in order against the stock the earlier rows left; see ``results`` for
+    what happened to each.
+    """
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 422, {"message": "User doesn't have a toko"}
+    if len(payload.transactions) > settings.TRANSAKSI_BULK_MAX_ROWS:
+        return 422, {"message": f"At most {settings.TRANSAKSI_BULK_MAX_ROWS} transactions per request"}
+
+    try:
+        results = bulk.import_transactions(principal.toko_id, principal.user_id, payload.transactions)
+    except (IntegrityError, ValueError):
+        # Another request recorded some of these keys or changed the stock meanwhile
+        return 409, {"message": "Transaksi berubah saat diproses, silakan kirim ulang"}
+
+    statuses = [result["status"] for result in results]
+    return 200, {
+        "created": statuses.count(bulk.CREATED),
+        "duplicates": statuses.count(bulk.DUPLICATE),
+        "failed": statuses.count(bulk.FAILED),
+        "results": results,
+    }
+
+
+@router.get("", response={200: PaginatedTransaksiResponse, 404: dict, 422: dict})
+@query_budget(3)
+@conditional_per_toko()
 def get_transaksi_list(
     request,
     page: int = 1,
@@ -104,30 +129,32 @@ def get_transaksi_list(
     show_deleted: bool = False,
     month: int = None,
     year: int = None,
+    cursor: str = None,
+    with_total: bool = False,
 ):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
+    """
+    Page-number mode by default. Passing ``cursor`` (empty for the first page)
+    switches to keyset pagination on ``(created_at, id)``: follow
+    ``next_cursor`` for the next page; ``total`` is only counted when
+    ``with_total`` is set.
+    """
+    principal = request.auth
+
     # Check if user has a toko
-    if not user.toko:
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
     # Filter transactions by toko instead of user
-    queryset = Transaksi.objects.filter(toko=user.toko, is_deleted=show_deleted)
+    queryset = Transaksi.objects.filter(toko_id=principal.toko_id, is_deleted=show_deleted)
     
     # Add month and year filters
     if month and year:
-        from datetime import datetime
-        import pytz
-        
-        # Create start and end date for the selected month
-        start_date = datetime(year, month, 1)
-        next_month = month + 1 if month < 12 else 1
-        next_year = year if month < 12 else year + 1
-        end_date = datetime(next_year, next_month, 1)
-        
-        # Filter by date range
-        queryset = queryset.filter(created_at__gte=start_date, created_at__lt=end_date)
+        # The month in Jakarta time, as [first day, first day of next month)
+        try:
+            report_range = month_range(year, month)
+        except ValueError as e:
+            return 422, {"message": str(e)}
+        queryset = queryset.filter(created_at__gte=report_range.start, created_at__lt=report_range.end)
     
     queryset = queryset.order_by("-created_at")
 
@@ -151,6 +178,18 @@ def get_transaksi_list(
     except ValueError:
         per_page = 10
 
+    if cursor is not None:
+        try:
+            page_items, next_cursor = keyset_page(queryset, ["-created_at", "-id"], cursor, per_page)
+        except ValueError as e:
+            return 422, {"message": str(e)}
+        return 200, {
+            "items": TransaksiResponse.from_queryset(page_items),
+            "total": queryset.count() if with_total else None,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+        }
+
     total = queryset.count()
     total_pages = (total + per_page - 1) // per_page
 
@@ -161,7 +200,7 @@ def get_transaksi_list(
     page_items = queryset[offset : offset + per_page]
 
     return 200, {
-        "items": [TransaksiResponse.from_orm(t) for t in page_items],
+        "items": TransaksiResponse.from_queryset(page_items),
         "total": total,
         "page": page,
         "per_page": per_page,
@@ -169,122 +208,35 @@ def get_transaksi_list(
     }
 
 
-@router.get("/summary/monthly", response={200: dict, 404: dict})
+@router.get("/summary/monthly", response={200: dict, 400: dict, 404: dict})
+@query_budget(2)
+@conditional_per_toko()
+@cached_per_toko()
 def get_monthly_summary(request, month: int = None, year: int = None):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
+    principal = request.auth
+
     # Check if user has a toko
-    if not user.toko:
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
 
-    # Get current month period if not specified
-    current_date = datetime.now()
-    
-    # Use provided month and year if available, otherwise use current date
-    if month is None or year is None:
-        year, month = current_date.year, current_date.month
-    
-    # Ensure month is valid (1-12)
-    if month < 1 or month > 12:
-        return 400, {"message": "Month must be between 1 and 12"}
-
-    # Define the current month period
-    start_date = datetime(year, month, 1)
-    next_month = month + 1 if month < 12 else 1
-    next_year = year if month < 12 else year + 1
-    end_date = datetime(next_year, next_month, 1)
-
-    # Define the previous month period
-    prev_start_date = start_date - relativedelta(months=1)
-    prev_end_date = start_date
-
-    # Filter transactions for current month by toko instead of user
-    current_month_transactions = Transaksi.objects.filter(
-        toko=user.toko,
-        created_at__gte=start_date,
-        created_at__lt=end_date,
-        is_deleted=False,
-    )
-
-    # Filter transactions for previous month by toko instead of user
-    prev_month_transactions = Transaksi.objects.filter(
-        toko=user.toko,
-        created_at__gte=prev_start_date,
-        created_at__lt=prev_end_date,
-        is_deleted=False,
-    )
-
-    # Calculate income (pemasukan) for current and previous months
-    current_income = (
-        current_month_transactions.filter(transaction_type="pemasukan").aggregate(
-            total=Sum("total_amount")
-        )["total"]
-        or 0
-    )
-
-    prev_income = (
-        prev_month_transactions.filter(transaction_type="pemasukan").aggregate(
-            total=Sum("total_amount")
-        )["total"]
-        or 0
-    )
-
-    # Calculate expenses (pengeluaran) for current and previous months
-    current_expenses = (
-        current_month_transactions.filter(transaction_type="pengeluaran").aggregate(
-            total=Sum("total_amount")
-        )["total"]
-        or 0
-    )
-
-    prev_expenses = (
-        prev_month_transactions.filter(transaction_type="pengeluaran").aggregate(
-            total=Sum("total_amount")
-        )["total"]
-        or 0
-    )
-
-    # Calculate percentage changes
-    income_change = 0
-    if prev_income > 0:
-        income_change = round(((current_income - prev_income) / prev_income) * 100, 2)
-
-    expense_change = 0
-    if prev_expenses > 0:
-        expense_change = round(
-            ((current_expenses - prev_expenses) / prev_expenses) * 100, 2
-        )
+    try:
+        rows, buckets = queries.monthly_summary_query(principal.toko_id, month, year)
+    except ValueError as e:
+        return 400, {"message": str(e)}
 
-    # Calculate net amount and determine status
-    net_amount = current_income - current_expenses
-    status = "untung" if net_amount >= 0 else "rugi"
-
-    return 200, {
-        "pemasukan": {
-            "amount": current_income,
-            "change": income_change,
-        },
-        "pengeluaran": {
-            "amount": current_expenses,
-            "change": expense_change,
-        },
-        "status": status,
-        "amount": abs(net_amount),
-    }
+    return 200, queries.monthly_summary_payload(bucket_sums(rows, buckets, default=0))
 
 @router.patch("/{id}/toggle-payment-status", response={200: dict, 404: dict, 422: dict})
 def toggle_payment_status(request, id: str):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
+    principal = request.auth
+
     # Check if user has a toko
-    if not user.toko:
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
     try:
         # Get transaction by ID, ensure it belongs to user's toko and is not deleted
-        transaksi = get_object_or_404(Transaksi, id=id, toko=user.toko, is_deleted=False)
+        transaksi = get_object_or_404(Transaksi, id=id, toko_id=principal.toko_id, is_deleted=False)
         
         # Check if current status is "Belum Lunas"
         if transaksi.status != "Belum Lunas":
@@ -293,6 +245,7 @@ def toggle_payment_status(request, id: str):
         # Update status to "Lunas"
         transaksi.status = "Lunas"
         transaksi.save()
+        rollup.move_status(transaksi, old_status="Belum Lunas")
         
         return 200, {
             "message": "Status transaksi berhasil diubah menjadi Lunas",
@@ -303,309 +256,153 @@ def toggle_payment_status(request, id: str):
         return 404, {"message": f"Error: {str(e)}"}
     
 @router.get("/debt-summary", response={200: dict, 404: dict})
+@query_budget(2)
+@conditional_per_toko()
+@cached_per_toko()
 def get_debt_summary(request):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
-    if not user.toko:
+    principal = request.auth
+
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
-    # Get unpaid transactions by toko
-    unpaid_transactions = Transaksi.objects.filter(
-        toko=user.toko,
-        status="Belum Lunas",
-        is_deleted=False,
-    )
-    
-    # Calculate total for each type
-    utang_saya = unpaid_transactions.filter(
-        transaction_type="pengeluaran"
-    ).aggregate(total=Sum("total_amount"))["total"] or 0
-    
-    utang_pelanggan = unpaid_transactions.filter(
-        transaction_type="pemasukan"
-    ).aggregate(total=Sum("total_amount"))["total"] or 0
-    
-    return 200, {
-        "utang_saya": float(utang_saya),
-        "utang_pelanggan": float(utang_pelanggan),
-    }
+    # Get unpaid transactions by toko and total both types in one query
+    sums = bucket_sums(queries.unpaid_transactions(principal.toko_id), queries.DEBT_BUCKETS)
+    return 200, queries.debt_summary_payload(sums)
 
 @router.get("/debt-report-by-date", response={200: dict, 404: dict, 400: dict})
-def get_debt_report_by_date(request):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
-    if not user.toko:
+@query_budget(3)
+@conditional_per_toko()
+def get_debt_report_by_date(request, dates: Query[ReportRangeQuery]):
+    principal = request.auth
+
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
-    # Get date range parameters
-    start_date_str = request.GET.get("start_date")
-    end_date_str = request.GET.get("end_date")
-    
-    # Validate date parameters
-    if not start_date_str or not end_date_str:
-        return 400, {"message": "Both start_date and end_date parameters are required"}
-    
     try:
-        # Parse date strings to datetime objects with timezone handling
-        # The frontend now sends date strings with timezone info (UTC+7)
-        from datetime import datetime
-        import pytz
-        
-        # Set the Jakarta timezone (UTC+7)
-        jakarta_tz = pytz.timezone('Asia/Jakarta')
-        
-        # Check if timezone info is included in the strings
-        if 'T' in start_date_str:
-            # Try to parse ISO format with timezone
-            try:
-                start_date = datetime.fromisoformat(start_date_str)
-                # Convert to UTC for database query
-                if start_date.tzinfo is not None:
-                    start_date = start_date.astimezone(pytz.UTC)
-            except ValueError:
-                # Fall back to simpler parsing
-                start_date = datetime.strptime(start_date_str.split('T')[0], "%Y-%m-%d")
-                # Localize to Jakarta time, then convert to UTC
-                start_date = jakarta_tz.localize(start_date).astimezone(pytz.UTC)
-        else:
-            # Basic date string without time/timezone - assume it's Jakarta time (UTC+7)
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-            # Localize to Jakarta time, then convert to UTC
-            start_date = jakarta_tz.localize(start_date).astimezone(pytz.UTC)
-            
-        # Similar handling for end_date
-        if 'T' in end_date_str:
-            try:
-                end_date = datetime.fromisoformat(end_date_str)
-                if end_date.tzinfo is not None:
-                    end_date = end_date.astimezone(pytz.UTC)
-            except ValueError:
-                # Parse date part and add time to include the entire day
-                date_part = end_date_str.split('T')[0]
-                end_date = datetime.strptime(f"{date_part} 23:59:59", "%Y-%m-%d %H:%M:%S")
-                # Localize to Jakarta time, then convert to UTC
-                end_date = jakarta_tz.localize(end_date).astimezone(pytz.UTC)
-        else:
-            # Add time to end_date to include the entire day (23:59:59)
-            end_date = datetime.strptime(f"{end_date_str} 23:59:59", "%Y-%m-%d %H:%M:%S")
-            # Localize to Jakarta time, then convert to UTC for database query
-            end_date = jakarta_tz.localize(end_date).astimezone(pytz.UTC)
-            
-        # Ensure start_date is before end_date
-        if start_date > end_date:
-            return 400, {"message": "start_date must be before end_date"}
-            
+        report_range = dates.resolve()
     except ValueError as e:
-        return 400, {"message": f"Invalid date format: {str(e)}"}
+        return 400, {"message": str(e)}
     
     # Get unpaid transactions within the specified date range
-    transactions = Transaksi.objects.filter(
-        toko=user.toko,
-        status="Belum Lunas",
-        is_deleted=False,
-        created_at__gte=start_date,
-        created_at__lte=end_date,
-    ).order_by("-created_at")
-    
-    # Format the dates back to the Jakarta time zone for the response
-    jakarta_start_date = start_date.astimezone(jakarta_tz).strftime("%Y-%m-%d")
-    jakarta_end_date = end_date.astimezone(jakarta_tz).strftime("%Y-%m-%d")
-    
-    return 200, {
-        "transactions": [TransaksiResponse.from_orm(t) for t in transactions],
-        "start_date": jakarta_start_date,
-        "end_date": jakarta_end_date,
-    }
+    transactions = queries.report_transactions(report_range, unpaid_only=True, toko_id=principal.toko_id)
+
+    export_format = request.GET.get("format")
+    if export_format:
+        if export_format not in EXPORT_FORMATS:
+            return 400, {"message": "format must be csv or xlsx"}
+        return export_response(
+            transactions, export_format, f"laporan_utang_{report_range.start_date}_{report_range.end_date}"
+        )
+
+    return 200, queries.report_payload(TransaksiResponse.from_queryset(transactions), report_range)
 
 @router.get("/first-debt-date", response={200: dict, 404: dict})
+@query_budget(1)
+@conditional_per_toko()
+@cached_per_toko()
 def get_first_debt_date(request):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
-    if not user.toko:
+    principal = request.auth
+
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
     # Find the earliest unpaid transaction date
-    earliest_transaction = Transaksi.objects.filter(
-        toko=user.toko,
-        status="Belum Lunas",
-        is_deleted=False
-    ).order_by('created_at').first()
-    
-    if earliest_transaction:
-        first_date = earliest_transaction.created_at.strftime('%Y-%m-%d')
-    else:
-        # If no unpaid transactions, return today's date as fallback
-        first_date = datetime.now().strftime('%Y-%m-%d')
-    
-    return 200, {
-        "first_date": first_date
-    }
+    created_at = queries.first_created_query(principal.toko_id, unpaid_only=True).first()
+    return 200, queries.first_date_payload(created_at)
 
 @router.get("/financial-report-by-date", response={200: dict, 404: dict, 400: dict})
-def get_financial_report_by_date(request):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
-    if not user.toko:
+@query_budget(3)
+@conditional_per_toko()
+def get_financial_report_by_date(request, dates: Query[ReportRangeQuery]):
+    principal = request.auth
+
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
-    # Get date range parameters
-    start_date_str = request.GET.get("start_date")
-    end_date_str = request.GET.get("end_date")
-    
-    # Validate date parameters
-    if not start_date_str or not end_date_str:
-        return 400, {"message": "Both start_date and end_date parameters are required"}
-    
     try:
-        # Parse date strings to datetime objects with timezone handling
-        # The frontend sends date strings with timezone info (UTC+7)
-        from datetime import datetime
-        import pytz
-        
-        # Set the Jakarta timezone (UTC+7)
-        jakarta_tz = pytz.timezone('Asia/Jakarta')
-        
-        # Check if timezone info is included in the strings
-        if 'T' in start_date_str:
-            # Try to parse ISO format with timezone
-            try:
-                start_date = datetime.fromisoformat(start_date_str)
-                # Convert to UTC for database query
-                if start_date.tzinfo is not None:
-                    start_date = start_date.astimezone(pytz.UTC)
-            except ValueError:
-                # Fall back to simpler parsing
-                start_date = datetime.strptime(start_date_str.split('T')[0], "%Y-%m-%d")
-                # Localize to Jakarta time, then convert to UTC
-                start_date = jakarta_tz.localize(start_date).astimezone(pytz.UTC)
-        else:
-            # Basic date string without time/timezone - assume it's Jakarta time (UTC+7)
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-            # Localize to Jakarta time, then convert to UTC
-            start_date = jakarta_tz.localize(start_date).astimezone(pytz.UTC)
-            
-        # Similar handling for end_date
-        if 'T' in end_date_str:
-            try:
-                end_date = datetime.fromisoformat(end_date_str)
-                if end_date.tzinfo is not None:
-                    end_date = end_date.astimezone(pytz.UTC)
-            except ValueError:
-                # Parse date part and add time to include the entire day
-                date_part = end_date_str.split('T')[0]
-                end_date = datetime.strptime(f"{date_part} 23:59:59", "%Y-%m-%d %H:%M:%S")
-                # Localize to Jakarta time, then convert to UTC
-                end_date = jakarta_tz.localize(end_date).astimezone(pytz.UTC)
-        else:
-            # Add time to end_date to include the entire day (23:59:59)
-            end_date = datetime.strptime(f"{end_date_str} 23:59:59", "%Y-%m-%d %H:%M:%S")
-            # Localize to Jakarta time, then convert to UTC for database query
-            end_date = jakarta_tz.localize(end_date).astimezone(pytz.UTC)
-            
-        # Ensure start_date is before end_date
-        if start_date > end_date:
-            return 400, {"message": "start_date must be before end_date"}
-            
+        report_range = dates.resolve()
     except ValueError as e:
-        return 400, {"message": f"Invalid date format: {str(e)}"}
+        return 400, {"message": str(e)}
     
     # Get all transactions (regardless of status) within the specified date range
-    transactions = Transaksi.objects.filter(
-        toko=user.toko,
-        is_deleted=False,
-        created_at__gte=start_date,
-        created_at__lte=end_date,
-    ).order_by("-created_at")
-    
-    # Format the dates back to the Jakarta time zone for the response
-    jakarta_start_date = start_date.astimezone(jakarta_tz).strftime("%Y-%m-%d")
-    jakarta_end_date = end_date.astimezone(jakarta_tz).strftime("%Y-%m-%d")
-    
-    return 200, {
-        "transactions": [TransaksiResponse.from_orm(t) for t in transactions],
-        "start_date": jakarta_start_date,
-        "end_date": jakarta_end_date,
-    }
+    transactions = queries.report_transactions(report_range, toko_id=principal.toko_id)
+
+    export_format = request.GET.get("format")
+    if export_format:
+        if export_format not in EXPORT_FORMATS:
+            return 400, {"message": "format must be csv or xlsx"}
+        return export_response(
+            transactions, export_format, f"laporan_keuangan_{report_range.start_date}_{report_range.end_date}"
+        )
+
+    return 200, queries.report_payload(TransaksiResponse.from_queryset(transactions), report_range)
 
 @router.get("/first-transaction-date", response={200: dict, 404: dict})
+@query_budget(1)
+@conditional_per_toko()
+@cached_per_toko()
 def get_first_transaction_date(request):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
-    if not user.toko:
+    principal = request.auth
+
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
     # Find the earliest transaction date for this toko
-    earliest_transaction = Transaksi.objects.filter(
-        toko=user.toko,
-        is_deleted=False
-    ).order_by('created_at').first()
-    
-    if earliest_transaction:
-        first_date = earliest_transaction.created_at.strftime('%Y-%m-%d')
-    else:
-        # If no transactions, return today's date as fallback
-        first_date = datetime.now().strftime('%Y-%m-%d')
-    
-    return 200, {
-        "first_date": first_date
-    }
+    created_at = queries.first_created_query(principal.toko_id).first()
+    return 200, queries.first_date_payload(created_at)
 
 @router.get("/{id}", response={200: TransaksiResponse, 404: dict})
+@query_budget(2)
+@conditional_per_toko()
 def get_transaksi_detail(request, id: str):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
+    principal = request.auth
+
     # Check if user has a toko
-    if not user.toko:
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
     try:
         # Get transaction by ID and check if it belongs to the user's toko
-        transaksi = get_object_or_404(Transaksi, id=id, toko=user.toko)
-        return 200, TransaksiResponse.from_orm(transaksi)
+        found = TransaksiResponse.from_queryset(Transaksi.objects.filter(id=id, toko_id=principal.toko_id))
+        if not found:
+            return 404, {"message": "Transaksi tidak ditemukan"}
+        return 200, found[0]
     except Exception:
         return 404, {"message": "Transaksi tidak ditemukan"}
 
 @router.delete("/{id}", response={200: dict, 404: dict, 422: dict})
 @transaction.atomic
 def delete_transaksi(request, id: str):
-    user_id = request.auth
-    user = get_object_or_404(User, id=user_id)
-    
+    principal = request.auth
+
     # Check if user has a toko
-    if not user.toko:
+    if not principal.toko_id:
         return 404, {"message": "User doesn't have a toko"}
     
     try:
-        # Get transaction by ID and check if it belongs to the user's toko
-        transaksi = get_object_or_404(Transaksi, id=id, toko=user.toko)
-
-        # Restore product stock if transaction is a product sale
-        if transaksi.category == "Penjualan Barang":
-            for item in transaksi.items.all():
-                product = item.product
-                product.stok += item.quantity
-                product.save()
-
-        # Reduce product stock if transaction is a stock purchase
-        elif transaksi.category == "Pembelian Stok":
-            for item in transaksi.items.all():
-                product = item.product
-                if product.stok < item.quantity:
-                    raise ValueError(
-                        f"Tidak dapat menghapus transaksi. Stok produk {product.nama} tidak mencukupi."
-                    )
-                product.stok -= item.quantity
-                product.save()
+        with transaction.atomic():
+            # Get transaction by ID and check if it belongs to the user's toko
+            transaksi = get_object_or_404(
+                Transaksi.objects.select_for_update(), id=id, toko_id=principal.toko_id, is_deleted=False
+            )
+
+            # Undo the stock movement: sales give stock back, purchases take it away again
+            stock_sign = -STOCK_SIGNS.get(transaksi.category, 0)
+            if stock_sign:
+                items = list(transaksi.items.all())
+                versi = catalog.next_version(principal.toko_id)
+                products = lock_products(principal.toko_id, [item.product_id for item in items])
+                apply_stock_deltas(
+                    products,
+                    quantity_deltas(items, stock_sign),
+                    versi,
+                    error="Tidak dapat menghapus transaksi. Stok produk {nama} tidak mencukupi.",
+                )
 
-        # Instead of transaksi.delete(), do a soft delete
-        transaksi.is_deleted = True
-        transaksi.save()
+            # Instead of transaksi.delete(), do a soft delete
+            transaksi.is_deleted = True
+            transaksi.save()
+            rollup.record(transaksi, sign=-1)
 
         return 200, {"message": "Transaksi berhasil dihapus"}
     except ValueError as e:
@@ -613,199 +410,68 @@ def delete_transaksi(request, id: str):
     except Exception as e:
         return 404, {"message": f"Error: {str(e)}"}
     
-# Add these imports if not already there
-from django.conf import settings
-
-@router.get("/bpr/shop/{shop_id}/utang", response={200: dict, 403: dict, 404: dict})
-def get_shop_debt_for_bpr(request, shop_id: int):
+@router.get("/bpr/shop/{shop_id}/utang", response={200: dict, 400: dict, 403: dict, 404: dict})
+@conditional_per_toko(toko=bpr_shop)
+def get_shop_debt_for_bpr(request, shop_id: int, dates: Query[ReportRangeQuery]):
     """Get debt report for a specific shop for BPR users."""
-    user_id = request.auth
-    
     try:
-        user = User.objects.get(id=user_id)
-        
         # Check if user is BPR using the email from settings
-        if user.email != settings.BPR_EMAIL:
+        if not request.auth.is_bpr:
             return 403, {"error": "Only BPR users can access this endpoint"}
         
         # Get the shop
         shop = get_object_or_404(Toko, id=shop_id)
         
-        # Get date range parameters - this reuses the same query parameters as the regular endpoint
-        start_date_str = request.GET.get("start_date")
-        end_date_str = request.GET.get("end_date")
-        
-        # Validate date parameters
-        if not start_date_str or not end_date_str:
-            return 400, {"message": "Both start_date and end_date parameters are required"}
-        
         try:
-            # Parse date strings to datetime objects with timezone handling
-            # The frontend sends date strings with timezone info (UTC+7)
-            from datetime import datetime
-            import pytz
-            
-            # Set the Jakarta timezone (UTC+7)
-            jakarta_tz = pytz.timezone('Asia/Jakarta')
-            
-            # Check if timezone info is included in the strings
-            if 'T' in start_date_str:
-                # Try to parse ISO format with timezone
-                try:
-                    start_date = datetime.fromisoformat(start_date_str)
-                    # Convert to UTC for database query
-                    if start_date.tzinfo is not None:
-                        start_date = start_date.astimezone(pytz.UTC)
-                except ValueError:
-                    # Fall back to simpler parsing
-                    start_date = datetime.strptime(start_date_str.split('T')[0], "%Y-%m-%d")
-                    # Localize to Jakarta time, then convert to UTC
-                    start_date = jakarta_tz.localize(start_date).astimezone(pytz.UTC)
-            else:
-                # Basic date string without time/timezone - assume it's Jakarta time (UTC+7)
-                start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-                # Localize to Jakarta time, then convert to UTC
-                start_date = jakarta_tz.localize(start_date).astimezone(pytz.UTC)
-                
-            # Similar handling for end_date
-            if 'T' in end_date_str:
-                try:
-                    end_date = datetime.fromisoformat(end_date_str)
-                    if end_date.tzinfo is not None:
-                        end_date = end_date.astimezone(pytz.UTC)
-                except ValueError:
-                    # Parse date part and add time to include the entire day
-                    date_part = end_date_str.split('T')[0]
-                    end_date = datetime.strptime(f"{date_part} 23:59:59", "%Y-%m-%d %H:%M:%S")
-                    # Localize to Jakarta time, then convert to UTC
-                    end_date = jakarta_tz.localize(end_date).astimezone(pytz.UTC)
-            else:
-                # Add time to end_date to include the entire day (23:59:59)
-                end_date = datetime.strptime(f"{end_date_str} 23:59:59", "%Y-%m-%d %H:%M:%S")
-                # Localize to Jakarta time, then convert to UTC for database query
-                end_date = jakarta_tz.localize(end_date).astimezone(pytz.UTC)
-                
-            # Ensure start_date is before end_date
-            if start_date > end_date:
-                return 400, {"message": "start_date must be before end_date"}
-                
+            report_range = dates.resolve()
         except ValueError as e:
-            return 400, {"message": f"Invalid date format: {str(e)}"}
+            return 400, {"message": str(e)}
         
         # Get unpaid transactions for the specific shop
-        transactions = Transaksi.objects.filter(
-            toko=shop,  # Use the shop from the URL parameter
-            status="Belum Lunas",
-            is_deleted=False,
-            created_at__gte=start_date,
-            created_at__lte=end_date,
-        ).order_by("-created_at")
-        
-        # Format the dates back to the Jakarta time zone for the response
-        jakarta_start_date = start_date.astimezone(jakarta_tz).strftime("%Y-%m-%d")
-        jakarta_end_date = end_date.astimezone(jakarta_tz).strftime("%Y-%m-%d")
-        
-        return 200, {
-            "transactions": [TransaksiResponse.from_orm(t) for t in transactions],
-            "start_date": jakarta_start_date,
-            "end_date": jakarta_end_date,
-        }
+        transactions = queries.report_transactions(report_range, unpaid_only=True, toko=shop)
+
+        export_format = request.GET.get("format")
+        if export_format:
+            if export_format not in EXPORT_FORMATS:
+                return 400, {"message": "format must be csv or xlsx"}
+            return export_response(
+                transactions, export_format, f"laporan_utang_toko_{shop_id}_{report_range.start_date}_{report_range.end_date}"
+            )
+
+        return 200, queries.report_payload(TransaksiResponse.from_queryset(transactions), report_range)
     except Exception as e:
         print(f"Error: {str(e)}")
         return 403, {"error": "Access denied"}
 
-@router.get("/bpr/shop/{shop_id}/keuangan", response={200: dict, 403: dict, 404: dict})
-def get_shop_financial_for_bpr(request, shop_id: int):
+@router.get("/bpr/shop/{shop_id}/keuangan", response={200: dict, 400: dict, 403: dict, 404: dict})
+@conditional_per_toko(toko=bpr_shop)
+def get_shop_financial_for_bpr(request, shop_id: int, dates: Query[ReportRangeQuery]):
     """Get financial report for a specific shop for BPR users."""
-    user_id = request.auth
-    
     try:
-        user = User.objects.get(id=user_id)
-        
         # Check if user is BPR
-        if user.email != settings.BPR_EMAIL:
+        if not request.auth.is_bpr:
             return 403, {"error": "Only BPR users can access this endpoint"}
         
         # Get the shop
         shop = get_object_or_404(Toko, id=shop_id)
         
-        # Get date range parameters
-        start_date_str = request.GET.get("start_date")
-        end_date_str = request.GET.get("end_date")
-        
-        # Validate date parameters
-        if not start_date_str or not end_date_str:
-            return 400, {"message": "Both start_date and end_date parameters are required"}
-        
         try:
-            # Parse date strings to datetime objects with timezone handling
-            from datetime import datetime
-            import pytz
-            
-            # Set the Jakarta timezone (UTC+7)
-            jakarta_tz = pytz.timezone('Asia/Jakarta')
-            
-            # Check if timezone info is included in the strings
-            if 'T' in start_date_str:
-                # Try to parse ISO format with timezone
-                try:
-                    start_date = datetime.fromisoformat(start_date_str)
-                    # Convert to UTC for database query
-                    if start_date.tzinfo is not None:
-                        start_date = start_date.astimezone(pytz.UTC)
-                except ValueError:
-                    # Fall back to simpler parsing
-                    start_date = datetime.strptime(start_date_str.split('T')[0], "%Y-%m-%d")
-                    # Localize to Jakarta time, then convert to UTC
-                    start_date = jakarta_tz.localize(start_date).astimezone(pytz.UTC)
-            else:
-                # Basic date string without time/timezone - assume it's Jakarta time (UTC+7)
-                start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-                # Localize to Jakarta time, then convert to UTC
-                start_date = jakarta_tz.localize(start_date).astimezone(pytz.UTC)
-                
-            # Similar handling for end_date
-            if 'T' in end_date_str:
-                try:
-                    end_date = datetime.fromisoformat(end_date_str)
-                    if end_date.tzinfo is not None:
-                        end_date = end_date.astimezone(pytz.UTC)
-                except ValueError:
-                    # Parse date part and add time to include the entire day
-                    date_part = end_date_str.split('T')[0]
-                    end_date = datetime.strptime(f"{date_part} 23:59:59", "%Y-%m-%d %H:%M:%S")
-                    # Localize to Jakarta time, then convert to UTC
-                    end_date = jakarta_tz.localize(end_date).astimezone(pytz.UTC)
-            else:
-                # Add time to end_date to include the entire day (23:59:59)
-                end_date = datetime.strptime(f"{end_date_str} 23:59:59", "%Y-%m-%d %H:%M:%S")
-                # Localize to Jakarta time, then convert to UTC for database query
-                end_date = jakarta_tz.localize(end_date).astimezone(pytz.UTC)
-                
-            # Ensure start_date is before end_date
-            if start_date > end_date:
-                return 400, {"message": "start_date must be before end_date"}
-                
+            report_range = dates.resolve()
         except ValueError as e:
-            return 400, {"message": f"Invalid date format: {str(e)}"}
+            return 400, {"message": str(e)}
         
         # Get all transactions for the specific shop
-        transactions = Transaksi.objects.filter(
-            toko=shop,  # Use the shop from the URL parameter
-            is_deleted=False,
-            created_at__gte=start_date,
-            created_at__lte=end_date,
-        ).order_by("-created_at")
-        
-        # Format the dates back to the Jakarta time zone for the response
-        jakarta_start_date = start_date.astimezone(jakarta_tz).strftime("%Y-%m-%d")
-        jakarta_end_date = end_date.astimezone(jakarta_tz).strftime("%Y-%m-%d")
-        
-        return 200, {
-            "transactions": [TransaksiResponse.from_orm(t) for t in transactions],
-            "start_date": jakarta_start_date,
-            "end_date": jakarta_end_date,
-        }
+        transactions = queries.report_transactions(report_range, toko=shop)
+
+        export_format = request.GET.get("format")
+        if export_format:
+            if export_format not in EXPORT_FORMATS:
+                return 400, {"message": "format must be csv or xlsx"}
+            return export_response(
+                transactions, export_format, f"laporan_keuangan_toko_{shop_id}_{report_range.start_date}_{report_range.end_date}"
+            )
+
+        return 200, queries.report_payload(TransaksiResponse.from_queryset(transactions), report_range)
     except Exception as e:
         print(f"Error: {str(e)}")
         return 403, {"error": "Access denied"}
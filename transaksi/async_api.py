@@ -0,0 +1,143 @@
+from ninja import Query, Router
+
+from authentication.models import Toko
+from authentication.security import AsyncAuthBearer
+from core.cache import cached_per_toko
+from core.conditional import bpr_shop, conditional_per_toko
+from transaksi import queries
+from transaksi.aggregates import abucket_sums
+from transaksi.schemas import ReportRangeQuery, TransaksiResponse
+
+# Async variants of the dashboard and report reads in ``transaksi.api``,
+# mounted under ``/api/async/transaksi`` for ASGI (uvicorn) deployments.
+# Exports stay on the sync routes.
+#
+# Each handler awaits its reads one after another: they are single
+# aggregates or depend on each other (the BPR shop check decides whether the
+# report runs), and the async ORM sends every query through the same
+# thread-sensitive executor, so ``asyncio.gather`` would not overlap them.
+# What these routes buy is not blocking a worker while the database answers.
+router = Router(auth=AsyncAuthBearer())
+
+
+@router.get("/summary/monthly", response={200: dict, 400: dict, 404: dict})
+@conditional_per_toko()
+@cached_per_toko()
+async def get_monthly_summary(request, month: int = None, year: int = None):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    try:
+        rows, buckets = queries.monthly_summary_query(principal.toko_id, month, year)
+    except ValueError as e:
+        return 400, {"message": str(e)}
+
+    return 200, queries.monthly_summary_payload(await abucket_sums(rows, buckets, default=0))
+
+
+@router.get("/debt-summary", response={200: dict, 404: dict})
+@conditional_per_toko()
+@cached_per_toko()
+async def get_debt_summary(request):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    sums = await abucket_sums(queries.unpaid_transactions(principal.toko_id), queries.DEBT_BUCKETS)
+    return 200, queries.debt_summary_payload(sums)
+
+
+@router.get("/first-debt-date", response={200: dict, 404: dict})
+@conditional_per_toko()
+@cached_per_toko()
+async def get_first_debt_date(request):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    created_at = await queries.first_created_query(principal.toko_id, unpaid_only=True).afirst()
+    return 200, queries.first_date_payload(created_at)
+
+
+@router.get("/first-transaction-date", response={200: dict, 404: dict})
+@conditional_per_toko()
+@cached_per_toko()
+async def get_first_transaction_date(request):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    created_at = await queries.first_created_query(principal.toko_id).afirst()
+    return 200, queries.first_date_payload(created_at)
+
+
+@router.get("/debt-report-by-date", response={200: dict, 400: dict, 404: dict})
+@conditional_per_toko()
+async def get_debt_report_by_date(request, dates: Query[ReportRangeQuery]):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    try:
+        report_range = dates.resolve()
+    except ValueError as e:
+        return 400, {"message": str(e)}
+
+    transactions = queries.report_transactions(report_range, unpaid_only=True, toko_id=principal.toko_id)
+    return 200, queries.report_payload(await TransaksiResponse.afrom_queryset(transactions), report_range)
+
+
+@router.get("/financial-report-by-date", response={200: dict, 400: dict, 404: dict})
+@conditional_per_toko()
+async def get_financial_report_by_date(request, dates: Query[ReportRangeQuery]):
+    principal = request.auth
+
+    if not principal.toko_id:
+        return 404, {"message": "User doesn't have a toko"}
+
+    try:
+        report_range = dates.resolve()
+    except ValueError as e:
+        return 400, {"message": str(e)}
+
+    transactions = queries.report_transactions(report_range, toko_id=principal.toko_id)
+    return 200, queries.report_payload(await TransaksiResponse.afrom_queryset(transactions), report_range)
+
+
+async def _shop_report(request, shop_id, dates, unpaid_only):
+    if not request.auth.is_bpr:
+        return 403, {"error": "Only BPR users can access this endpoint"}
+
+    try:
+        report_range = dates.resolve()
+    except ValueError as e:
+        return 400, {"message": str(e)}
+
+    # Same answer as the sync routes give for a shop that doesn't exist
+    if not await Toko.objects.filter(id=shop_id).aexists():
+        return 403, {"error": "Access denied"}
+
+    transactions = await TransaksiResponse.afrom_queryset(
+        queries.report_transactions(report_range, unpaid_only=unpaid_only, toko_id=shop_id)
+    )
+    return 200, queries.report_payload(transactions, report_range)
+
+
+@router.get("/bpr/shop/{shop_id}/utang", response={200: dict, 400: dict, 403: dict, 404: dict})
+@conditional_per_toko(toko=bpr_shop)
+async def get_shop_debt_for_bpr(request, shop_id: int, dates: Query[ReportRangeQuery]):
+    """Get debt report for a specific shop for BPR users."""
+    return await _shop_report(request, shop_id, dates, unpaid_only=True)
+
+
+@router.get("/bpr/shop/{shop_id}/keuangan", response={200: dict, 400: dict, 403: dict, 404: dict})
+@conditional_per_toko(toko=bpr_shop)
+async def get_shop_financial_for_bpr(request, shop_id: int, dates: Query[ReportRangeQuery]):
+    """Get financial report for a specific shop for BPR users."""
+    return await _shop_report(request, shop_id, dates, unpaid_only=False)
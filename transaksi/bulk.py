@@ -0,0 +1,147 @@
+from django.db import transaction
+
+from authentication.services import invalidate_portfolio
+from core.cache import bump_toko_version
+from laporan import ledger, rollup
+from produk import catalog
+from transaksi.ids import insert_with_fresh_ids, new_transaksi_id
+from transaksi.models import Transaksi, TransaksiItem
+from transaksi.stock import (
+    STOCK_SIGNS,
+    STOK_TIDAK_CUKUP,
+    apply_stock_deltas,
+    lock_products,
+    missing_products_message,
+    quantity_deltas,
+)
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+
+
+def _result(index, row, status, transaksi_id=None, message=None):
+    return {
+        "index": index,
+        "idempotency_key": row.idempotency_key,
+        "status": status,
+        "id": transaksi_id,
+        "message": message,
+    }
+
+
+def import_transactions(toko_id, user_id, rows):
+    """
+    Record a batch of offline-queued transactions (``BulkTransaksiRow``) in
+    one DB transaction, in order, and return one result per row.
+
+    A row whose ``idempotency_key`` the toko already has (an earlier replay)
+    or that repeats a key of this batch is reported as ``duplicate`` with the
+    id recorded for it. A row referencing an unknown product or selling more
+    than the stock left after the rows before it is ``failed`` and skipped;
+    the others still go in. Every accepted row is written with set-based
+    statements: one ``bulk_create`` per table, one stock ``UPDATE``, one
+    rollup ``UPDATE`` per day touched and one ledger sync after commit.
+
+    Two batches racing on the same key make ``bulk_create`` raise
+    ``IntegrityError``; nothing is written and the client should retry.
+    """
+    results = [None] * len(rows)
+    recorded = dict(
+        Transaksi.objects.filter(toko_id=toko_id, idempotency_key__in={row.idempotency_key for row in rows})
+        .values_list("idempotency_key", "id")
+    )
+
+    first_index = {}
+    pending = []
+    for index, row in enumerate(rows):
+        if row.idempotency_key in recorded:
+            results[index] = _result(index, row, DUPLICATE, recorded[row.idempotency_key])
+        elif row.idempotency_key not in first_index:
+            first_index[row.idempotency_key] = index
+            pending.append((index, row))
+
+    with transaction.atomic():
+        product_ids = {
+            item.product_id for _, row in pending if STOCK_SIGNS.get(row.category) for item in row.items
+        }
+        # Catalog counter before the product rows, the lock order of every product write
+        versi = catalog.next_version(toko_id) if product_ids else None
+        products = lock_products(toko_id, product_ids, missing_ok=True)
+
+        # Stock as the rows before the current one left it
+        stock = {product_id: product.stok for product_id, product in products.items()}
+        accepted = []
+        for index, row in pending:
+            stock_sign = STOCK_SIGNS.get(row.category)
+            items = row.items if stock_sign else []
+            deltas = quantity_deltas(items, stock_sign) if items else {}
+
+            missing = deltas.keys() - products.keys()
+            if missing:
+                results[index] = _result(index, row, FAILED, message=missing_products_message(missing))
+                continue
+            short = [product_id for product_id, delta in deltas.items() if stock[product_id] + delta < 0]
+            if short:
+                message = STOK_TIDAK_CUKUP.format(nama=products[short[0]].nama)
+                results[index] = _result(index, row, FAILED, message=message)
+                continue
+
+            for product_id, delta in deltas.items():
+                stock[product_id] += delta
+            accepted.append((index, row, items))
+
+        transactions = [
+            Transaksi(
+                id=new_transaksi_id(Transaksi),
+                toko_id=toko_id,
+                created_by_id=user_id,
+                transaction_type=row.transaction_type,
+                category=row.category,
+                total_amount=row.total_amount,
+                total_modal=row.total_modal,
+                amount=row.amount,
+                status=row.status,
+                idempotency_key=row.idempotency_key,
+            )
+            for _, row, _ in accepted
+        ]
+        # bulk_create skips Transaksi's post_save receivers; their work follows
+        insert_with_fresh_ids(
+            Transaksi, transactions, lambda: Transaksi.objects.bulk_create(transactions, batch_size=500)
+        )
+        TransaksiItem.objects.bulk_create(
+            (
+                TransaksiItem(
+                    transaksi=transaksi,
+                    product=products[item.product_id],
+                    quantity=item.quantity,
+                    harga_jual_saat_transaksi=item.harga_jual_saat_transaksi,
+                    harga_modal_saat_transaksi=item.harga_modal_saat_transaksi,
+                )
+                for transaksi, (_, _, items) in zip(transactions, accepted)
+                for item in items
+            ),
+            batch_size=1000,
+        )
+        apply_stock_deltas(
+            products,
+            {product_id: stock[product_id] - product.stok for product_id, product in products.items()},
+            versi,
+        )
+        rollup.record_many(transactions)
+
+        ledger.schedule_many([transaksi.id for transaksi in transactions])
+        if transactions:
+            transaction.on_commit(invalidate_portfolio)
+            transaction.on_commit(lambda: bump_toko_version(toko_id))
+
+    for transaksi, (index, row, _) in zip(transactions, accepted):
+        results[index] = _result(index, row, CREATED, transaksi.id)
+    for index, row in enumerate(rows):
+        if results[index] is None:
+            # Repeats a key of this batch: same outcome as its first row
+            first = results[first_index[row.idempotency_key]]
+            status = DUPLICATE if first["status"] != FAILED else FAILED
+            results[index] = _result(index, row, status, first["id"], first["message"])
+    return results
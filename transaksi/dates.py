@@ -0,0 +1,65 @@
+from calendar import monthrange
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+JAKARTA = ZoneInfo("Asia/Jakarta")
+
+
+class ReportRange(NamedTuple):
+    start: datetime  # inclusive, UTC: midnight Jakarta time of the first day
+    end: datetime  # exclusive, UTC: midnight Jakarta time after the last day
+    start_date: str  # first and last day as YYYY-MM-DD, for the response
+    end_date: str
+
+
+def _jakarta_day(value):
+    """
+    The Jakarta calendar day of a ``YYYY-MM-DD`` or ISO-8601 timestamp string.
+
+    Timestamps with an offset are converted to Jakarta time first; naive
+    ones and unparseable ``...T...`` strings fall back to their date part.
+    """
+    try:
+        if "T" not in value:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            return date.fromisoformat(value.split("T")[0])
+        if moment.tzinfo is None:
+            return moment.date()
+        return moment.astimezone(JAKARTA).date()
+    except ValueError as e:
+        raise ValueError(f"Invalid date format: {e}")
+
+
+@lru_cache(maxsize=1024)
+def parse_report_range(start_value, end_value):
+    """
+    Half-open ``[start, end)`` UTC bounds covering whole Jakarta days.
+
+    Using the next midnight as an exclusive bound (instead of 23:59:59)
+    keeps sub-second timestamps at the end of the day and lets the
+    ``(toko, created_at)`` indexes serve the range directly. Raises
+    ``ValueError`` with a user-facing message.
+    """
+    first = _jakarta_day(start_value)
+    last = _jakarta_day(end_value)
+    if first > last:
+        raise ValueError("start_date must be before end_date")
+
+    return ReportRange(
+        start=datetime.combine(first, time.min, tzinfo=JAKARTA).astimezone(timezone.utc),
+        end=datetime.combine(last + timedelta(days=1), time.min, tzinfo=JAKARTA).astimezone(timezone.utc),
+        start_date=first.isoformat(),
+        end_date=last.isoformat(),
+    )
+
+
+def month_range(year, month):
+    """``parse_report_range`` bounds of a whole Jakarta calendar month."""
+    first = date(year, month, 1)
+    last = date(year, month, monthrange(year, month)[1])
+    return parse_report_range(first.isoformat(), last.isoformat())
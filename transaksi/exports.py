@@ -0,0 +1,34 @@
+from core.exports import stream_csv, stream_xlsx
+from transaksi.dates import JAKARTA
+
+EXPORT_FORMATS = ("csv", "xlsx")
+
+# Rows fetched per round trip; on Postgres this is a server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    ("id", "ID Transaksi"),
+    ("created_at", "Tanggal"),
+    ("transaction_type", "Jenis"),
+    ("category", "Kategori"),
+    ("status", "Status"),
+    ("total_amount", "Total"),
+    ("total_modal", "Total Modal"),
+    ("amount", "Jumlah"),
+]
+
+def export_rows(transactions):
+    """Header plus one row per transaction, read in chunks without building model instances."""
+    yield [label for _, label in EXPORT_COLUMNS]
+    rows = transactions.values_list(*(field for field, _ in EXPORT_COLUMNS)).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+    for transaksi_id, created_at, *rest in rows:
+        yield [transaksi_id, created_at.astimezone(JAKARTA).strftime("%Y-%m-%d %H:%M"), *rest]
+
+
+def export_response(transactions, export_format, name):
+    """Streaming CSV or XLSX download; nothing is queried until the client starts reading."""
+    if export_format == "xlsx":
+        return stream_xlsx(export_rows(transactions), f"{name}.xlsx", sheet_name="Transaksi")
+    return stream_csv(export_rows(transactions), f"{name}.csv")
@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.module_loading import import_string
+
+# Crockford base32: no I/L/O/U, and ASCII order matches numeric order,
+# so fixed-width IDs sort the same way they were generated.
+CROCKFORD32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+# 2025-01-01T00:00:00Z; 40 bits of milliseconds from here lasts until 2059
+EPOCH_MS = 1735689600000
+
+TIMESTAMP_BITS = 40
+NODE_BITS = 4
+SEQUENCE_BITS = 6
+ID_LENGTH = 10  # (40 + 4 + 6) bits / 5 bits per character
+
+NODE_MASK = (1 << NODE_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+# Inserts tried with fresh IDs before a collision is given up on
+INSERT_ATTEMPTS = 3
+
+
+def encode_base32(value, length=ID_LENGTH):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(CROCKFORD32[digit])
+    return "".join(reversed(chars))
+
+
+class TimeOrderedIdGenerator:
+    """
+    10-character, time-ordered IDs that need no uniqueness probe.
+
+    Layout (50 bits, Crockford base32): milliseconds since ``EPOCH_MS`` |
+    node id | per-millisecond sequence. IDs from one generator are strictly
+    increasing; when the sequence runs out within a millisecond the generator
+    borrows the next millisecond instead of waiting, and a clock that steps
+    backwards is treated as the last millisecond seen. Distinct processes are
+    kept apart by the node id (``TRANSAKSI_ID_NODE``, otherwise random per
+    process; pids repeat across containers) and the random sequence start,
+    but with 16 nodes two processes can still meet: ``insert_with_fresh_ids``
+    retries the rare collision.
+    """
+
+    probes = 0
+
+    def __init__(self, node=None):
+        if node is None:
+            node = getattr(settings, "TRANSAKSI_ID_NODE", None)
+        if node is None:
+            node = random.SystemRandom().getrandbits(NODE_BITS)
+        self.node = int(node) & NODE_MASK
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _now_ms(self):
+        return time.time_ns() // 1_000_000 - EPOCH_MS
+
+    def __call__(self, model=None):
+        with self._lock:
+            now = self._now_ms()
+            if now > self._last_ms:
+                self._last_ms = now
+                # Random start in the lower half keeps same-node processes apart
+                # without eating most of the millisecond's sequence space.
+                self._sequence = random.getrandbits(SEQUENCE_BITS - 1)
+            else:
+                self._sequence += 1
+                if self._sequence > SEQUENCE_MASK:
+                    self._last_ms += 1
+                    self._sequence = 0
+            value = (
+                (self._last_ms << (NODE_BITS + SEQUENCE_BITS))
+                | (self.node << SEQUENCE_BITS)
+                | self._sequence
+            )
+        return encode_base32(value)
+
+
+class RandomHexIdGenerator:
+    """
+    The original scheme: 6 random hex characters, probing the table until unused.
+
+    Kept for comparison in ``benchmark_transaksi_ids``; every call costs at
+    least one ``exists()`` query, counted in ``probes``.
+    """
+
+    hex_chars = "0123456789ABCDEF"
+
+    def __init__(self):
+        self.probes = 0
+
+    def _random_id(self):
+        return "".join(random.choice(self.hex_chars) for _ in range(6))
+
+    def __call__(self, model):
+        candidate = self._random_id()
+        self.probes += 1
+        while model.objects.filter(id=candidate).exists():
+            candidate = self._random_id()
+            self.probes += 1
+        return candidate
+
+
+@lru_cache(maxsize=None)
+def get_id_generator():
+    """The generator configured by ``TRANSAKSI_ID_GENERATOR`` (one per process)."""
+    path = getattr(settings, "TRANSAKSI_ID_GENERATOR", "transaksi.ids.TimeOrderedIdGenerator")
+    return import_string(path)()
+
+
+def new_transaksi_id(model=None):
+    return get_id_generator()(model)
+
+
+def insert_with_fresh_ids(model, instances, insert):
+    """
+    Run ``insert()``, which writes ``instances`` with their generated IDs, in
+    a savepoint. If some of those IDs turn out to be taken (another process
+    generated them in the same millisecond), give them fresh ones and try
+    again; any other ``IntegrityError`` is re-raised.
+    """
+    for attempt in range(INSERT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return insert()
+        except IntegrityError:
+            taken = set(
+                model.objects.filter(id__in=[instance.id for instance in instances]).values_list("id", flat=True)
+            )
+            if not taken or attempt == INSERT_ATTEMPTS - 1:
+                raise
+            for instance in instances:
+                if instance.id in taken:
+                    instance.id = new_transaksi_id(model)
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-17 03:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_user_role'),
+        ('produk', '0004_satuan_toko_alter_satuan_nama_and_more'),
+        ('transaksi', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaksi',
+            index=models.Index(fields=['toko', 'is_deleted', '-created_at'], name='transaksi_toko_del_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaksi',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['toko', '-created_at'], name='transaksi_toko_aktif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaksi',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('status', 'Belum Lunas')), fields=['toko', 'transaction_type'], name='transaksi_belum_lunas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaksiitem',
+            index=models.Index(fields=['transaksi', 'product', 'quantity'], name='transaksiitem_produk_qty_idx'),
+        ),
+    ]
@@ -1,9 +1,9 @@
-import random
 from django.db import models
 from django.contrib.auth.models import User
 from produk.models import Produk
 from django.conf import settings
 from authentication.models import Toko
+from transaksi.ids import insert_with_fresh_ids, new_transaksi_id
 
 
 class Transaksi(models.Model):
@@ -25,20 +25,45 @@ class Transaksi(models.Model):
     is_deleted = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Client-generated key of offline-queued transactions (POST /transaksi/bulk)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
 
-    def save(self, *args, **kwargs):
-        if not self.id:
-            # Generate a unique hexadecimal ID
-            hex_chars = "0123456789ABCDEF"
-            random_id = "".join(random.choice(hex_chars) for _ in range(6))
-            self.id = random_id
+    class Meta:
+        constraints = [
+            # A replayed offline sale is recognised instead of recorded twice
+            models.UniqueConstraint(
+                fields=["toko", "idempotency_key"],
+                condition=models.Q(idempotency_key__isnull=False),
+                name="transaksi_toko_idempotency_uniq",
+            ),
+        ]
+        indexes = [
+            # Lists and reports: toko + is_deleted, newest first, optionally a created_at range
+            models.Index(fields=["toko", "is_deleted", "-created_at"], name="transaksi_toko_del_created_idx"),
+            # Same access path for live rows only; much smaller than the full index
+            models.Index(
+                fields=["toko", "-created_at"],
+                condition=models.Q(is_deleted=False),
+                name="transaksi_toko_aktif_idx",
+            ),
+            # Debt summary: unpaid, live rows of a toko, split by transaction_type
+            models.Index(
+                fields=["toko", "transaction_type"],
+                condition=models.Q(status="Belum Lunas", is_deleted=False),
+                name="transaksi_belum_lunas_idx",
+            ),
+        ]
 
-            # Ensure uniqueness
-            while Transaksi.objects.filter(id=self.id).exists():
-                random_id = "".join(random.choice(hex_chars) for _ in range(6))
-                self.id = f"#{random_id}"
+    def save(self, *args, **kwargs):
+        if self.id:
+            return super().save(*args, **kwargs)
 
-        super().save(*args, **kwargs)
+        # Time-ordered ID from the configured strategy; no uniqueness probe needed.
+        # A freshly generated ID is new, so skip Django's UPDATE-then-INSERT, and
+        # retry with another in the rare case a second process made the same one.
+        self.id = new_transaksi_id(Transaksi)
+        kwargs["force_insert"] = True
+        insert_with_fresh_ids(Transaksi, [self], lambda: super(Transaksi, self).save(*args, **kwargs))
 
     def __str__(self):
         return f"Transaksi #{self.id} - {self.transaction_type}: {self.category}"
@@ -56,5 +81,11 @@ class TransaksiItem(models.Model):
     harga_jual_saat_transaksi = models.DecimalField(max_digits=10, decimal_places=2)
     harga_modal_saat_transaksi = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Sales per product through the transaksi join, without touching the table
+            models.Index(fields=["transaksi", "product", "quantity"], name="transaksiitem_produk_qty_idx"),
+        ]
+
     def __str__(self):
         return f"Item #{self.id} - {self.product.nama} x {self.quantity}"
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Q
+
+from laporan import rollup
+from transaksi.models import Transaksi
+
+# Querysets and response shaping shared by the sync handlers in
+# ``transaksi.api`` and their async variants in ``transaksi.async_api``.
+
+DEBT_BUCKETS = {
+    "utang_saya": Q(transaction_type="pengeluaran"),
+    "utang_pelanggan": Q(transaction_type="pemasukan"),
+}
+
+
+def monthly_summary_query(toko_id, month=None, year=None):
+    """
+    ``(rollup rows, buckets)`` summing a month and the month before it.
+
+    Defaults to the current month; raises ``ValueError`` for a month
+    outside 1-12.
+    """
+    if month is None or year is None:
+        current_date = datetime.now()
+        year, month = current_date.year, current_date.month
+    if month < 1 or month > 12:
+        raise ValueError("Month must be between 1 and 12")
+
+    start_date = datetime(year, month, 1)
+    end_date = start_date + relativedelta(months=1)
+    prev_start_date = start_date - relativedelta(months=1)
+
+    # Current and previous month are summed together from the daily rollup
+    rows = rollup.rollup_range(toko_id, prev_start_date.date(), end_date.date() - timedelta(days=1))
+    buckets = {
+        "current_income": Q(tanggal__gte=start_date.date(), transaction_type="pemasukan"),
+        "prev_income": Q(tanggal__lt=start_date.date(), transaction_type="pemasukan"),
+        "current_expenses": Q(tanggal__gte=start_date.date(), transaction_type="pengeluaran"),
+        "prev_expenses": Q(tanggal__lt=start_date.date(), transaction_type="pengeluaran"),
+    }
+    return rows, buckets
+
+
+def monthly_summary_payload(sums):
+    current_income = sums["current_income"]
+    prev_income = sums["prev_income"]
+    current_expenses = sums["current_expenses"]
+    prev_expenses = sums["prev_expenses"]
+
+    # Calculate percentage changes
+    income_change = 0
+    if prev_income > 0:
+        income_change = round(((current_income - prev_income) / prev_income) * 100, 2)
+
+    expense_change = 0
+    if prev_expenses > 0:
+        expense_change = round(((current_expenses - prev_expenses) / prev_expenses) * 100, 2)
+
+    # Calculate net amount and determine status
+    net_amount = current_income - current_expenses
+    status = "untung" if net_amount >= 0 else "rugi"
+
+    return {
+        "pemasukan": {
+            "amount": current_income,
+            "change": income_change,
+        },
+        "pengeluaran": {
+            "amount": current_expenses,
+            "change": expense_change,
+        },
+        "status": status,
+        "amount": abs(net_amount),
+    }
+
+
+def unpaid_transactions(toko_id):
+    return Transaksi.objects.filter(toko_id=toko_id, status="Belum Lunas", is_deleted=False)
+
+
+def debt_summary_payload(sums):
+    return {
+        "utang_saya": float(sums["utang_saya"]),
+        "utang_pelanggan": float(sums["utang_pelanggan"]),
+    }
+
+
+def first_created_query(toko_id, unpaid_only=False):
+    """``created_at`` of the toko's earliest (unpaid) transaction, as a values queryset."""
+    transactions = Transaksi.objects.filter(toko_id=toko_id, is_deleted=False)
+    if unpaid_only:
+        transactions = transactions.filter(status="Belum Lunas")
+    return transactions.order_by("created_at").values_list("created_at", flat=True)
+
+
+def first_date_payload(created_at):
+    # Without transactions, today's date is the fallback
+    first_date = created_at or datetime.now()
+    return {"first_date": first_date.strftime("%Y-%m-%d")}
+
+
+def report_transactions(report_range, unpaid_only=False, **filters):
+    """Transactions of a by-date report, newest first; ``filters`` pick the toko."""
+    transactions = Transaksi.objects.filter(
+        is_deleted=False,
+        created_at__gte=report_range.start,
+        created_at__lt=report_range.end,
+        **filters,
+    )
+    if unpaid_only:
+        transactions = transactions.filter(status="Belum Lunas")
+    return transactions.order_by("-created_at")
+
+
+def report_payload(transactions, report_range):
+    return {
+        "transactions": transactions,
+        "start_date": report_range.start_date,
+        "end_date": report_range.end_date,
+    }
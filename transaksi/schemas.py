@@ -2,6 +2,10 @@ from ninja import Schema
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field, field_validator
+from django.db.models import Prefetch, prefetch_related_objects
+from produk import images
+from transaksi.dates import parse_report_range
+from transaksi.models import TransaksiItem
 
 
 class TransaksiItemRequest(Schema):
@@ -39,11 +43,36 @@ class CreateTransaksiRequest(Schema):
         return v
 
 
+class BulkTransaksiRow(CreateTransaksiRequest):
+    # Generated by the client when the sale is queued; replays are recognised by it
+    idempotency_key: str = Field(min_length=1, max_length=64)
+
+
+class BulkTransaksiRequest(Schema):
+    transactions: List[BulkTransaksiRow]
+
+
+class BulkTransaksiResult(Schema):
+    index: int
+    idempotency_key: str
+    status: str
+    id: Optional[str] = None
+    message: Optional[str] = None
+
+
+class BulkTransaksiResponse(Schema):
+    created: int
+    duplicates: int
+    failed: int
+    results: List[BulkTransaksiResult]
+
+
 class TransaksiItemResponse(Schema):
     id: int
     product_id: int
     product_name: str
     product_image_url: Optional[str]
+    product_thumbnail_url: Optional[str] = None
     quantity: int
     harga_jual_saat_transaksi: float
     harga_modal_saat_transaksi: float
@@ -53,9 +82,10 @@ class TransaksiItemResponse(Schema):
     def from_orm(cls, item):
         return cls(
             id=item.id,
-            product_id=item.product.id,
+            product_id=item.product_id,
             product_name=item.product.nama,
             product_image_url=item.product.foto.url if item.product.foto else None,
+            product_thumbnail_url=images.thumbnail_url(item.product),
             quantity=float(item.quantity),
             harga_jual_saat_transaksi=float(item.harga_jual_saat_transaksi),
             harga_modal_saat_transaksi=float(item.harga_modal_saat_transaksi),
@@ -92,10 +122,48 @@ class TransaksiResponse(Schema):
             created_at=transaksi.created_at,
         )
 
+    @classmethod
+    def from_queryset(cls, queryset):
+        """
+        Serialize many transactions with items and products loaded in one extra query.
+
+        Accepts a queryset or an already fetched list (e.g. a keyset page).
+        """
+        transactions = list(queryset)
+        prefetch_related_objects(
+            transactions, Prefetch("items", queryset=TransaksiItem.objects.select_related("product"))
+        )
+        return [cls.from_orm(transaksi) for transaksi in transactions]
+
+    @classmethod
+    async def afrom_queryset(cls, queryset):
+        """``from_queryset`` for async handlers; ``queryset`` must be a queryset."""
+        transactions = [
+            transaksi
+            async for transaksi in queryset.prefetch_related(
+                Prefetch("items", queryset=TransaksiItem.objects.select_related("product"))
+            )
+        ]
+        return [cls.from_orm(transaksi) for transaksi in transactions]
+
 
 class PaginatedTransaksiResponse(Schema):
     items: List[TransaksiResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class ReportRangeQuery(Schema):
+    """``start_date``/``end_date`` query parameters of the by-date report endpoints."""
+
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+    def resolve(self):
+        """The parsed ``ReportRange``; raises ``ValueError`` with a message for a 400 response."""
+        if not self.start_date or not self.end_date:
+            raise ValueError("Both start_date and end_date parameters are required")
+        return parse_report_range(self.start_date, self.end_date)
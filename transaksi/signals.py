@@ -1,46 +1,28 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.utils.timezone import localtime
 from .models import Transaksi
-from laporan.models import ArusKasReport, DetailArusKas
-from decimal import Decimal
+from authentication.services import invalidate_portfolio
+from core.cache import bump_toko_version
+from laporan import ledger
 
 
 @receiver(post_save, sender=Transaksi)
 def handle_transaksi_Lunas(sender, instance, created, **kwargs):
-    if instance.status != "Lunas":
-        return
+    # The ledger writer runs after commit and is idempotent per transaksi id, so
+    # status toggles, soft deletes and repeated saves never duplicate entries.
+    ledger.schedule(instance.id)
 
-    waktu = localtime(instance.created_at)
-    bulan = waktu.month
-    tahun = waktu.year
 
-    report, _ = ArusKasReport.objects.get_or_create(
-        toko=instance.toko,
-        bulan=bulan,
-        tahun=tahun,
-        defaults={"total_inflow": 0, "total_outflow": 0, "saldo": 0},
-    )
-
-    if instance.transaction_type.lower() in ["pemasukan"]:
-        jenis = "inflow"
-    else:
-        jenis = "outflow"
-
-    DetailArusKas.objects.create(
-        report=report,
-        transaksi=instance,
-        jenis=jenis,
-        nominal=instance.amount,
-        kategori=instance.category,
-        tanggal_transaksi=instance.created_at,
-        keterangan=f"Transaksi {instance.category}",
-    )
+@receiver(post_save, sender=Transaksi)
+@receiver(post_delete, sender=Transaksi)
+def invalidate_bpr_portfolio(sender, instance, **kwargs):
+    # Revenue, debt and last activity all derive from transactions
+    transaction.on_commit(invalidate_portfolio)
 
-    if jenis == "inflow":
-        report.total_inflow += Decimal(str(instance.amount))
-    else:
-        report.total_outflow += Decimal(str(instance.amount))
 
-    report.saldo = report.total_inflow - report.total_outflow
-    report.save()
+@receiver(post_save, sender=Transaksi)
+@receiver(post_delete, sender=Transaksi)
+def bump_toko_cache_version(sender, instance, **kwargs):
+    # After commit, so items and stock updates written with the transaction are visible
+    transaction.on_commit(lambda: bump_toko_version(instance.toko_id))
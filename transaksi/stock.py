@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from produk.models import Produk
+
+STOK_TIDAK_CUKUP = "Stok tidak cukup untuk produk {nama}"
+
+# Product sales take stock out, stock purchases put it back in
+STOCK_SIGNS = {"Penjualan Barang": -1, "Pembelian Stok": 1}
+
+
+def missing_products_message(missing):
+    return f"Produk tidak ditemukan: {', '.join(map(str, sorted(missing)))}"
+
+
+def lock_products(toko_id, product_ids, missing_ok=False):
+    """
+    Fetch and row-lock every referenced product of a toko in one query.
+
+    Must run inside ``transaction.atomic``, after ``catalog.next_version``:
+    every product write takes the toko's catalog counter first and then the
+    product rows in id order, so two writers never wait on each other.
+    Raises ``ValueError`` when a product does not exist or belongs to
+    another toko, unless ``missing_ok`` (then those ids are simply absent
+    from the result).
+    """
+    products = (
+        Produk.objects.select_for_update()
+        .filter(toko_id=toko_id, id__in=set(product_ids))
+        .order_by("id")
+        .in_bulk()
+    )
+    missing = set(product_ids) - products.keys()
+    if missing and not missing_ok:
+        raise ValueError(missing_products_message(missing))
+    return products
+
+
+def quantity_deltas(items, sign):
+    """Net stock change per product id, merging repeated lines of one product."""
+    deltas = defaultdict(int)
+    for item in items:
+        deltas[item.product_id] += sign * item.quantity
+    return dict(deltas)
+
+
+def apply_stock_deltas(products, deltas, versi, error=STOK_TIDAK_CUKUP):
+    """
+    Apply every stock change with a single ``UPDATE ... SET stok = stok + CASE``,
+    stamping the changed products with catalog version ``versi``.
+
+    ``products`` are the rows returned by ``lock_products`` and ``versi``
+    the ``catalog.next_version`` taken before them. Decrements are
+    guarded in the ``WHERE`` clause as well, so a concurrent writer that got
+    past the locks (e.g. on SQLite, where ``select_for_update`` is a no-op)
+    can never drive stock negative; in that case ``ValueError`` is raised and
+    the caller's atomic block rolls back.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    for product_id, delta in deltas.items():
+        if products[product_id].stok + delta < 0:
+            raise ValueError(error.format(nama=products[product_id].nama))
+
+    guard = Q()
+    for product_id, delta in deltas.items():
+        guard |= Q(id=product_id, stok__gte=-delta) if delta < 0 else Q(id=product_id)
+
+    updated = Produk.objects.filter(guard).update(
+        versi=versi,
+        stok=F("stok")
+        + Case(
+            *(When(id=product_id, then=Value(delta)) for product_id, delta in deltas.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+    if updated != len(deltas):
+        raise ValueError("Stok berubah saat transaksi diproses, silakan coba lagi")
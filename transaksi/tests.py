@@ -0,0 +1,800 @@
+import tracemalloc
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from ninja.testing import TestClient
+
+from authentication.models import Toko, User
+from core.testing import TokoTestCase, TokoTestMixin, auth_headers
+from produk.models import Produk
+from laporan import ledger, rollup
+from laporan.models import ArusKasReport, DetailArusKas, TransaksiHarian
+from transaksi import bulk
+from transaksi.aggregates import bucket_sums
+from transaksi.api import router
+from transaksi.dates import month_range, parse_report_range
+from transaksi.exports import export_response
+from transaksi.ids import TimeOrderedIdGenerator
+from transaksi.models import Transaksi, TransaksiItem
+from transaksi.schemas import BulkTransaksiRow, TransaksiResponse
+
+
+@override_settings(AUTH_PRINCIPAL_CACHE_TIMEOUT=60)
+class TransaksiQueryCountTests(TokoTestCase):
+    """Serializing a report must not issue queries per transaction or per item."""
+
+    router = router
+
+    def setUp(self):
+        # Principals are cached, so only the endpoint's own queries are counted
+        super().setUp()
+        self.bpr = self.create_bpr()
+        self.products = [self.create_product(f"Produk {i}", stok=100) for i in range(3)]
+
+    def _seed(self, count):
+        transactions = Transaksi.objects.bulk_create(
+            Transaksi(
+                id=f"Q{i:05d}",
+                toko=self.toko,
+                created_by=self.owner,
+                transaction_type="pemasukan",
+                category="Penjualan Barang",
+                total_amount=Decimal("4500"),
+                total_modal=Decimal("3000"),
+                amount=Decimal("4500"),
+                status="Lunas" if i % 2 else "Belum Lunas",
+            )
+            for i in range(count)
+        )
+        TransaksiItem.objects.bulk_create(
+            TransaksiItem(
+                transaksi=transaksi,
+                product=product,
+                quantity=1,
+                harga_jual_saat_transaksi=Decimal("1500"),
+                harga_modal_saat_transaksi=Decimal("1000"),
+            )
+            for transaksi in transactions
+            for product in self.products
+        )
+
+    def _date_params(self):
+        created_at = Transaksi.objects.first().created_at
+        today = created_at.astimezone(ZoneInfo("Asia/Jakarta")).date().isoformat()
+        return f"start_date={today}&end_date={today}"
+
+    def test_transaksi_list_query_count(self):
+        self._seed(500)
+        with self.assertNumQueries(3):
+            response = self.client.get("?per_page=500", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 500)
+        self.assertEqual(len(response.json()["items"][0]["items"]), 3)
+
+    def test_financial_report_query_count(self):
+        self._seed(500)
+        params = self._date_params()
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/financial-report-by-date?{params}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["transactions"]), 500)
+
+    def test_debt_report_query_count(self):
+        self._seed(500)
+        params = self._date_params()
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/debt-report-by-date?{params}", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["transactions"]), 250)
+
+    def test_bpr_keuangan_query_count(self):
+        self._seed(500)
+        params = self._date_params()
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                f"/bpr/shop/{self.toko.id}/keuangan?{params}", headers=auth_headers(self.bpr)
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["transactions"]), 500)
+
+
+@override_settings(AUTH_PRINCIPAL_CACHE_TIMEOUT=60)
+class AggregateQueryCountTests(TokoTestCase):
+    """Summary endpoints compute every bucket in a single aggregate query."""
+
+    router = router
+
+    def setUp(self):
+        super().setUp()
+        rows = [
+            ("pemasukan", "Penjualan Barang", "Lunas", Decimal("1000")),
+            ("pemasukan", "Pendapatan Lain-Lain", "Lunas", Decimal("250")),
+            ("pemasukan", "Penjualan Barang", "Belum Lunas", Decimal("400")),
+            ("pengeluaran", "Biaya Operasional", "Lunas", Decimal("300")),
+            ("pengeluaran", "Pembelian Stok", "Belum Lunas", Decimal("150")),
+        ]
+        Transaksi.objects.bulk_create(
+            Transaksi(
+                id=f"A{i:05d}",
+                toko=self.toko,
+                created_by=self.owner,
+                transaction_type=transaction_type,
+                category=category,
+                total_amount=total,
+                amount=total,
+                status=status,
+            )
+            for i, (transaction_type, category, status, total) in enumerate(rows)
+        )
+        rollup.rebuild(self.toko.id)
+
+    def test_bucket_sums_defaults_empty_buckets(self):
+        sums = bucket_sums(
+            Transaksi.objects.filter(toko=self.toko),
+            {
+                "Penjualan Barang": Q(category="Penjualan Barang"),
+                "missing": Q(category="Pendapatan Pinjaman"),
+            },
+        )
+        self.assertEqual(sums, {"Penjualan Barang": Decimal("1400"), "missing": Decimal("0")})
+
+    def test_monthly_summary_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/summary/monthly", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(Decimal(data["pemasukan"]["amount"]), Decimal("1650"))
+        self.assertEqual(Decimal(data["pengeluaran"]["amount"]), Decimal("450"))
+        self.assertEqual(data["status"], "untung")
+
+    def test_debt_summary_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/debt-summary", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"utang_saya": 150.0, "utang_pelanggan": 400.0})
+
+    def test_income_statement_aggregate_single_query(self):
+        from laporan.api import _aggregate
+
+        today = timezone.now().date()
+        with self.assertNumQueries(1):
+            income, expenses, net = _aggregate(self.toko, today, today)
+        self.assertEqual(
+            {line.name: line.total for line in income}["Penjualan Barang"], Decimal("1000")
+        )
+        self.assertEqual(len(expenses), 3)
+        self.assertEqual(net, Decimal("950"))
+
+
+class TransaksiHarianRollupTests(TokoTestCase):
+    """The daily rollup follows the create, toggle and delete paths."""
+
+    router = router
+
+    def _create(self, transaction_type, category, amount, status="Lunas"):
+        response = self.client.post(
+            "",
+            json={
+                "transaction_type": transaction_type,
+                "category": category,
+                "total_amount": amount,
+                "amount": amount,
+                "status": status,
+            },
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["id"]
+
+    def test_create_toggle_delete_keep_rollup_consistent(self):
+        self._create("pemasukan", "Pendapatan Lain-Lain", 500)
+        debt_id = self._create("pengeluaran", "Biaya Operasional", 200, status="Belum Lunas")
+        self.assertEqual(rollup.check(self.toko.id), [])
+
+        self.client.patch(f"/{debt_id}/toggle-payment-status", headers=self.headers)
+        self.assertEqual(rollup.check(self.toko.id), [])
+        lunas = TransaksiHarian.objects.get(toko=self.toko, category="Biaya Operasional", status="Lunas")
+        self.assertEqual(lunas.total_amount, Decimal("200"))
+
+        self.client.delete(f"/{debt_id}", headers=self.headers)
+        self.assertEqual(rollup.check(self.toko.id), [])
+
+        summary = self.client.get("/summary/monthly", headers=self.headers).json()
+        self.assertEqual(Decimal(summary["pemasukan"]["amount"]), Decimal("500"))
+        self.assertEqual(Decimal(summary["pengeluaran"]["amount"]), Decimal("0"))
+
+    def test_check_reports_drift_and_rebuild_fixes_it(self):
+        self._create("pemasukan", "Pendapatan Lain-Lain", 500)
+        TransaksiHarian.objects.filter(toko=self.toko).update(total_amount=Decimal("1"))
+
+        self.assertEqual(len(rollup.check(self.toko.id)), 1)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_transaksi_harian", "--check", "--toko", str(self.toko.id), stdout=StringIO())
+
+        call_command("rebuild_transaksi_harian", "--toko", str(self.toko.id), stdout=StringIO())
+        self.assertEqual(rollup.check(self.toko.id), [])
+
+
+class StockUpdateTests(TokoTestCase):
+    """Sales and purchases move stock with one locked fetch and one UPDATE."""
+
+    router = router
+
+    def setUp(self):
+        super().setUp()
+        self.products = [self.create_product(f"Produk {i}") for i in range(3)]
+
+    def _payload(self, category, quantities):
+        return {
+            "transaction_type": "pemasukan" if category == "Penjualan Barang" else "pengeluaran",
+            "category": category,
+            "total_amount": 1500 * sum(quantities.values()),
+            "amount": 1500 * sum(quantities.values()),
+            "items": [
+                {
+                    "product_id": product.id,
+                    "quantity": quantity,
+                    "harga_jual_saat_transaksi": 1500,
+                    "harga_modal_saat_transaksi": 1000,
+                }
+                for product, quantity in quantities.items()
+            ],
+        }
+
+    def _stok(self):
+        return [p.stok for p in Produk.objects.filter(toko=self.toko).order_by("id")]
+
+    def test_sale_decrements_every_product_with_a_single_update(self):
+        payload = self._payload("Penjualan Barang", {p: i + 1 for i, p in enumerate(self.products)})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("", json=payload, headers=self.headers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()["items"]), 3)
+        self.assertEqual(self._stok(), [9, 8, 7])
+        produk_updates = [
+            q["sql"] for q in queries.captured_queries
+            if q["sql"].startswith('UPDATE "produk_produk"')
+        ]
+        self.assertEqual(len(produk_updates), 1)
+
+    def test_oversell_rolls_back_the_whole_sale(self):
+        payload = self._payload("Penjualan Barang", {self.products[0]: 2, self.products[1]: 11})
+        response = self.client.post("", json=payload, headers=self.headers)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["message"], "Stok tidak cukup untuk produk Produk 1")
+        self.assertEqual(self._stok(), [10, 10, 10])
+        self.assertFalse(Transaksi.objects.exists())
+
+    def test_unknown_product_is_rejected(self):
+        payload = self._payload("Penjualan Barang", {self.products[0]: 1})
+        payload["items"][0]["product_id"] = 999999
+        response = self.client.post("", json=payload, headers=self.headers)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Transaksi.objects.exists())
+
+    def test_purchase_then_delete_restores_stock(self):
+        payload = self._payload("Pembelian Stok", {self.products[0]: 5})
+        transaksi_id = self.client.post("", json=payload, headers=self.headers).json()["id"]
+        self.assertEqual(self._stok(), [15, 10, 10])
+
+        self.assertEqual(self.client.delete(f"/{transaksi_id}", headers=self.headers).status_code, 200)
+        self.assertEqual(self._stok(), [10, 10, 10])
+        # A second delete must not move stock again
+        self.assertEqual(self.client.delete(f"/{transaksi_id}", headers=self.headers).status_code, 404)
+        self.assertEqual(self._stok(), [10, 10, 10])
+
+
+class BulkTransaksiTests(TokoTestCase):
+    """Offline-queued sales replayed in one request, idempotently."""
+
+    router = router
+
+    def setUp(self):
+        super().setUp()
+        self.products = [self.create_product(f"Produk {i}") for i in range(2)]
+
+    def _row(self, key, category, quantities):
+        total = 1500 * sum(quantities.values())
+        return {
+            "idempotency_key": key,
+            "transaction_type": "pemasukan" if category == "Penjualan Barang" else "pengeluaran",
+            "category": category,
+            "total_amount": total,
+            "amount": total,
+            "items": [
+                {"product_id": product_id, "quantity": quantity, "harga_jual_saat_transaksi": 1500,
+                 "harga_modal_saat_transaksi": 1000}
+                for product_id, quantity in quantities.items()
+            ],
+        }
+
+    def _stok(self):
+        return [p.stok for p in Produk.objects.filter(toko=self.toko).order_by("id")]
+
+    def _post(self, rows):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/bulk", json={"transactions": rows}, headers=self.headers)
+
+    def test_rows_are_applied_in_order(self):
+        first, second = self.products[0].id, self.products[1].id
+        rows = [
+            self._row("a", "Penjualan Barang", {first: 4}),
+            self._row("b", "Penjualan Barang", {first: 7}),  # only 6 left after "a"
+            self._row("c", "Pembelian Stok", {second: 5}),
+            self._row("d", "Penjualan Barang", {999999: 1}),
+            self._row("a", "Penjualan Barang", {first: 4}),  # queued twice on the device
+        ]
+        response = self._post(rows)
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["created"], body["duplicates"], body["failed"]), (2, 1, 2))
+        results = body["results"]
+        self.assertEqual([r["status"] for r in results], ["created", "failed", "created", "failed", "duplicate"])
+        self.assertEqual(results[1]["message"], "Stok tidak cukup untuk produk Produk 0")
+        self.assertEqual(results[3]["message"], "Produk tidak ditemukan: 999999")
+        self.assertEqual(results[4]["id"], results[0]["id"])
+
+        self.assertEqual(self._stok(), [6, 15])
+        self.assertEqual(Transaksi.objects.count(), 2)
+        self.assertEqual(TransaksiItem.objects.count(), 2)
+        self.assertEqual(rollup.check(self.toko.id), [])
+        self.assertEqual(DetailArusKas.objects.count(), 2)
+
+    def test_replay_records_nothing_twice(self):
+        rows = [self._row(f"k{i}", "Penjualan Barang", {self.products[0].id: 1}) for i in range(3)]
+        first = self._post(rows).json()
+        replay = self._post(rows).json()
+
+        self.assertEqual((replay["created"], replay["duplicates"]), (0, 3))
+        self.assertEqual([r["id"] for r in replay["results"]], [r["id"] for r in first["results"]])
+        self.assertEqual(self._stok(), [7, 10])
+        self.assertEqual(Transaksi.objects.count(), 3)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def queries_for(count, prefix):
+            rows = [self._row(f"{prefix}{i}", "Penjualan Barang", {self.products[i % 2].id: 1}) for i in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self._post(rows).json()["created"], count)
+            return len(queries)
+
+        self.assertEqual(queries_for(2, "small"), queries_for(8, "large"))
+
+    def test_batch_size_is_capped(self):
+        rows = [self._row(f"k{i}", "Pembelian Stok", {self.products[0].id: 1}) for i in range(3)]
+        with self.settings(TRANSAKSI_BULK_MAX_ROWS=2):
+            response = self.client.post("/bulk", json={"transactions": rows}, headers=self.headers)
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Transaksi.objects.exists())
+
+
+class ConcurrentSaleTests(TokoTestMixin, TransactionTestCase):
+    """Parallel cashiers selling the same product can never oversell it."""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product("Produk Laris")
+
+    def _sell(self, quantity):
+        try:
+            response = TestClient(router).post(
+                "",
+                json={
+                    "transaction_type": "pemasukan",
+                    "category": "Penjualan Barang",
+                    "total_amount": 1500 * quantity,
+                    "amount": 1500 * quantity,
+                    "items": [
+                        {
+                            "product_id": self.product.id,
+                            "quantity": quantity,
+                            "harga_jual_saat_transaksi": 1500,
+                            "harga_modal_saat_transaksi": 1000,
+                        }
+                    ],
+                },
+                headers=self.headers,
+            )
+            return response.status_code
+        finally:
+            connection.close()
+
+    def test_parallel_sales_never_drive_stock_negative(self):
+        # The test database is shared-cache in-memory SQLite, whose table locks
+        # don't wait; keep the post-commit ledger sync from racing the next sale
+        with patch("laporan.ledger.schedule"), ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(self._sell, [3] * 16))
+
+        self.product.refresh_from_db()
+        sold = statuses.count(201) * 3
+        self.assertGreater(sold, 0)
+        self.assertGreaterEqual(self.product.stok, 0)
+        self.assertLessEqual(sold, 10)
+        self.assertEqual(self.product.stok, 10 - sold)
+        self.assertEqual(
+            Transaksi.objects.filter(toko=self.toko, is_deleted=False).count(), statuses.count(201)
+        )
+
+
+    def _edit_price(self, price):
+        try:
+            produk = Produk.objects.get(id=self.product.id)
+            produk.harga_jual = price
+            produk.save(update_fields=["harga_jual", "versi"])
+            return "saved"
+        except OperationalError as e:
+            # Shared-cache SQLite refuses a locked table instead of waiting
+            if "locked" not in str(e):
+                raise
+            return "locked"
+        finally:
+            connection.close()
+
+    def test_sales_lock_the_catalog_counter_before_the_products(self):
+        # Produk.save locks KatalogVersi (pre_save) before the product row; a
+        # sale taking them the other way round deadlocks against it
+        with patch("laporan.ledger.schedule"), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._sell(1), 201)
+        statements = [query["sql"] for query in queries]
+        counter = next(i for i, sql in enumerate(statements) if "produk_katalogversi" in sql and sql.startswith("UPDATE"))
+        product = next(i for i, sql in enumerate(statements) if 'FROM "produk_produk"' in sql)
+        self.assertLess(counter, product)
+
+    def test_sale_and_product_edit_of_the_same_product_both_finish(self):
+        with patch("laporan.ledger.schedule"), ThreadPoolExecutor(max_workers=8) as pool:
+            sales = [pool.submit(self._sell, 1) for _ in range(6)]
+            edits = [pool.submit(self._edit_price, 1500 + i) for i in range(6)]
+            statuses = [future.result(timeout=30) for future in sales]
+            outcomes = [future.result(timeout=30) for future in edits]
+
+        self.assertTrue(set(outcomes) <= {"saved", "locked"})
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stok, 10 - statuses.count(201))
+
+
+class TransaksiIdTests(TestCase):
+    def test_ids_are_fixed_width_and_strictly_increasing(self):
+        generator = TimeOrderedIdGenerator(node=3)
+        ids = [generator() for _ in range(20000)]
+
+        self.assertTrue(all(len(transaksi_id) == 10 for transaksi_id in ids))
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_sequence_overflow_borrows_next_millisecond(self):
+        generator = TimeOrderedIdGenerator(node=0)
+        with patch.object(generator, "_now_ms", return_value=1000):
+            ids = [generator() for _ in range(200)]
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertGreater(generator._last_ms, 1000)
+
+    def test_clock_going_backwards_stays_monotonic(self):
+        generator = TimeOrderedIdGenerator(node=0)
+        with patch.object(generator, "_now_ms", return_value=5000):
+            first = generator()
+        with patch.object(generator, "_now_ms", return_value=4000):
+            second = generator()
+        self.assertGreater(second, first)
+
+    def test_nodes_do_not_collide_in_the_same_millisecond(self):
+        a, b = TimeOrderedIdGenerator(node=1), TimeOrderedIdGenerator(node=2)
+        with patch.object(a, "_now_ms", return_value=7000), patch.object(b, "_now_ms", return_value=7000):
+            ids_a = {a() for _ in range(32)}
+            ids_b = {b() for _ in range(32)}
+        self.assertFalse(ids_a & ids_b)
+
+    def test_save_inserts_without_probe(self):
+        toko = Toko.objects.create()
+        user = User.objects.create_user(username="owner", email="owner@example.com", password="password", toko=toko)
+
+        # The INSERT and its savepoint
+        with self.assertNumQueries(3):
+            transaksi = Transaksi(
+                toko=toko,
+                created_by=user,
+                transaction_type="pengeluaran",
+                category="Biaya Operasional",
+                total_amount=Decimal("100"),
+                amount=Decimal("100"),
+                status="Belum Lunas",
+            )
+            transaksi.save()
+        self.assertEqual(len(transaksi.id), 10)
+        self.assertNotIn("#", transaksi.id)
+
+    def _transaksi(self, toko, user, **fields):
+        return Transaksi(
+            toko=toko, created_by=user, transaction_type="pengeluaran", category="Biaya Operasional",
+            total_amount=Decimal("100"), amount=Decimal("100"), **fields,
+        )
+
+    def test_colliding_id_is_retried(self):
+        toko = Toko.objects.create()
+        user = User.objects.create_user(username="owner", email="owner@example.com", password="password", toko=toko)
+        taken = self._transaksi(toko, user)
+        taken.save()
+
+        # Another process generated the same ID in the same millisecond
+        with patch("transaksi.models.new_transaksi_id", return_value=taken.id):
+            transaksi = self._transaksi(toko, user)
+            transaksi.save()
+        self.assertNotEqual(transaksi.id, taken.id)
+        self.assertEqual(Transaksi.objects.count(), 2)
+
+        rows = [
+            BulkTransaksiRow(
+                idempotency_key=f"k{number}", transaction_type="pengeluaran", category="Biaya Operasional",
+                total_amount=100, amount=100,
+            )
+            for number in range(2)
+        ]
+        with patch("transaksi.bulk.new_transaksi_id", side_effect=[taken.id, "ZZZZZZZZZ1"]):
+            results = bulk.import_transactions(toko.id, user.id, rows)
+        self.assertEqual([result["status"] for result in results], [bulk.CREATED, bulk.CREATED])
+        self.assertNotIn(taken.id, [result["id"] for result in results])
+        self.assertEqual(Transaksi.objects.count(), 4)
+
+    def test_other_integrity_errors_are_raised(self):
+        toko = Toko.objects.create()
+        user = User.objects.create_user(username="owner", email="owner@example.com", password="password", toko=toko)
+        with self.assertRaises(IntegrityError):
+            self._transaksi(toko, user, status=None).save()
+
+
+class ArusKasLedgerTests(TokoTestCase):
+    """The post_save ledger writer is deferred to commit and idempotent per transaksi."""
+
+    router = router
+
+    def _create(self, transaction_type, amount, status="Lunas"):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "",
+                json={
+                    "transaction_type": transaction_type,
+                    "category": "Biaya Operasional",
+                    "total_amount": amount,
+                    "amount": amount,
+                    "status": status,
+                },
+                headers=self.headers,
+            )
+        return response.json()["id"]
+
+    def _report(self):
+        return ArusKasReport.objects.get(toko=self.toko)
+
+    def test_entries_follow_toggle_resave_and_delete(self):
+        self._create("pemasukan", 500)
+        debt_id = self._create("pengeluaran", 200, status="Belum Lunas")
+        self.assertEqual(DetailArusKas.objects.filter(report__toko=self.toko).count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/{debt_id}/toggle-payment-status", headers=self.headers)
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaksi.objects.get(id=debt_id).save()
+
+        report = self._report()
+        self.assertEqual(DetailArusKas.objects.filter(transaksi_id=debt_id).count(), 1)
+        self.assertEqual((report.total_inflow, report.total_outflow, report.saldo), (500, 200, 300))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/{debt_id}", headers=self.headers)
+
+        report = self._report()
+        self.assertFalse(DetailArusKas.objects.filter(transaksi_id=debt_id).exists())
+        self.assertEqual((report.total_inflow, report.total_outflow, report.saldo), (500, 0, 500))
+
+    def test_nothing_is_written_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post(
+                "",
+                json={"transaction_type": "pemasukan", "category": "Biaya Operasional", "total_amount": 1, "amount": 1},
+                headers=self.headers,
+            )
+        self.assertTrue(callbacks)
+        self.assertFalse(DetailArusKas.objects.exists())
+
+    def test_bulk_sync_uses_a_constant_number_of_statements(self):
+        Transaksi.objects.bulk_create(
+            Transaksi(
+                id=f"L{i:05d}",
+                toko=self.toko,
+                created_by=self.owner,
+                transaction_type="pemasukan" if i % 2 else "pengeluaran",
+                category="Biaya Operasional",
+                total_amount=Decimal("10"),
+                amount=Decimal("10"),
+            )
+            for i in range(100)
+        )
+        ids = list(Transaksi.objects.filter(toko=self.toko).values_list("id", flat=True))
+
+        # savepoint, transactions, 2x report upsert, lock, details, insert, update, release
+        with self.assertNumQueries(9):
+            ledger.sync(ids)
+        ledger.sync(ids)
+
+        report = self._report()
+        self.assertEqual(DetailArusKas.objects.filter(report=report).count(), 100)
+        self.assertEqual((report.total_inflow, report.total_outflow, report.saldo), (500, 500, 0))
+
+
+class CompositeIndexTests(TestCase):
+    def test_benchmark_reports_plans_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_indexes", rows=50, toko=2, repeat=1, stdout=out)
+
+        self.assertIn("transaksi_toko_aktif_idx", out.getvalue())
+        self.assertIn("transaksiitem_produk_qty_idx", out.getvalue())
+        self.assertFalse(Transaksi.objects.exists())
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Transaksi._meta.db_table)
+        self.assertIn("transaksi_belum_lunas_idx", constraints)
+
+
+class ReportExportTests(TokoTestCase):
+    """Report downloads are streamed row by row instead of serialized up front."""
+
+    router = router
+
+    def setUp(self):
+        super().setUp()
+        self.bpr = self.create_bpr()
+        self.today = timezone.now().astimezone(ZoneInfo("Asia/Jakarta")).strftime("%Y-%m-%d")
+
+    def _seed(self, count):
+        Transaksi.objects.bulk_create(
+            Transaksi(
+                id=f"E{i:05d}",
+                toko=self.toko,
+                created_by=self.owner,
+                transaction_type="pemasukan",
+                category="Pendapatan Lain-Lain",
+                total_amount=Decimal("1500"),
+                amount=Decimal("1500"),
+                status="Belum Lunas" if i % 2 else "Lunas",
+            )
+            for i in range(count)
+        )
+
+    def _range(self, export_format):
+        return f"start_date={self.today}&end_date={self.today}&format={export_format}"
+
+    def test_csv_export(self):
+        self._seed(5)
+        response = self.client.get(
+            f"/financial-report-by-date?{self._range('csv')}", headers=self.headers
+        )
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = response.content.decode().splitlines()
+        self.assertEqual(lines[0], "ID Transaksi,Tanggal,Jenis,Kategori,Status,Total,Total Modal,Jumlah")
+        self.assertEqual(len(lines), 6)
+
+        debt = self.client.get(f"/debt-report-by-date?{self._range('csv')}", headers=self.headers)
+        self.assertEqual(len(debt.content.decode().splitlines()), 3)
+
+    def test_xlsx_export_for_bpr_is_a_valid_workbook(self):
+        self._seed(7)
+        with patch("core.exports.XLSX_FLUSH_ROWS", 2):
+            response = self.client.get(
+                f"/bpr/shop/{self.toko.id}/keuangan?{self._range('xlsx')}", headers=auth_headers(self.bpr)
+            )
+
+        self.assertTrue(response.streaming)
+        with zipfile.ZipFile(BytesIO(response.content)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(sheet.count("<row>"), 8)
+        self.assertIn("<v>1500.00</v>", sheet)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(
+            f"/bpr/shop/{self.toko.id}/utang?{self._range('pdf')}", headers=auth_headers(self.bpr)
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_nothing_is_queried_until_the_body_is_read(self):
+        self._seed(3)
+        transactions = Transaksi.objects.filter(toko=self.toko)
+        with self.assertNumQueries(0):
+            response = export_response(transactions, "csv", "laporan")
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 4)
+
+    def test_export_memory_does_not_grow_with_materialized_rows(self):
+        self._seed(3000)
+        transactions = Transaksi.objects.filter(toko=self.toko).order_by("-created_at")
+
+        # Streamed first: the serialized objects hold reference cycles that
+        # would still count towards the second measurement
+        tracemalloc.start()
+        for _ in export_response(transactions.all(), "xlsx", "laporan").streaming_content:
+            pass
+        _, streamed_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        TransaksiResponse.from_queryset(transactions.all())
+        _, materialized_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertLess(streamed_peak, materialized_peak / 2)
+
+
+class ReportRangeTests(TokoTestCase):
+    router = router
+
+    def test_bounds_are_half_open_jakarta_days(self):
+        report_range = parse_report_range("2025-03-01", "2025-03-31")
+        self.assertEqual(report_range.start, datetime(2025, 2, 28, 17, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(report_range.end, datetime(2025, 3, 31, 17, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual((report_range.start_date, report_range.end_date), ("2025-03-01", "2025-03-31"))
+
+        # ISO timestamps resolve to their Jakarta calendar day
+        self.assertEqual(
+            parse_report_range("2025-02-28T18:00:00+00:00", "2025-03-31T00:00:00+07:00"), report_range
+        )
+
+    def test_parsed_ranges_are_cached(self):
+        parse_report_range.cache_clear()
+        parse_report_range("2025-01-01", "2025-01-31")
+        parse_report_range("2025-01-01", "2025-01-31")
+        self.assertEqual(parse_report_range.cache_info().hits, 1)
+
+    def _transaksi_at(self, moment):
+        transaksi = Transaksi.objects.create(
+            toko=self.toko,
+            created_by=self.owner,
+            transaction_type="pemasukan",
+            category="Pendapatan Lain-Lain",
+            total_amount=Decimal("1000"),
+            amount=Decimal("1000"),
+        )
+        Transaksi.objects.filter(id=transaksi.id).update(created_at=moment)
+        return transaksi.id
+
+    def test_last_sub_second_of_the_day_is_included(self):
+        jakarta = ZoneInfo("Asia/Jakarta")
+        last_moment = self._transaksi_at(datetime(2025, 3, 31, 23, 59, 59, 500000, tzinfo=jakarta))
+        self._transaksi_at(datetime(2025, 4, 1, 0, 0, tzinfo=jakarta))
+
+        response = self.client.get(
+            "/financial-report-by-date?start_date=2025-03-31&end_date=2025-03-31", headers=self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t["id"] for t in response.json()["transactions"]], [last_moment])
+
+    def test_month_filter_uses_jakarta_months(self):
+        jakarta = ZoneInfo("Asia/Jakarta")
+        self.assertEqual(month_range(2025, 3), parse_report_range("2025-03-01", "2025-03-31"))
+        # Still February in UTC, already March in Jakarta
+        march = self._transaksi_at(datetime(2025, 3, 1, 0, 30, tzinfo=jakarta))
+        february = self._transaksi_at(datetime(2025, 2, 28, 23, 59, 59, 500000, tzinfo=jakarta))
+
+        for month, expected in [(3, [march]), (2, [february])]:
+            response = self.client.get(f"?month={month}&year=2025", headers=self.headers)
+            self.assertEqual([t["id"] for t in response.json()["items"]], expected)
+        self.assertEqual(self.client.get("?month=13&year=2025", headers=self.headers).status_code, 422)
+
+    def test_invalid_ranges(self):
+        for query, message in [
+            ("start_date=2025-03-01", "Both start_date and end_date parameters are required"),
+            ("start_date=2025-03-02&end_date=2025-03-01", "start_date must be before end_date"),
+            ("start_date=kemarin&end_date=2025-03-01", "Invalid date format"),
+        ]:
+            response = self.client.get(f"/debt-report-by-date?{query}", headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(message, response.json()["message"])